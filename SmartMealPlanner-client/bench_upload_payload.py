@@ -0,0 +1,110 @@
+#
+# bench_upload_payload.py
+#
+# Compares the /upload request body for each way of sending an image:
+#
+#   json-base64     {"image": <base64 of the file>}      (the original)
+#   binary          the file as is, application/octet-stream
+#   shrunk-base64   {"image": <base64 of imageprep.shrink()>}
+#   shrunk-binary   imageprep.shrink() as is
+#   qr-text         {"qr_text": ...}, decoded locally
+#
+# and with --url also times the end-to-end POST for each of them.
+# Every timed upload adds the item to the inventory, so point --url
+# at a test deployment (or a local router). binary bodies need
+# binary media types enabled on API Gateway.
+#
+#   python3 bench_upload_payload.py [-n 10] [--url URL] [image ...]
+#
+
+import argparse
+import base64
+import json
+import statistics
+import time
+
+import imageprep
+
+
+def payloads(image_bytes):
+  """
+  Returns [(name, body bytes, content type)] for every variant the
+  installed packages allow.
+  """
+  def as_json(obj):
+    return json.dumps(obj).encode("utf-8")
+
+  def b64(data):
+    return base64.b64encode(data).decode("utf-8")
+
+  out = [
+    ("json-base64", as_json({"image": b64(image_bytes)}), "application/json"),
+    ("binary", image_bytes, "application/octet-stream"),
+  ]
+
+  if imageprep.have_pillow():
+    small = imageprep.shrink(image_bytes)
+    out.append(("shrunk-base64", as_json({"image": b64(small)}), "application/json"))
+    out.append(("shrunk-binary", small, "application/octet-stream"))
+
+  if imageprep.have_pyzbar():
+    text = imageprep.decode_qr(image_bytes)
+    if text is not None:
+      out.append(("qr-text", as_json({"qr_text": text}), "application/json"))
+
+  return out
+
+
+def time_upload(engine, url, body, content_type, runs):
+  timings = []
+  status = None
+  for _ in range(runs):
+    start = time.perf_counter()
+    res = engine.post_bytes_sync(url, body, content_type)
+    timings.append((time.perf_counter() - start) * 1000.0)
+    status = res.status_code
+  return status, timings
+
+
+def main():
+  parser = argparse.ArgumentParser(description="/upload payload size and latency")
+  parser.add_argument("images", nargs="*", default=["orange.png"])
+  parser.add_argument("-n", "--runs", type=int, default=10)
+  parser.add_argument("--url", help="web service baseurl; sizes only if omitted")
+  args = parser.parse_args()
+
+  engine = None
+  if args.url:
+    import mealclient   # needs aiohttp, only for the timed runs
+    engine = mealclient.MealClient()
+
+  try:
+    for path in args.images:
+      with open(path, "rb") as infile:
+        image_bytes = infile.read()
+
+      # the client-side work is part of the end-to-end cost
+      start = time.perf_counter()
+      variants = payloads(image_bytes)
+      prep_ms = (time.perf_counter() - start) * 1000.0
+
+      print()
+      print(f"{path} ({len(image_bytes)} bytes, client prep {prep_ms:.1f} ms for all variants)")
+      base = len(variants[0][1])
+
+      for name, body, content_type in variants:
+        line = f"  {name:14} {len(body):10} bytes  {100.0 * len(body) / base:6.1f}%"
+        if engine is not None:
+          status, timings = time_upload(engine, args.url.rstrip("/") + "/upload",
+                                        body, content_type, args.runs)
+          line += (f"  median {statistics.median(timings):8.1f} ms"
+                   f"  min {min(timings):8.1f} ms  (status {status})")
+        print(line)
+
+  finally:
+    if engine is not None:
+      engine.close()
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,110 @@
+#
+# imageprep.py
+#
+# Client-side preparation of QR images before upload. Phone photos
+# are several MB but only the QR code matters, so depending on what
+# is installed we either
+#
+#   decode  -- read the QR code locally (pyzbar + Pillow) and send
+#              only its text, a few dozen bytes
+#   shrink  -- downscale to at most MAX_SIDE pixels, convert to
+#              grayscale and re-encode as JPEG (Pillow)
+#   raw     -- send the file as is
+#
+# "auto" picks the first of these that is available.
+#
+
+import io
+
+
+MAX_SIDE = 1024
+JPEG_QUALITY = 80
+
+
+def have_pillow():
+  try:
+    import PIL.Image
+    return True
+  except ImportError:
+    return False
+
+
+def have_pyzbar():
+  try:
+    import pyzbar.pyzbar
+    return have_pillow()
+  except ImportError:
+    return False
+
+
+def resolve_mode(mode):
+  """
+  Maps "auto" to the best mode the installed packages allow.
+  """
+  if mode != "auto":
+    return mode
+  if have_pyzbar():
+    return "decode"
+  if have_pillow():
+    return "shrink"
+  return "raw"
+
+
+def decode_qr(image_bytes):
+  """
+  Returns the QR text in the image, or None if none was found.
+  """
+  from PIL import Image
+  from pyzbar.pyzbar import decode, ZBarSymbol
+
+  symbols = decode(Image.open(io.BytesIO(image_bytes)), symbols=[ZBarSymbol.QRCODE])
+  if not symbols:
+    return None
+  return symbols[0].data.decode("utf-8")
+
+
+def shrink(image_bytes, max_side=MAX_SIDE, quality=JPEG_QUALITY):
+  """
+  Downscales the image so its longer side is at most max_side,
+  converts it to grayscale and re-encodes it as JPEG. Returns the
+  original bytes if that would not make them smaller.
+  """
+  from PIL import Image
+
+  image = Image.open(io.BytesIO(image_bytes))
+  image = image.convert("L")
+  image.thumbnail((max_side, max_side))
+
+  out = io.BytesIO()
+  image.save(out, format="JPEG", quality=quality, optimize=True)
+  data = out.getvalue()
+  return data if len(data) < len(image_bytes) else image_bytes
+
+
+def prepare(image_bytes, mode="auto"):
+  """
+  Prepares one image for upload.
+
+  Parameters
+  ----------
+  image_bytes: contents of the image file
+  mode: "auto", "decode", "shrink" or "raw"
+
+  Returns
+  -------
+  ("text", qr_text) or ("image", image_bytes); "decode" falls back to
+  a shrunk image if no QR code is found locally, so the server can
+  still try
+  """
+  mode = resolve_mode(mode)
+
+  if mode == "decode":
+    text = decode_qr(image_bytes)
+    if text is not None:
+      return ("text", text)
+    mode = "shrink"
+
+  if mode == "shrink":
+    return ("image", shrink(image_bytes))
+
+  return ("image", image_bytes)
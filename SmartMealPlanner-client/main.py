@@ -13,7 +13,6 @@
 #   CS 310
 #
 
-import requests
 import json
 
 import uuid
@@ -22,7 +21,13 @@ import logging
 import sys
 import os
 import base64
-import time
+import argparse
+import glob
+import urllib.parse
+
+import mealclient
+import imageprep
+import invitem
 
 from configparser import ConfigParser
 from getpass import getpass
@@ -31,15 +36,12 @@ from getpass import getpass
 #
 # classes
 #
-class Item:
+# inventory items are invitem.InventoryItem: name, quantity, lots
+# (the number of expiration dates the quantity spans) and the
+# earliest expiration date (day, month, year, date)
+#
+Item = invitem.InventoryItem
 
-  def __init__(self, row):
-    self.name = row[0]
-    self.quantity = row[1]
-    self.day = row[2]
-    self.month = row[3]
-    self.year = row[4]
-    
 
 
 ###################################################################
@@ -48,20 +50,24 @@ class Item:
 #
 # When calling servers on a network, calls can randomly fail. 
 # The better approach is to repeat at least N times (typically 
-# N=3), and then give up after N tries.
+# N=3), and then give up after N tries. The retries (with jittered
+# exponential backoff) happen in the shared client engine, see
+# mealclient.py.
 #
-def web_service_get(url):
+def web_service_get(url, headers=None):
   """
   Submits a GET request to a web service at most 3 times, since 
   web services can fail to respond e.g. to heavy user or internet 
   traffic. If the web service responds with status code 200, 400 
   or 500, we consider this a valid response and return the response.
-  Otherwise we try again, at most 3 times. After 3 attempts the 
-  function returns with the last response.
+  Otherwise we try again after a random backoff that doubles each
+  time, at most 3 times. After 3 attempts the function returns with
+  the last response.
   
   Parameters
   ----------
   url: url for calling the web service
+  headers: optional dict of request headers
   
   Returns
   -------
@@ -69,32 +75,7 @@ def web_service_get(url):
   """
 
   try:
-    retries = 0
-    
-    while True:
-      response = requests.get(url)
-        
-      if response.status_code in [200, 400, 480, 481, 482, 500]:
-        #
-        # we consider this a successful call and response
-        #
-        break;
-
-      #
-      # failed, try again?
-      #
-      retries = retries + 1
-      if retries < 3:
-        # try at most 3 times
-        time.sleep(retries)
-        continue
-          
-      #
-      # if get here, we tried 3 times, we give up:
-      #
-      break
-
-    return response
+    return engine.get_sync(url, headers)
 
   except Exception as e:
     print("**ERROR**")
@@ -104,6 +85,53 @@ def web_service_get(url):
     return None
     
 
+###################################################################
+#
+# web_service_get_cached
+#
+# GET responses that carry an ETag are kept in memory for the rest of
+# the session; the next GET of the same url sends If-None-Match and a
+# 304 reply is answered from the cache.
+#
+response_cache = {}
+
+def web_service_get_cached(url):
+  """
+  Conditional GET through web_service_get, using the ETag cache.
+
+  Parameters
+  ----------
+  url: url for calling the web service
+
+  Returns
+  -------
+  (status_code, body) where body is the decoded JSON (None if the
+  response had no JSON body); a 304 is returned as (200, cached
+  body). Returns (None, None) if the call failed entirely.
+  """
+  headers = {}
+  cached = response_cache.get(url)
+  if cached is not None:
+    headers["If-None-Match"] = cached[0]
+
+  res = web_service_get(url, headers)
+  if res is None:
+    return None, None
+
+  if res.status_code == 304 and cached is not None:
+    return 200, cached[1]
+
+  try:
+    body = res.json()
+  except ValueError:
+    body = None
+
+  if res.status_code == 200 and "ETag" in res.headers:
+    response_cache[url] = (res.headers["ETag"], body)
+
+  return res.status_code, body
+
+
 ############################################################
 #
 # prompt
@@ -129,6 +157,7 @@ def prompt():
       print("   3 => delete from inventory")
       print("   4 => get a meal plan")
       print("   5 => get an email notification about which items are expiring within 3 days")
+      print("   6 => get a meal plan, streamed as it is generated")
 
       cmd = input()
 
@@ -153,13 +182,14 @@ def prompt():
 #
 # notify
 #
-def notify(baseurl):
+def notify(baseurl, email=None):
     """
     Notifies the user which items are expiring within the next 3 days
 
     Parameters
     ----------
     baseurl: baseurl for web service
+    email: address to notify, prompted for if None
 
     Returns
     -------
@@ -173,13 +203,13 @@ def notify(baseurl):
         api = '/notify'
         url = baseurl + api
 
-        print("Enter an email>")
-        email = input()
+        if email is None:
+            print("Enter an email>")
+            email = input()
 
         # res = requests.get(url)
         payload = {"email": email}
-        headers = {"Content-Type": "application/json"}
-        res = requests.post(url, json=payload, headers=headers)
+        res = engine.post_sync(url, payload)
 
         #
         # let's look at what we got back:
@@ -208,18 +238,82 @@ def notify(baseurl):
         return
 
 
+############################################################
+#
+# expiring
+#
+def expiring(baseurl, days=3):
+    """
+    Prints the items expiring within the next `days` days, soonest
+    first, without sending an email.
+
+    Parameters
+    ----------
+    baseurl: baseurl for web service
+    days: size of the window
+
+    Returns
+    -------
+    list of {"name", "quantity", "expires"} dicts, or None on failure
+    """
+
+    try:
+        url = f"{baseurl}/expiring?days={days}"
+
+        res = engine.get_sync(url)
+
+        if res.status_code != 200:
+            print("**ERROR: failed with status code:", res.status_code)
+            print("url: " + url)
+            if res.status_code in [400, 500]:
+                print("Error message:", res.json())
+            return None
+
+        body = res.json()
+        if not body["items"]:
+            print(f"No items expiring within {days} days")
+        for item in body["items"]:
+            print(f"{item['expires']}  {item['name']} (qty: {item['quantity']})")
+        return body["items"]
+
+    except Exception as e:
+        logging.error("**ERROR: expiring() failed:")
+        logging.error("url: " + url)
+        logging.error(e)
+        return None
+
+
+
+############################################################
+#
+# mealplan_query
+#
+def mealplan_query(force_refresh, days):
+    """
+    Query string for /mealplan ("" when there is nothing to send).
+    """
+    params = []
+    if force_refresh:
+        params.append("force_refresh=1")
+    if days:
+        params.append(f"days={days}")
+    return "?" + "&".join(params) if params else ""
+
 
 ############################################################
 #
 # mealplan
 #
-def mealplan(baseurl):
+def mealplan(baseurl, force_refresh=False, days=None):
     """
     Generates a meal plan based on the user's inventory
 
     Parameters
     ----------
     baseurl: baseurl for web service
+    force_refresh: True to skip the server's meal plan cache
+    days: number of days to plan, one per server-side call run in
+      parallel; None for the server's default plan
 
     Returns
     -------
@@ -231,33 +325,32 @@ def mealplan(baseurl):
         # call the web service:
         #
         api = '/mealplan'
-        url = baseurl + api
+        url = baseurl + api + mealplan_query(force_refresh, days)
 
         # res = requests.get(url)
-        res = web_service_get(url)
+        # an unchanged inventory is answered with 304 and the plan we
+        # already have, see web_service_get_cached
+        status, body = web_service_get_cached(url)
 
         #
         # let's look at what we got back:
         #
-        if res.status_code == 200: #success
+        if status == 200: #success
             pass
         else:
             # failed:
-            print("**ERROR: failed with status code:", res.status_code)
+            print("**ERROR: failed with status code:", status)
             print("url: " + url)
-            if res.status_code == 500:
+            if status == 500:
                 # we'll have an error message
-                body = res.json()
                 print("Error message:", body)
             #
             return
 
-        #
-        # deserialize and extract users:
-        #
-        body = res.json()
         meal_plan_text = body.get("meal_plan", "No meal plan found.")
         print(meal_plan_text)
+        if body.get("complete") is False:
+            print("**WARNING: some days could not be planned, try again later")
 
         #
         return
@@ -271,17 +364,58 @@ def mealplan(baseurl):
 
 
 
+############################################################
+#
+# mealplan_stream
+#
+def mealplan_stream(streamurl, days=None):
+    """
+    Like mealplan, but prints the plan as it is generated instead of
+    waiting for the whole response. Needs a streaming endpoint (see
+    stream_webservice in the config file); API Gateway buffers.
+
+    Parameters
+    ----------
+    streamurl: base url of the streaming web service
+    days: number of days to plan, see mealplan
+
+    Returns
+    -------
+    nothing
+    """
+
+    try:
+        api = '/mealplan'
+        url = streamurl + api + mealplan_query(False, days)
+
+        #
+        # each chunk is handed to us as soon as it arrives:
+        #
+        for text in engine.stream_sync(url):
+            print(text, end="", flush=True)
+        print()
+        #
+        return
+
+    except Exception as e:
+        logging.error("**ERROR: mealplan_stream() failed:")
+        logging.error("url: " + url)
+        logging.error(e)
+        return
+
+
 ############################################################
 #
 # delete
 #
-def delete(baseurl):
+def delete(baseurl, name=None, quantity=None):
   """
   User inputs an item name and an amount of that item they consumed. This will then be updated in the table.
 
   Parameters
   ----------
   baseurl: baseurl for web service
+  name, quantity: item and amount consumed, prompted for if None
 
   Returns
   -------
@@ -295,16 +429,17 @@ def delete(baseurl):
     api = "/inventory"
     url = baseurl + api
 
-    print("Enter an item name>")
-    name = input()
-    print("Enter the quantity that you consumed>")
-    quantity = input()
+    if name is None:
+      print("Enter an item name>")
+      name = input()
+    if quantity is None:
+      print("Enter the quantity that you consumed>")
+      quantity = input()
 
     quantity = int(quantity)
     payload = {"name": name, "quantity": quantity}
-    headers = {"Content-Type": "application/json"}
 
-    res = requests.post(url, json=payload, headers=headers)
+    res = engine.post_sync(url, payload)
 
 
     #
@@ -312,6 +447,9 @@ def delete(baseurl):
     #
     if res.status_code == 200: #success
       print("Inventory updated successfully")
+    elif res.status_code == 202: # queued, applied shortly
+      body = res.json()
+      print(f"Update queued as operation {body['op_id']}")
     elif res.status_code == 400: # no such user
       body = res.json()
       print(body)
@@ -337,70 +475,102 @@ def delete(baseurl):
 
 ############################################################
 #
-# inventory
+# inventory_items
 #
-def inventory(baseurl):
+PAGE_SIZE = 100
+
+def inventory_items(baseurl, page_size=PAGE_SIZE):
     """
-    Gets the items in the inventory and prints them out for the user to see
+    Generator over the inventory, one Item at a time. Pages of
+    page_size rows are requested from /inventory only as the caller
+    iterates, following the server's "next" cursor. Pages come in
+    the columnar form (see invitem.py); a server without it sends
+    rows, which are read as well.
 
     Parameters
     ----------
     baseurl: baseurl for web service
+    page_size: rows per request
 
     Returns
     -------
-    nothing
+    generator of Item objects; stops early (after printing the
+    error) if a request fails
     """
+    api = '/inventory'
+    cursor = None
 
-    try:
-        #
-        # call the web service:
-        #
-        api = '/inventory'
-        url = baseurl + api
+    while True:
+        params = {"limit": page_size, "format": "columns"}
+        if cursor is not None:
+            params["after"] = cursor
+        url = baseurl + api + "?" + urllib.parse.urlencode(params)
 
-        # res = requests.get(url)
-        res = web_service_get(url)
+        status, body = web_service_get_cached(url)
 
-        #
-        # let's look at what we got back:
-        #
-        if res.status_code == 200: #success
-            pass
-        else:
+        if status is None:
+            return
+
+        if status != 200:
             # failed:
-            print("**ERROR: failed with status code:", res.status_code)
+            print("**ERROR: failed with status code:", status)
             print("url: " + url)
-            if res.status_code == 500:
+            if status in [400, 500]:
                 # we'll have an error message
-                body = res.json()
                 print("Error message:", body)
-            #
             return
 
-        #
-        # deserialize and extract users:
-        #
-        body = res.json()
+        if "columns" in body:
+            yield from invitem.decode_columns(body["columns"])
+        else:
+            for row in body["items"]:
+                yield Item.from_row(row)
 
+        cursor = body.get("next")
+        if cursor is None:
+            return
+
+
+############################################################
+#
+# inventory
+#
+def inventory(baseurl):
+    """
+    Gets the items in the inventory and prints them out for the user to see
+
+    Parameters
+    ----------
+    baseurl: baseurl for web service
+
+    Returns
+    -------
+    nothing
+    """
+
+    try:
         #
-        # let's map each row into a User object:
+        # call the web service:
         #
-        items = []
-        for row in body:
-            item = Item(row)
-            items.append(item)
+        api = '/inventory'
+        url = baseurl + api
+
         #
-        # Now we can think OOP:
+        # pages are fetched lazily as we print, so the first items
+        # show up after one page instead of the whole inventory:
         #
-        if len(items) == 0:
-            print("no items...")
-            return
-
-        for item in items:
+        count = 0
+        for item in inventory_items(baseurl):
+            count += 1
             print(item.name)
             print(" quantity: ", item.quantity)
-            print(f" expiration date: {item.month}/{item.day}/{item.year}")
+            if item.lots > 1:
+              print(f" expiration date: {item.month}/{item.day}/{item.year} (earliest of {item.lots} lots)")
+            else:
+              print(f" expiration date: {item.month}/{item.day}/{item.year}")
+
+        if count == 0:
+            print("no items...")
         #
         return
 
@@ -411,6 +581,113 @@ def inventory(baseurl):
         return
 
 
+############################################################
+#
+# upload_batch
+#
+IMAGE_SUFFIXES = [".jpg", ".jpeg", ".png"]
+BATCH_SIZE = 20
+
+def upload_entry(filename):
+  """
+  Reads an image and prepares it for /upload (see imageprep.py):
+  {"qr_text": ...} if the QR code was decoded locally, otherwise
+  the (possibly downscaled) image as a base64 string.
+  """
+  with open(filename, "rb") as infile:
+    kind, value = imageprep.prepare(infile.read(), image_mode)
+
+  if kind == "text":
+    return {"qr_text": value}
+  return base64.b64encode(value).decode("utf-8")
+
+
+def upload_batch(baseurl, filenames, out=sys.stdout):
+  """
+  Uploads many images to /upload, BATCH_SIZE images per request.
+  The server decodes each batch concurrently and adds all items in
+  one database transaction. Prints the result for every image and
+  a progress line per finished batch to `out`.
+
+  Parameters
+  ----------
+  baseurl: baseurl for web service
+  filenames: list of local image filenames
+  out: where to print results and progress (sys.stderr in CLI mode,
+    so stdout only carries the JSON summary)
+
+  Returns
+  -------
+  summary dict: {"files", "added", "failed", "results": [{"file",
+  "status", "item" or "error"}]}, or None if the upload failed
+  """
+  try:
+    api = '/upload'
+    url = baseurl + api
+
+    summary = {"files": len(filenames), "added": 0, "failed": 0, "results": []}
+
+    if len(filenames) == 0:
+      print("no images found...", file=out)
+      return summary
+
+    #
+    # the batches are sent concurrently (the engine bounds how many
+    # are in flight), results are printed in order:
+    #
+    batches = []
+    for start in range(0, len(filenames), BATCH_SIZE):
+      batch = filenames[start:start + BATCH_SIZE]
+
+      images = [upload_entry(filename) for filename in batch]
+
+      batches.append((batch, engine.submit(engine.upload(baseurl, images))))
+
+    for number, (batch, future) in enumerate(batches, start=1):
+      try:
+        res = future.result()
+        status_code = res.status_code
+      except Exception as e:
+        res = None
+        status_code = str(e)
+
+      if res is None or res.status_code not in [200, 202, 400]:
+        print("**ERROR: failed with status code:", status_code, file=out)
+        print("url: " + url, file=out)
+        if res is not None and res.status_code == 500:
+          print("Error message:", res.json(), file=out)
+        for filename in batch:
+          summary["results"].append({"file": filename, "status": "error", "error": f"status code {status_code}"})
+        summary["failed"] += len(batch)
+        continue
+
+      body = res.json()
+      for result in body.get("results", []):
+        filename = batch[result["index"]]
+        if result["status"] == "ok":
+          summary["added"] += 1
+          item = result["item"]
+          summary["results"].append({"file": filename, "status": "ok", "item": item})
+          print(f"{filename}: added {item['item_name']}, quantity: {item['quantity']}, expiration date: {item['expiration_date']}", file=out)
+        else:
+          summary["failed"] += 1
+          summary["results"].append({"file": filename, "status": "error", "error": result["error"]})
+          print(f"{filename}: **ERROR: {result['error']}", file=out)
+
+      if res.status_code == 202:
+        print(f"[batch {number}/{len(batches)}] queued as operation {body['op_id']}", file=out)
+      print(f"[batch {number}/{len(batches)}] {summary['added'] + summary['failed']}/{len(filenames)} images processed", file=out)
+
+    print(f"Added {summary['added']} of {len(filenames)} images to inventory", file=out)
+    return summary
+
+  except Exception as e:
+    logging.error("**ERROR: upload_batch() failed:")
+    logging.error("url: " + url)
+    logging.error(e)
+    return None
+
+
 ############################################################
 #
 # upload
@@ -431,38 +708,50 @@ def upload(baseurl):
   try:
     api = '/upload'
     url = baseurl + api
-    print("Enter Image filename>")
+    print("Enter Image filename (or a folder of images)>")
     local_filename = input()
 
+    if pathlib.Path(local_filename).is_dir():
+      upload_batch(baseurl, find_images(local_filename))
+      return
+
     if not pathlib.Path(local_filename).is_file():
       print("Image file '", local_filename, "' does not exist...")
       return
  
     #
-    # build the data packet:
+    # build the data packet: the QR text if we can decode it here,
+    # otherwise the (downscaled) image, see imageprep.py
     #
     infile = open(local_filename, "rb")
     bytes = infile.read()
     infile.close()
 
-    #
-    # now encode the jpg as base64. Note b64encode returns
-    # a bytes object, not a string. So then we have to convert
-    # (decode) the bytes -> string, and then we can serialize
-    # the string as JSON for upload to server:
-    #
-    data = base64.b64encode(bytes)
-    datastr = data.decode("utf-8")
-    
-    payload = {"image": datastr}
-    headers = {"Content-Type": "application/json"}
-    res = requests.post(url, json=payload, headers=headers)
+    kind, value = imageprep.prepare(bytes, image_mode)
+
+    if kind == "text":
+      res = engine.post_sync(url, {"qr_text": value})
+    elif binary_upload:
+      # raw bytes, needs binary media types enabled on the API
+      res = engine.post_bytes_sync(url, value)
+    else:
+      #
+      # now encode the jpg as base64. Note b64encode returns
+      # a bytes object, not a string. So then we have to convert
+      # (decode) the bytes -> string, and then we can serialize
+      # the string as JSON for upload to server:
+      #
+      data = base64.b64encode(value)
+      datastr = data.decode("utf-8")
+
+      payload = {"image": datastr}
+      res = engine.post_sync(url, payload)
 
 
     #
     # let's look at what we got back:
     #
-    if res.status_code == 200: #success
+    if res.status_code in [200, 202]: #success, or queued to be added
       pass
     elif res.status_code == 400: # no such user
       body = res.json()
@@ -487,7 +776,10 @@ def upload(baseurl):
     date = item_data.get('expiration_date', 'Unknown')
     quantity = item_data.get('quantity', 'Unknown')
 
-    print(f"Added {item_name} to inventory with quantity: {quantity} and expiration date: {date}")
+    if res.status_code == 202:
+      print(f"Queued {item_name} with quantity: {quantity} and expiration date: {date} (operation {body['op_id']})")
+    else:
+      print(f"Added {item_name} to inventory with quantity: {quantity} and expiration date: {date}")
     return
 
   except Exception as e:
@@ -499,6 +791,36 @@ def upload(baseurl):
 
 
 
+############################################################
+#
+# auth_headers
+#
+def auth_headers(configur):
+  """
+  Credentials sent with every request: the web service answers for
+  one user at a time.
+
+  Parameters
+  ----------
+  configur: parsed client-config.ini
+
+  Returns
+  -------
+  dict of headers; Authorization from [client] auth_token (a token
+  the API Gateway authorizer accepts), X-User-Id from [client]
+  user_id (only honored by deployments with [auth] trust_header,
+  i.e. local testing)
+  """
+  headers = {}
+  token = configur.get('client', 'auth_token', fallback='')
+  if token:
+    headers["Authorization"] = "Bearer " + token
+  user_id = configur.get('client', 'user_id', fallback='')
+  if user_id:
+    headers["X-User-Id"] = user_id
+  return headers
+
+
 ############################################################
 #
 # check_url
@@ -539,12 +861,133 @@ def check_url(baseurl):
   return baseurl
   
 
+############################################################
+#
+# find_images
+#
+def find_images(dir_or_glob):
+  """
+  Returns the image files in a folder, or the files matching a glob
+  pattern, sorted.
+  """
+  path = pathlib.Path(dir_or_glob)
+  if path.is_dir():
+    return sorted(str(p) for p in path.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+  return sorted(p for p in glob.glob(dir_or_glob) if pathlib.Path(p).is_file())
+
+
+############################################################
+#
+# build_parser
+#
+def build_parser():
+  """
+  Command-line interface. With no subcommand the interactive menu
+  runs, as before.
+  """
+  parser = argparse.ArgumentParser(
+    description="Smart Meal Planner client. Run without a command for the interactive menu.")
+  parser.add_argument("--config", help="config file (default client-config.ini)")
+
+  commands = parser.add_subparsers(dest="command")
+
+  p = commands.add_parser("upload", help="upload every image in a folder or matching a glob")
+  p.add_argument("images", help="folder, image file or glob pattern, e.g. 'labels/*.jpg'")
+
+  p = commands.add_parser("inventory", help="show the inventory")
+  p.add_argument("--json", action="store_true", help="print the rows as JSON")
+
+  p = commands.add_parser("consume", help="remove a quantity of an item")
+  p.add_argument("name")
+  p.add_argument("quantity", type=int)
+
+  p = commands.add_parser("mealplan", help="get a meal plan")
+  p.add_argument("--stream", action="store_true", help="print the plan as it is generated")
+  p.add_argument("--force-refresh", action="store_true", help="skip the server's plan cache")
+  p.add_argument("--days", type=int, help="plan this many days, generated in parallel")
+
+  p = commands.add_parser("notify", help="email the items expiring within 3 days")
+  p.add_argument("email")
+
+  p = commands.add_parser("expiring", help="list the items expiring soon")
+  p.add_argument("--days", type=int, default=3, help="window in days (default 3)")
+
+  p = commands.add_parser("status", help="show how a queued upload or consume ended")
+  p.add_argument("op_id", type=int)
+
+  return parser
+
+
+############################################################
+#
+# run_command
+#
+def run_command(args, baseurl, streamurl):
+  """
+  Runs one non-interactive command.
+
+  Returns
+  -------
+  process exit code
+  """
+  if args.command == "upload":
+    filenames = find_images(args.images)
+    summary = upload_batch(baseurl, filenames, out=sys.stderr)
+    if summary is None:
+      return 1
+    # machine-readable summary on stdout, progress went to stderr:
+    print(json.dumps(summary, indent=2))
+    return 0 if summary["failed"] == 0 else 1
+
+  if args.command == "inventory":
+    if args.json:
+      rows = [[item.name, item.quantity, item.day, item.month, item.year, item.lots]
+              for item in inventory_items(baseurl)]
+      print(json.dumps(rows))
+    else:
+      inventory(baseurl)
+    return 0
+
+  if args.command == "consume":
+    delete(baseurl, args.name, args.quantity)
+    return 0
+
+  if args.command == "mealplan":
+    if args.stream:
+      mealplan_stream(streamurl, days=args.days)
+    else:
+      mealplan(baseurl, force_refresh=args.force_refresh, days=args.days)
+    return 0
+
+  if args.command == "notify":
+    notify(baseurl, args.email)
+    return 0
+
+  if args.command == "expiring":
+    return 0 if expiring(baseurl, args.days) is not None else 1
+
+  if args.command == "status":
+    res = engine.call(engine.operation(baseurl, args.op_id))
+    if res.status_code != 200:
+      print("**ERROR: failed with status code:", res.status_code)
+      print(res.text)
+      return 1
+    print(json.dumps(res.json(), indent=2))
+    return 0 if res.json()["status"] != "failed" else 1
+
+  return 2
+
+
 ############################################################
 # main
 #
 try:
-  print('** Welcome to BenfordApp with Authentication **')
-  print()
+  args = build_parser().parse_args()
+  interactive = args.command is None
+
+  if interactive:
+    print('** Welcome to BenfordApp with Authentication **')
+    print()
 
   # eliminate traceback so we just get error message:
   sys.tracebacklimit = 0
@@ -557,15 +1000,18 @@ try:
   #
   config_file = 'client-config.ini'
 
-  print("First, enter name of config file to use...")
-  print("Press ENTER to use default, or")
-  print("enter config file name>")
-  s = input()
+  if args.config is not None:
+    config_file = args.config
+  elif interactive:
+    print("First, enter name of config file to use...")
+    print("Press ENTER to use default, or")
+    print("enter config file name>")
+    s = input()
 
-  if s == "":  # use default
-    pass  # already set
-  else:
-    config_file = s
+    if s == "":  # use default
+      pass  # already set
+    else:
+      config_file = s
 
   #
   # does config file exist?
@@ -583,6 +1029,35 @@ try:
   
   baseurl = check_url(baseurl)
 
+  #
+  # optional streaming endpoint for the meal plan (a function URL
+  # with response streaming); defaults to the API Gateway url:
+  #
+  streamurl = configur.get('client', 'stream_webservice', fallback=baseurl).rstrip('/')
+
+  #
+  # one client engine (keep-alive session, bounded concurrency,
+  # timeouts, retries) for all web service calls:
+  #
+  engine = mealclient.MealClient(
+    max_concurrency=configur.getint('client', 'max_concurrency', fallback=8),
+    timeout=configur.getfloat('client', 'timeout', fallback=60.0),
+    headers=auth_headers(configur))
+
+  #
+  # how images are prepared and sent to /upload:
+  #
+  image_mode = configur.get('client', 'image_mode', fallback='auto')
+  binary_upload = configur.getboolean('client', 'binary_upload', fallback=False)
+
+  #
+  # non-interactive: run the one command and exit
+  #
+  if not interactive:
+    code = run_command(args, baseurl, streamurl)
+    engine.close()
+    sys.exit(code)
+
   #
   # main processing loop:
   #
@@ -600,6 +1075,8 @@ try:
       mealplan(baseurl)
     elif cmd == 5:
       notify(baseurl)
+    elif cmd == 6:
+      mealplan_stream(streamurl)
     else:
       print("** Unknown command, try again...")
     #
@@ -610,6 +1087,7 @@ try:
   #
   print()
   print('** done **')
+  engine.close()
   sys.exit(0)
 
 except Exception as e:
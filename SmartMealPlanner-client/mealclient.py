@@ -0,0 +1,256 @@
+#
+# mealclient.py
+#
+# asyncio client engine for the Smart Meal Planner web service. All
+# calls share one aiohttp session (keep-alive connections are reused
+# instead of a new TCP + TLS handshake per call), run with a bounded
+# number in flight, and have a per-request timeout. Failed GETs are
+# retried with jittered exponential backoff.
+#
+# The engine runs its event loop on a background thread, so the
+# synchronous menu code in main.py can call it through the *_sync
+# wrappers, while async code (or submit()) can overlap calls, e.g.
+# uploading several batches at once or fetching the inventory while
+# a meal plan is generating.
+#
+
+import asyncio
+import codecs
+import json
+import random
+import threading
+
+import aiohttp
+
+
+#
+# status codes we consider a valid response (no retry), same as the
+# original web_service_get:
+#
+FINAL_STATUS = [200, 202, 304, 400, 401, 403, 404, 480, 481, 482, 500]
+
+
+class Response:
+  """
+  The parts of a requests.Response that main.py uses: status_code,
+  headers, text and json().
+  """
+
+  def __init__(self, status_code, headers, text):
+    self.status_code = status_code
+    self.headers = headers
+    self.text = text
+
+  def json(self):
+    return json.loads(self.text)
+
+
+class MealClient:
+
+  def __init__(self, max_concurrency=8, timeout=30.0, retries=3,
+               backoff_base=0.5, backoff_max=8.0, headers=None):
+    """
+    Parameters
+    ----------
+    max_concurrency: most requests in flight at once
+    timeout: per-request timeout in seconds (total, incl. body)
+    retries: attempts for idempotent (GET) requests
+    backoff_base: first backoff ceiling in seconds, doubled per retry
+    backoff_max: largest backoff ceiling in seconds
+    headers: sent with every request (e.g. Authorization)
+    """
+    self.max_concurrency = max_concurrency
+    self.timeout = timeout
+    self.retries = retries
+    self.backoff_base = backoff_base
+    self.backoff_max = backoff_max
+    self.headers = dict(headers or {})
+
+    self.loop = asyncio.new_event_loop()
+    self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+    self.thread.start()
+
+    self.session = None
+    self.semaphore = None
+    self.call(self._open())
+
+  async def _open(self):
+    connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+    self.session = aiohttp.ClientSession(
+      connector=connector,
+      headers=self.headers,
+      timeout=aiohttp.ClientTimeout(total=self.timeout))
+    self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+  def backoff(self, attempt):
+    """
+    "Full jitter" backoff: uniform in [0, min(max, base * 2^attempt)],
+    so retrying clients spread out instead of retrying in lockstep.
+    """
+    return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+  ##################################################################
+  #
+  # async API
+  #
+  async def request(self, method, url, json_body=None, params=None,
+                    headers=None, retries=None, timeout=None, data=None):
+    """
+    Sends one request, retrying on connection errors, timeouts and
+    non-final status codes.
+
+    Parameters
+    ----------
+    method: "GET", "POST", ...
+    url: full url
+    json_body: optional object sent as JSON
+    params: optional query string parameters
+    headers: optional request headers
+    retries: attempts, default self.retries for GET and 1 otherwise
+      (a POST that reached the server must not be repeated)
+    timeout: optional per-request timeout override, in seconds
+    data: optional raw bytes sent as the body (instead of json_body)
+
+    Returns
+    -------
+    Response
+    """
+    if retries is None:
+      retries = self.retries if method == "GET" else 1
+
+    kwargs = {"json": json_body, "params": params, "headers": headers}
+    if data is not None:
+      kwargs["data"] = data
+    if timeout is not None:
+      kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+
+    attempt = 0
+    while True:
+      try:
+        async with self.semaphore:
+          async with self.session.request(method, url, **kwargs) as res:
+            text = await res.text()
+            response = Response(res.status, res.headers, text)
+
+        if response.status_code in FINAL_STATUS or attempt + 1 >= retries:
+          return response
+
+      except (aiohttp.ClientError, asyncio.TimeoutError):
+        if attempt + 1 >= retries:
+          raise
+
+      await asyncio.sleep(self.backoff(attempt))
+      attempt += 1
+
+  async def get(self, url, headers=None, params=None):
+    return await self.request("GET", url, params=params, headers=headers)
+
+  async def post(self, url, payload):
+    return await self.request("POST", url, json_body=payload,
+                              headers={"Content-Type": "application/json"})
+
+  async def post_bytes(self, url, data, content_type="application/octet-stream"):
+    """
+    POSTs raw bytes, no base64 or JSON wrapping (about 25% smaller
+    than a base64 JSON body, and nothing to decode on the server).
+    """
+    return await self.request("POST", url, data=data,
+                              headers={"Content-Type": content_type})
+
+  async def upload(self, baseurl, images):
+    """
+    POST /upload; images is one entry or a list of them, each entry
+    a base64 string or {"qr_text": ...} for a QR code already decoded
+    on the client.
+    """
+    if isinstance(images, dict):
+      return await self.post(baseurl + "/upload", images)
+    if isinstance(images, list):
+      return await self.post(baseurl + "/upload", {"images": images})
+    return await self.post(baseurl + "/upload", {"image": images})
+
+  async def inventory(self, baseurl, limit=None, after=None, etag=None):
+    params = {}
+    if limit is not None:
+      params["limit"] = limit
+    if after is not None:
+      params["after"] = after
+    headers = {"If-None-Match": etag} if etag else None
+    return await self.get(baseurl + "/inventory", headers=headers, params=params or None)
+
+  async def operation(self, baseurl, op_id):
+    return await self.get(baseurl + "/inventory", params={"op": op_id})
+
+  async def delete(self, baseurl, name, quantity):
+    return await self.post(baseurl + "/inventory", {"name": name, "quantity": quantity})
+
+  async def mealplan(self, baseurl, force_refresh=False, etag=None):
+    params = {"force_refresh": "1"} if force_refresh else None
+    headers = {"If-None-Match": etag} if etag else None
+    return await self.get(baseurl + "/mealplan", headers=headers, params=params)
+
+  async def notify(self, baseurl, email):
+    return await self.post(baseurl + "/notify", {"email": email})
+
+  async def stream(self, url):
+    """
+    Async generator over the text chunks of a streamed GET, yielded
+    as they arrive. Not retried (part of the body may be consumed).
+    """
+    async with self.semaphore:
+      async with self.session.get(url, timeout=aiohttp.ClientTimeout(total=None, sock_read=self.timeout)) as res:
+        if res.status != 200:
+          raise Exception(f"status code {res.status}")
+        # a multi-byte character can be split across chunks
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        async for data in res.content.iter_any():
+          text = decoder.decode(data)
+          if text:
+            yield text
+
+  async def close_async(self):
+    if self.session is not None:
+      await self.session.close()
+
+  ##################################################################
+  #
+  # sync bridge
+  #
+  def submit(self, coro):
+    """
+    Schedules a coroutine on the engine's loop and returns a
+    concurrent.futures.Future, so sync code can start several calls
+    and collect the results later.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+  def call(self, coro):
+    """
+    Runs a coroutine on the engine's loop and waits for its result.
+    """
+    return self.submit(coro).result()
+
+  def get_sync(self, url, headers=None):
+    return self.call(self.get(url, headers=headers))
+
+  def post_sync(self, url, payload):
+    return self.call(self.post(url, payload))
+
+  def post_bytes_sync(self, url, data, content_type="application/octet-stream"):
+    return self.call(self.post_bytes(url, data, content_type))
+
+  def stream_sync(self, url):
+    """
+    Sync generator over stream(url).
+    """
+    agen = self.stream(url)
+    while True:
+      try:
+        yield self.call(agen.__anext__())
+      except StopAsyncIteration:
+        return
+
+  def close(self):
+    self.call(self.close_async())
+    self.loop.call_soon_threadsafe(self.loop.stop)
+    self.thread.join()
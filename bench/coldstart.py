@@ -0,0 +1,143 @@
+#
+# coldstart.py
+#
+# Cold-start cost of each lambda, measured in fresh interpreters:
+#
+#   imports   python -X importtime of lambda_function: its cumulative
+#             import time and its heaviest direct imports
+#   handler   time to import lambda_function (the init phase), the
+#             first lambda_handler call (cold) and the median of the
+#             following calls (warm)
+#
+# Without --user the handlers get an unauthenticated request, which
+# returns 401 before any database or network access, so only init and
+# handler overhead are measured. With --user they run the real request
+# against the services in mealapp-config.ini (e.g. the setup of
+# bench/e2e.py), as that user.
+#
+# Needs datatier.py at the repo root (as for package.bash) and the
+# lambdas' packages installed. Run from the repo root:
+#
+#   python3 bench/coldstart.py [--repeat 5] [--warm 20] [--user ID]
+#
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+here = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(here, '..'))
+
+LAMBDAS = ['inventory', 'inventory_delete', 'notify', 'slashMealplan', 'slashUpload']
+
+# the request each lambda gets with --user
+EVENTS = {
+    'inventory': {'httpMethod': 'GET', 'queryStringParameters': {'limit': '100'}},
+    'inventory_delete': {'httpMethod': 'POST', 'body': json.dumps({'name': 'Milk', 'quantity': 1})},
+    'notify': {'httpMethod': 'POST', 'body': json.dumps({'email': 'bench@example.com', 'days': 3})},
+    'slashMealplan': {'httpMethod': 'GET', 'queryStringParameters': None},
+    'slashUpload': {'httpMethod': 'POST', 'body': json.dumps({'qr_text': 'Milk-10-03-30-1'})},
+}
+
+IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+# runs in the child interpreter: argv = lambda name, event JSON, warm calls
+TIMER = """
+import json, statistics, sys, time
+start = time.perf_counter()
+import lambda_function
+init = time.perf_counter() - start
+event, warm = json.loads(sys.argv[2]), int(sys.argv[3])
+def timed():
+    start = time.perf_counter()
+    response = lambda_function.lambda_handler(dict(event), None)
+    return time.perf_counter() - start, response.get('statusCode')
+cold, status = timed()
+warm_times = [timed()[0] for _ in range(warm)]
+print(json.dumps({'init_ms': init * 1000, 'cold_ms': cold * 1000,
+                  'warm_ms': statistics.median(warm_times) * 1000 if warm_times else None,
+                  'status': status}))
+"""
+
+
+def child_env(name):
+    env = dict(os.environ)
+    paths = [os.path.join(ROOT, name), os.path.join(ROOT, 'shared'), ROOT]
+    if env.get('PYTHONPATH'):
+        paths.append(env['PYTHONPATH'])
+    env['PYTHONPATH'] = os.pathsep.join(paths)
+    return env
+
+
+def import_times(name):
+    """
+    Cumulative import time (ms) of lambda_function and its heaviest
+    direct imports, from python -X importtime.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import lambda_function'],
+                            env=child_env(name), cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    # a module is listed after its imports, each nesting level indented
+    # two more spaces, so lambda_function's direct imports are the
+    # level-2 lines just before its own line
+    children = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        if len(indent) == 3:
+            children.append((int(cumulative_us), module))
+        elif len(indent) == 1:
+            if module == 'lambda_function':
+                heaviest = sorted(children, reverse=True)[:5]
+                return int(cumulative_us) / 1000.0, [(m, us / 1000.0) for us, m in heaviest]
+            children = []
+
+    raise RuntimeError("lambda_function not in the importtime output")
+
+
+def handler_times(name, event, warm):
+    result = subprocess.run([sys.executable, '-c', TIMER, name, json.dumps(event), str(warm)],
+                            env=child_env(name), cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="lambda cold-start measurements")
+    parser.add_argument('--lambdas', default=",".join(LAMBDAS))
+    parser.add_argument('--repeat', type=int, default=5, help="fresh interpreters per lambda, medians shown")
+    parser.add_argument('--warm', type=int, default=20, help="warm calls per interpreter")
+    parser.add_argument('--user', help="run real requests as this user (needs the configured services)")
+    args = parser.parse_args()
+
+    print(f"{'lambda':17} {'imports ms':>10} {'init ms':>8} {'cold ms':>8} {'warm ms':>8} {'status':>6}  heaviest imports")
+    for name in args.lambdas.split(','):
+        event = dict(EVENTS[name]) if args.user else {'httpMethod': 'POST', 'body': '{}'}
+        if args.user:
+            event['requestContext'] = {'authorizer': {'claims': {'sub': args.user}}}
+
+        try:
+            imports = [import_times(name) for _ in range(args.repeat)]
+            runs = [handler_times(name, event, args.warm) for _ in range(args.repeat)]
+        except RuntimeError as err:
+            print(f"{name:17} failed: {err}")
+            continue
+
+        total = statistics.median(t for t, _ in imports)
+        heaviest = ", ".join(f"{module} {ms:.1f}" for module, ms in imports[-1][1])
+        median = {key: statistics.median(r[key] for r in runs) for key in ['init_ms', 'cold_ms', 'warm_ms']}
+        print(f"{name:17} {total:10.1f} {median['init_ms']:8.1f} {median['cold_ms']:8.2f} "
+              f"{median['warm_ms']:8.3f} {runs[-1]['status']:>6}  {heaviest}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,478 @@
+#
+# e2e.py
+#
+# End-to-end benchmark of the whole backend on one machine: the five
+# lambda_handlers run in-process behind a local HTTP router (which also
+# plays the API Gateway authorizer), against a local MySQL seeded from
+# setup.sql and the mocks for api.qrserver.com, OpenAI and SendGrid
+# (mocks/, each with its own latency). Every endpoint is driven at each
+# concurrency level; p50/p95/p99 latency and throughput are printed
+# and saved as JSON so runs can be compared:
+#
+#   docker run -d -p 3306:3306 -e MYSQL_ROOT_PASSWORD=pw mysql:8
+#   python3 bench/e2e.py --db-password pw --setup
+#   python3 bench/e2e.py --db-password pw --compare bench/results/e2e-<earlier>.json
+#
+# --setup runs setup.sql first, which DROPS and recreates the mealapp
+# tables (and its users): only use it on a scratch server. Either way
+# --users bench users ("load-NNNNNN", as in tenants.py) get --items
+# items each. Needs datatier.py at the repo root (as for package.bash)
+# and pymysql, requests and sendgrid installed.
+#
+# --ingest queue runs /upload and consume through the write-behind
+# queue (shared/invqueue.py): their latency is then the enqueue, and
+# the time the queue took to drain after the last request is reported.
+#
+# The lambdas' own output, instrument.py's timing records included,
+# goes to --log; the mean time of each phase per lambda is summarized
+# from it at the end.
+#
+
+import argparse
+import base64
+import datetime
+import importlib.util
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+here = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(here, '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'shared'))
+sys.path.insert(0, os.path.join(ROOT, 'mocks'))
+sys.path.insert(0, here)
+
+import openai_mock
+import qrserver_mock
+import sendgrid_mock
+
+from openai_mock import MockServer
+
+
+# (method, path) -> lambda folder, as deployed behind API Gateway
+ROUTES = {
+    ('GET', '/inventory'): 'inventory',
+    ('POST', '/inventory'): 'inventory_delete',
+    ('POST', '/upload'): 'slashUpload',
+    ('GET', '/mealplan'): 'slashMealplan',
+    ('POST', '/notify'): 'notify',
+    ('GET', '/expiring'): 'notify',
+}
+
+ENDPOINTS = ['inventory', 'consume', 'upload', 'mealplan', 'notify', 'expiring']
+
+
+############################################################
+#
+# router
+#
+
+def load_handler(folder):
+    """
+    Imports <folder>/lambda_function.py under a unique module name and
+    returns its lambda_handler.
+    """
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    spec = importlib.util.spec_from_file_location(folder + '_lambda', os.path.join(path, 'lambda_function.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.lambda_handler
+
+
+def make_event(method, url, headers, body):
+    """
+    The API Gateway proxy event for a request; X-User-Id becomes the
+    authorizer's claims.sub, as a Cognito authorizer would set it.
+    """
+    ctype = headers.get('Content-Type', '').split(';')[0].strip().lower()
+    binary = bool(body) and ctype != 'application/json'
+
+    event = {
+        'httpMethod': method,
+        'path': url.path,
+        'headers': headers,
+        'queryStringParameters': dict(urllib.parse.parse_qsl(url.query)) or None,
+        'body': base64.b64encode(body).decode('ascii') if binary else body.decode('utf-8'),
+        'isBase64Encoded': binary,
+        'requestContext': {}
+    }
+    if headers.get('X-User-Id'):
+        event['requestContext']['authorizer'] = {'claims': {'sub': headers['X-User-Id']}}
+    return event
+
+
+class RouterHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    handlers = {}
+
+    def do_GET(self):
+        self.route('GET')
+
+    def do_POST(self):
+        self.route('POST')
+
+    def route(self, method):
+        url = urllib.parse.urlparse(self.path)
+        handler = self.handlers.get((method, url.path))
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length else b''
+
+        if handler is None:
+            self.reply(404, {}, b'{"error": "no route"}')
+            return
+
+        response = handler(make_event(method, url, dict(self.headers), body), None)
+
+        data = response.get('body') or ''
+        data = base64.b64decode(data) if response.get('isBase64Encoded') else data.encode('utf-8')
+        self.reply(response.get('statusCode', 200), response.get('headers') or {}, data)
+
+    def reply(self, status, headers, data):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_router(handlers, port=0):
+    """
+    Builds (but does not start) the router; handlers maps (method,
+    path) to a lambda_handler.
+    """
+    cls = type('Router', (RouterHandler,), {'handlers': handlers})
+    return MockServer(('localhost', port), cls)
+
+
+############################################################
+#
+# load
+#
+
+def scenarios(users, today):
+    """
+    Request builders per endpoint: request number -> (method, path,
+    body dict or None, user id).
+    """
+    import tenants
+
+    expires = today + datetime.timedelta(days=7)
+
+    def user(i):
+        return tenants.user_name(i % users)
+
+    def food(i):
+        return random.Random(i).choice(tenants.FOODS)
+
+    def upload(i):
+        text = f"{food(i)}-{expires.day:02d}-{expires.month:02d}-{expires.year % 100:02d}-1"
+        image = qrserver_mock.fake_image(text, salt=f"{time.time_ns()}-{i}")
+        return 'POST', '/upload', {'image': base64.b64encode(image).decode('ascii')}, user(i)
+
+    return {
+        'inventory': lambda i: ('GET', '/inventory?limit=100', None, user(i)),
+        'consume': lambda i: ('POST', '/inventory', {'name': food(i), 'quantity': 1}, user(i)),
+        'upload': upload,
+        'mealplan': lambda i: ('GET', '/mealplan?force_refresh=1', None, user(i)),
+        'notify': lambda i: ('POST', '/notify', {'email': 'bench@example.com', 'days': 7}, user(i)),
+        'expiring': lambda i: ('GET', '/expiring?days=7', None, user(i)),
+    }
+
+
+def call(baseurl, method, path, body, user_id):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    request = urllib.request.Request(baseurl + path, data=data, method=method, headers={
+        'Content-Type': 'application/json',
+        'X-User-Id': user_id
+    })
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as err:
+        err.read()
+        status = err.code
+    return status, (time.perf_counter() - start) * 1000.0
+
+
+def percentile(timings, p):
+    return statistics.quantiles(timings, n=100)[p - 1] if len(timings) > 1 else timings[0]
+
+
+def drive(baseurl, build, requests, concurrency, offset):
+    """
+    Sends `requests` requests built by `build`, `concurrency` at a
+    time, and summarizes them.
+    """
+    def one(i):
+        return call(baseurl, *build(offset + i))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    timings = [ms for status, ms in results]
+    statuses = {}
+    for status, ms in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    return {
+        'concurrency': concurrency,
+        'requests': requests,
+        'errors': sum(1 for status, ms in results if status >= 500),
+        'statuses': statuses,
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'mean_ms': round(statistics.mean(timings), 2),
+        'rps': round(requests / elapsed, 1)
+    }
+
+
+############################################################
+#
+# setup and reporting
+#
+
+def write_config(args, urls, pool_size):
+    config = {
+        'rds': {
+            'endpoint': args.db_host,
+            'port_number': str(args.db_port),
+            'user_name': args.db_user,
+            'user_pwd': args.db_password,
+            'db_name': args.db_name,
+            'pool_size': str(pool_size)
+        },
+        'openai': {'url': urls['openai'], 'key': 'bench'},
+        'sendgrid': {'api_key': 'bench', 'host': urls['sendgrid'], 'from_email': 'bench@example.com'},
+        'qr': {'backend': 'qrserver', 'fallback': '', 'qrserver_url': urls['qrserver']},
+        'mealplan_cache': {'backend': 'none'},
+        'ingest': {'mode': args.ingest, 'backend': args.ingest_backend,
+                   'path': os.path.join(tempfile.gettempdir(), f"e2e-ingest-{os.getpid()}.db")},
+    }
+    fd, path = tempfile.mkstemp(prefix='e2e-', suffix='.ini')
+    with os.fdopen(fd, 'w') as f:
+        for section, values in config.items():
+            f.write(f"[{section}]\n")
+            for key, value in values.items():
+                f.write(f"{key} = {value}\n")
+            f.write("\n")
+    return path
+
+
+def run_setup_sql(dbConn):
+    with open(os.path.join(ROOT, 'setup.sql')) as f:
+        lines = [line for line in f if not line.strip().startswith('--')]
+    cursor = dbConn.cursor()
+    for statement in "".join(lines).split(';'):
+        if statement.strip():
+            cursor.execute(statement)
+    dbConn.commit()
+
+
+def phase_means(log_path):
+    """
+    Mean ms of each phase per lambda, from instrument.py's records.
+    """
+    totals = {}
+    with open(log_path) as f:
+        for line in f:
+            if not line.startswith('{"lambda"'):
+                continue
+            record = json.loads(line)
+            if record.get('cold'):
+                continue
+            phases = totals.setdefault(record['lambda'], {})
+            for name, ms in list(record['phases'].items()) + [('total', record['total_ms'])]:
+                phases.setdefault(name, []).append(ms)
+    return {name: {phase: round(statistics.mean(v), 2) for phase, v in phases.items()}
+            for name, phases in totals.items()}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(previous, results, out):
+    before = {(r['endpoint'], r['concurrency']): r for r in previous['results']}
+    print(f"\ncompared with {previous.get('commit')} ({previous.get('when')}):", file=out)
+    for r in results:
+        old = before.get((r['endpoint'], r['concurrency']))
+        if old is None:
+            continue
+        changes = "  ".join(f"{key} {old[key]:.1f} -> {r[key]:.1f} ({(r[key] - old[key]) / old[key]:+.0%})"
+                            for key in ['p50_ms', 'p95_ms', 'p99_ms'] if old[key])
+        print(f"  {r['endpoint']:10} c={r['concurrency']:<3} {changes}", file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="local end-to-end benchmark")
+    parser.add_argument('--db-host', default='127.0.0.1')
+    parser.add_argument('--db-port', type=int, default=3306)
+    parser.add_argument('--db-user', default='root')
+    parser.add_argument('--db-password', default='')
+    parser.add_argument('--db-name', default='mealapp')
+    parser.add_argument('--setup', action='store_true', help="run setup.sql first (drops the tables!)")
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--items', type=int, default=20, help="items per bench user")
+    parser.add_argument('--endpoints', default=",".join(ENDPOINTS))
+    parser.add_argument('--concurrency', default="1,8,32", help="concurrency levels")
+    parser.add_argument('--requests', type=int, default=200, help="requests per endpoint and level")
+    parser.add_argument('--ingest', choices=['sync', 'queue'], default='sync',
+                        help="write uploads and consumes before responding, or queue them")
+    parser.add_argument('--ingest-backend', choices=['sqlite', 'mysql'], default='sqlite')
+    parser.add_argument('--qr-latency', type=float, default=0.3)
+    parser.add_argument('--openai-latency', type=float, default=1.0)
+    parser.add_argument('--sendgrid-latency', type=float, default=0.1)
+    parser.add_argument('--log', default=os.path.join(tempfile.gettempdir(), 'e2e-lambdas.log'))
+    parser.add_argument('--out', help="results file, default bench/results/e2e-<time>.json")
+    parser.add_argument('--compare', help="earlier results file to compare with")
+    args = parser.parse_args()
+
+    out = sys.stdout
+    endpoints = args.endpoints.split(',')
+    levels = [int(c) for c in args.concurrency.split(',')]
+
+    mocks = {
+        'qrserver': qrserver_mock.make_server(0, args.qr_latency),
+        'openai': openai_mock.make_server(0, args.openai_latency),
+        'sendgrid': sendgrid_mock.make_server(0, args.sendgrid_latency),
+    }
+    for server in mocks.values():
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = {name: server.server_address[1] for name, server in mocks.items()}
+    urls = {
+        'qrserver': f"http://localhost:{port['qrserver']}/v1/read-qr-code/",
+        'openai': f"http://localhost:{port['openai']}/v1/chat/completions",
+        'sendgrid': f"http://localhost:{port['sendgrid']}",
+    }
+
+    # every module reads its settings from this file at import
+    os.environ['MEALAPP_CONFIG'] = write_config(args, urls, max(levels))
+
+    import datatier
+    import tenants
+
+    from appconfig import rds_settings
+
+    today = datetime.date.today()
+
+    if args.setup:
+        # setup.sql creates the database, so connect without one
+        print("running setup.sql", file=out)
+        dbConn = datatier.get_dbConn(*rds_settings()[:4], None)
+        try:
+            run_setup_sql(dbConn)
+        finally:
+            dbConn.close()
+
+    dbConn = datatier.get_dbConn(*rds_settings())
+    try:
+        print(f"seeding {args.users} users with {args.items} items", file=out)
+        tenants.populate(dbConn, 0, args.users, args.items, today)
+    finally:
+        dbConn.close()
+
+    log = open(args.log, 'w')
+    sys.stdout = log
+    try:
+        loaded = {folder: load_handler(folder) for folder in set(ROUTES.values())}
+        handlers = {route: loaded[folder] for route, folder in ROUTES.items()}
+        router = make_router(handlers)
+        threading.Thread(target=router.serve_forever, daemon=True).start()
+        baseurl = f"http://localhost:{router.server_address[1]}"
+
+        builders = scenarios(args.users, today)
+        results = []
+        offset = 0
+
+        print(f"\n{'endpoint':10} {'conc':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} {'errors':>7}",
+              file=out)
+        for endpoint in endpoints:
+            # first call per lambda is its cold start, kept out of the stats
+            status, cold_ms = call(baseurl, *builders[endpoint](offset))
+            offset += 1
+            for concurrency in levels:
+                result = drive(baseurl, builders[endpoint], args.requests, concurrency, offset)
+                offset += args.requests
+                result = dict(endpoint=endpoint, cold_ms=round(cold_ms, 2), **result)
+                results.append(result)
+                print(f"{endpoint:10} {concurrency:4} {result['p50_ms']:9.1f} {result['p95_ms']:9.1f} "
+                      f"{result['p99_ms']:9.1f} {result['rps']:8.1f} {result['errors']:7}", file=out)
+
+        drain_s = None
+        if args.ingest == 'queue':
+            import invqueue
+
+            queue = invqueue.open_queue()
+            start = time.perf_counter()
+            while queue.pending():
+                time.sleep(0.05)
+            drain_s = round(time.perf_counter() - start, 3)
+            print(f"\nqueue drained {drain_s} s after the last request", file=out)
+    finally:
+        sys.stdout = out
+        log.close()
+
+    phases = phase_means(args.log)
+    print("\nmean phase ms per lambda (warm invocations):", file=out)
+    for name, means in phases.items():
+        print(f"  {name:16} " + "  ".join(f"{phase} {ms}" for phase, ms in means.items()), file=out)
+
+    settings = {key: value for key, value in vars(args).items() if key != 'db_password'}
+    report = {
+        'when': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'settings': settings,
+        'results': results,
+        'phases': phases,
+        'drain_s': drain_s
+    }
+
+    path = args.out or os.path.join(here, 'results', f"e2e-{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults saved to {path}", file=out)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results, out)
+
+    os.remove(os.environ['MEALAPP_CONFIG'])
+    if args.ingest == 'queue' and args.ingest_backend == 'sqlite':
+        for suffix in ['', '-wal', '-shm']:
+            queue_file = os.path.join(tempfile.gettempdir(), f"e2e-ingest-{os.getpid()}.db{suffix}")
+            if os.path.exists(queue_file):
+                os.remove(queue_file)
+
+
+if __name__ == '__main__':
+    main()
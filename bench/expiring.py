@@ -0,0 +1,157 @@
+#
+# expiring.py
+#
+# Cost of the expiring-items read (notify's digest, GET /expiring) as
+# one user's inventory grows. Each size gets its own user whose
+# inventory has --expiring lots within the window and the rest months
+# or years out. For every size it prints p50/p95 of the query and the
+# index entries it read (Handler_read_* counters), once through the
+# covering (user_id, expiry, name, quantity) index and once with the
+# index ignored, i.e. scanning the user's whole inventory. With the
+# index both numbers stay flat across sizes.
+#
+# Needs a database created with setup.sql (or migrated to
+# migrations/009), datatier.py at the repo root and mealapp-config.ini
+# ([rds] settings; MEALAPP_CONFIG points elsewhere). Run from the
+# repo root:
+#
+#   python3 bench/expiring.py --sizes 1000,10000,100000 --expiring 20
+#   python3 bench/expiring.py --cleanup
+#
+
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+sys.path.insert(0, os.path.join(here, '..', 'shared'))
+
+import datatier
+
+from appconfig import rds_settings
+
+
+PREFIX = "expiring-"
+CHUNK = 1000        # rows per INSERT statement
+
+# the query of notify.expiring_items
+QUERY = """
+    SELECT name, quantity, expiry FROM lots {}
+    WHERE user_id = %s AND expiry <= %s
+    ORDER BY expiry, name"""
+
+
+def user_name(size):
+    return f"{PREFIX}{size}"
+
+
+def populate(dbConn, size, expiring, days, today):
+    """
+    Gives the user of this size `size` lots, `expiring` of them within
+    `days` days.
+    """
+    rng = random.Random(size)
+    cursor = dbConn.cursor()
+    rows = []
+    for i in range(size):
+        if i < expiring:
+            expires = today + datetime.timedelta(days=rng.randint(0, days))
+        else:
+            expires = today + datetime.timedelta(days=rng.randint(days + 30, days + 3000))
+        rows.append((user_name(size), f"Item{i:07d}", rng.randint(1, 12),
+                     expires.day, expires.month, expires.year))
+
+    for start in range(0, len(rows), CHUNK):
+        chunk = rows[start:start + CHUNK]
+        sql = ("INSERT IGNORE INTO lots (user_id, name, quantity, day, month, year) VALUES "
+               + ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(chunk)))
+        cursor.execute(sql, [value for row in chunk for value in row])
+        dbConn.commit()
+
+
+def handler_reads(dbConn):
+    rows = datatier.retrieve_all_rows(dbConn, "SHOW SESSION STATUS LIKE 'Handler_read%%'")
+    return sum(int(value) for name, value in rows)
+
+
+def percentile(timings, p):
+    return statistics.quantiles(timings, n=100)[p - 1] if len(timings) > 1 else timings[0]
+
+
+def measure(dbConn, sql, params, samples):
+    """
+    Returns (p50 ms, p95 ms, rows returned, index/row entries read per
+    query).
+    """
+    timings = []
+    before = handler_reads(dbConn)
+    for _ in range(samples):
+        start = time.perf_counter()
+        rows = datatier.retrieve_all_rows(dbConn, sql, params)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    # SHOW STATUS itself reads a few handler rows, small next to these
+    reads = (handler_reads(dbConn) - before) / samples
+    return percentile(timings, 50), percentile(timings, 95), len(rows), reads
+
+
+def explain(dbConn, sql, params):
+    row = datatier.retrieve_one_row(dbConn, "EXPLAIN " + sql, params)
+    # EXPLAIN columns: id, select_type, table, partitions, type, possible_keys, key, key_len, ref, rows, filtered, Extra
+    return f"type={row[4]} key={row[6]} rows={row[9]} extra={row[11]}"
+
+
+def cleanup(dbConn):
+    while True:
+        deleted = datatier.perform_action(dbConn,
+            "DELETE FROM lots WHERE user_id LIKE %s LIMIT 10000", [PREFIX + "%"])
+        if deleted <= 0:
+            break
+    print("removed the benchmark users")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="expiring-items query cost by inventory size")
+    parser.add_argument('--sizes', default="1000,10000,100000", help="lots per user")
+    parser.add_argument('--expiring', type=int, default=20, help="lots within the window")
+    parser.add_argument('--days', type=int, default=3, help="the window, as in /expiring?days=N")
+    parser.add_argument('--samples', type=int, default=200, help="queries timed per size")
+    parser.add_argument('--cleanup', action='store_true', help="remove the generated users and exit")
+    args = parser.parse_args()
+
+    dbConn = datatier.get_dbConn(*rds_settings())
+    today = datetime.date.today()
+    cutoff = today + datetime.timedelta(days=args.days)
+
+    try:
+        if args.cleanup:
+            cleanup(dbConn)
+            return
+
+        plans = {
+            "expiry index": QUERY.format(""),
+            "no index (scan)": QUERY.format("IGNORE INDEX (idx_lots_user_expiry)"),
+        }
+
+        print(f"{'lots':>8} {'plan':16} {'p50 ms':>8} {'p95 ms':>8} {'returned':>9} {'read':>9}")
+        for size in [int(s) for s in args.sizes.split(',')]:
+            populate(dbConn, size, args.expiring, args.days, today)
+            params = [user_name(size), cutoff]
+            for label, sql in plans.items():
+                p50, p95, returned, reads = measure(dbConn, sql, params, args.samples)
+                print(f"{size:8} {label:16} {p50:8.2f} {p95:8.2f} {returned:9} {reads:9.0f}")
+
+        print("query plans:")
+        for label, sql in plans.items():
+            print(f"  {label:16} {explain(dbConn, sql, [user_name(size), cutoff])}")
+
+    finally:
+        dbConn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#
+# items.py
+#
+# Memory and serialization cost of a large inventory, offline: the
+# rows GET /inventory sent until now ([name, quantity, day, month,
+# year, lots] per item) read into the client's old dict-backed Item,
+# against the columnar form and invitem.InventoryItem (see
+# shared/invitem.py). For each size it prints
+#
+#   bytes     the JSON body, plain and gzip-compressed
+#   encode    the lambda's side: the body from the rows the database
+#             returns, serialized with json.dumps
+#   decode    json.loads plus building the client's objects
+#   memory    bytes held by the client's objects (tracemalloc)
+#   days      computing every item's days left, as the meal planner
+#             and the client's listing do
+#
+# Run from the repo root:
+#
+#   python3 bench/items.py [--sizes 1000,10000,100000] [--repeat 5]
+#
+
+import argparse
+import datetime
+import gc
+import gzip
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..', 'shared'))
+
+import invitem
+
+
+class DictItem:
+    """
+    The client's Item before invitem.py: a plain object with a
+    __dict__, the date as three ints.
+    """
+
+    def __init__(self, row):
+        self.name = row[0]
+        self.quantity = row[1]
+        self.day = row[2]
+        self.month = row[3]
+        self.year = row[4]
+        self.lots = row[5] if len(row) > 5 else 1
+
+
+def make_rows(n, today):
+    rng = random.Random(n)
+    rows = []
+    for i in range(n):
+        expires = today + datetime.timedelta(days=rng.randint(-5, 365))
+        rows.append((f"Item{i:07d}", rng.randint(1, 12), expires.day, expires.month, expires.year,
+                     rng.randint(1, 3)))
+    return rows
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(times), result
+
+
+def held_bytes(build):
+    """
+    Bytes allocated, and still held, by the objects build() returns.
+    """
+    gc.collect()
+    tracemalloc.start()
+    objects = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return size
+
+
+def rows_days_left(items, today):
+    return [(datetime.date(item.year, item.month, item.day) - today).days for item in items]
+
+
+def columns_days_left(items, today):
+    ordinal = today.toordinal()
+    return [item.expiry - ordinal for item in items]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="inventory item memory and serialization benchmark")
+    parser.add_argument('--sizes', default="1000,10000,100000")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per measurement, medians shown")
+    args = parser.parse_args()
+
+    today = datetime.date.today()
+
+    print(f"{'items':>7} {'format':8} {'bytes':>10} {'gzip':>9} {'encode ms':>10} {'decode ms':>10} "
+          f"{'memory':>11} {'days ms':>8}")
+    for n in [int(s) for s in args.sizes.split(',')]:
+        # each row is a fresh list, as from the database driver
+        rows = [list(row) for row in make_rows(n, today)]
+
+        variants = {
+            "rows": (
+                lambda: json.dumps({"items": rows, "next": None}),
+                lambda page: [DictItem(row) for row in page["items"]],
+                rows_days_left),
+            "columns": (
+                lambda: json.dumps({"columns": invitem.rows_to_columns(rows), "next": None}),
+                lambda page: invitem.decode_columns(page["columns"]),
+                columns_days_left),
+        }
+
+        for label, (encode, build, days_left) in variants.items():
+            encode_ms, body = timed(encode, args.repeat)
+            decode_ms, items = timed(lambda: build(json.loads(body)), args.repeat)
+            days_ms, _ = timed(lambda: days_left(items, today), args.repeat)
+            # the item objects only, built from an already parsed page
+            page = json.loads(body)
+            memory = held_bytes(lambda: build(page))
+            compressed = len(gzip.compress(body.encode('utf-8')))
+            print(f"{n:7} {label:8} {len(body):10} {compressed:9} {encode_ms:10.1f} {decode_ms:10.1f} "
+                  f"{memory:11} {days_ms:8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+#
+# tenants.py
+#
+# Load generator for the multi-tenant schema: fills the lots table
+# with many users' items and, at each checkpoint, times the per-user
+# queries the lambdas run. With the (user_id, name, ...) primary key
+# and the (user_id, expiry) index every query reads one user's rows only,
+# so the latencies should stay flat as the table grows.
+#
+# Needs a database created with setup.sql (or migrated to
+# migrations/007), datatier.py at the repo root and mealapp-config.ini
+# ([rds] settings; MEALAPP_CONFIG points elsewhere). Run from the
+# repo root:
+#
+#   python3 bench/tenants.py --users 100000 --items 20
+#   python3 bench/tenants.py --cleanup
+#
+# Rows are inserted with INSERT IGNORE under user ids "load-NNNNNN",
+# so a rerun continues where the last one stopped.
+#
+
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+sys.path.insert(0, os.path.join(here, '..', 'shared'))
+
+import datatier
+
+from appconfig import rds_settings
+
+
+PREFIX = "load-"
+CHUNK = 1000        # rows per INSERT statement
+
+FOODS = ["Apples", "Bananas", "Bread", "Butter", "Carrots", "Cheese", "Chicken",
+         "Eggs", "Fish", "Garlic", "Ham", "Lettuce", "Milk", "Mushrooms", "Onions",
+         "Oranges", "Pasta", "Peppers", "Potatoes", "Rice", "Salmon", "Spinach",
+         "Tofu", "Tomatoes", "Yogurt", "Beef", "Beans", "Broccoli", "Cream", "Lemons"]
+
+#
+# the queries the lambdas run for one user, with their parameters
+#
+QUERIES = {
+    "inventory page": (
+        "SELECT name, CAST(SUM(quantity) AS SIGNED), DAY(MIN(expiry)), MONTH(MIN(expiry)), "
+        "YEAR(MIN(expiry)), COUNT(*) FROM lots "
+        "WHERE user_id = %s GROUP BY name ORDER BY name LIMIT 101",
+        lambda uid, today: [uid]),
+    "expiring (notify)": (
+        "SELECT name, quantity, expiry FROM lots "
+        "WHERE user_id = %s AND expiry <= %s ORDER BY expiry, name",
+        lambda uid, today: [uid, today + datetime.timedelta(days=3)]),
+    "version (etag)": (
+        "SELECT version FROM inventory_version WHERE user_id = %s",
+        lambda uid, today: [uid]),
+}
+
+
+def user_name(i):
+    return f"{PREFIX}{i:06d}"
+
+
+def user_rows(i, items, today):
+    rng = random.Random(i)
+    rows = []
+    for name in rng.sample(FOODS, min(items, len(FOODS))):
+        expires = today + datetime.timedelta(days=rng.randint(-5, 60))
+        rows.append((user_name(i), name, rng.randint(1, 12), expires.day, expires.month, expires.year))
+    return rows
+
+
+def populate(dbConn, start, stop, items, today):
+    cursor = dbConn.cursor()
+    pending = []
+
+    def flush():
+        sql = ("INSERT IGNORE INTO lots (user_id, name, quantity, day, month, year) VALUES "
+               + ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(pending)))
+        cursor.execute(sql, [value for row in pending for value in row])
+        dbConn.commit()
+        pending.clear()
+
+    for i in range(start, stop):
+        pending.extend(user_rows(i, items, today))
+        if len(pending) >= CHUNK:
+            flush()
+        if (i + 1) % 10000 == 0:
+            print(f"  ... {i + 1} users", flush=True)
+    if pending:
+        flush()
+
+
+def percentile(timings, p):
+    return statistics.quantiles(timings, n=100)[p - 1] if len(timings) > 1 else timings[0]
+
+
+def measure(dbConn, users, samples, today):
+    rng = random.Random(users)
+    picks = [user_name(rng.randrange(users)) for _ in range(samples)]
+
+    for label, (sql, params) in QUERIES.items():
+        timings = []
+        for uid in picks:
+            start = time.perf_counter()
+            datatier.retrieve_all_rows(dbConn, sql, params(uid, today))
+            timings.append((time.perf_counter() - start) * 1000.0)
+        print(f"  {label:18} p50 {percentile(timings, 50):7.2f} ms"
+              f"  p95 {percentile(timings, 95):7.2f} ms  p99 {percentile(timings, 99):7.2f} ms")
+
+
+def explain(dbConn, today):
+    for label, (sql, params) in QUERIES.items():
+        row = datatier.retrieve_one_row(dbConn, "EXPLAIN " + sql, params(user_name(0), today))
+        # EXPLAIN columns: id, select_type, table, partitions, type, possible_keys, key, key_len, ref, rows, ...
+        print(f"  {label:18} type={row[4]} key={row[6]} rows={row[9]}")
+
+
+def cleanup(dbConn):
+    for table in ["lots", "inventory_version"]:
+        while True:
+            deleted = datatier.perform_action(dbConn,
+                f"DELETE FROM {table} WHERE user_id LIKE %s LIMIT 10000", [PREFIX + "%"])
+            if deleted <= 0:
+                break
+        print(f"removed load users from {table}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="multi-tenant inventory load generator")
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--items', type=int, default=20, help="items per user")
+    parser.add_argument('--checkpoints', default="1000,10000,100000",
+                        help="user counts at which latencies are measured")
+    parser.add_argument('--samples', type=int, default=500, help="random users timed per checkpoint")
+    parser.add_argument('--cleanup', action='store_true', help="remove the generated users and exit")
+    args = parser.parse_args()
+
+    dbConn = datatier.get_dbConn(*rds_settings())
+    today = datetime.date.today()
+
+    try:
+        if args.cleanup:
+            cleanup(dbConn)
+            return
+
+        checkpoints = sorted({int(c) for c in args.checkpoints.split(',') if int(c) < args.users} | {args.users})
+        loaded = 0
+        for users in checkpoints:
+            print(f"populating users {loaded}..{users - 1} ({args.items} items each)")
+            start = time.perf_counter()
+            populate(dbConn, loaded, users, args.items, today)
+            print(f"  {time.perf_counter() - start:.1f} s")
+            loaded = users
+
+            total = datatier.retrieve_one_row(dbConn, "SELECT COUNT(*) FROM lots")[0]
+            print(f"{users} users, {total} lots; per-user query latency over {args.samples} users:")
+            measure(dbConn, users, args.samples, today)
+
+        print("query plans:")
+        explain(dbConn, today)
+
+    finally:
+        dbConn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,45 +1,180 @@
 import json
-import boto3
-import os
+import base64
+import auth
 import datatier
+import dbpool
+import instrument
+import invitem
+import invqueue
+import invversion
 
-from configparser import ConfigParser
+#
+# GET /inventory?limit=N&after=CURSOR
+#
+# Returns the calling user's items only (see auth.py), one row per
+# item name aggregated over its lots in SQL:
+#
+#   [name, total quantity, day, month, year of the earliest-expiring
+#    lot, number of lots]
+#
+# Keyset pagination on the (user_id, name, ...) primary key: each
+# page is an index range scan starting after the last name of the
+# previous page (grouped in index order, no sort), so
+# the cost of a page does not grow with the page number. The response
+# is {"items": [rows], "next": cursor or null}; pass "next" back as
+# "after" to get the following page.
+#
+# With format=columns the page is {"columns": {"names", "qty",
+# "expiry", "lots"}, "next": cursor or null} instead, one array per
+# field and the date as days since 1970-01-01 (see invitem.py): a
+# large inventory is a fraction of the size on the wire.
+#
+# Each page carries an ETag derived from the inventory version; a
+# request with a matching If-None-Match gets a 304 and no rows are
+# read.
+#
+# GET /inventory?op=ID
+#
+# Status of a queued upload or consume ([ingest] mode = queue, see
+# invqueue.py): {"op_id", "kind", "status": queued, done or failed,
+# "created", "applied"} plus "new_quantity" for a done consume or
+# "error" for a failed operation.
+#
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
 
+TOTALS_SQL = """
+  SELECT name, CAST(SUM(quantity) AS SIGNED) AS quantity,
+         DAY(MIN(expiry)), MONTH(MIN(expiry)), YEAR(MIN(expiry)),
+         COUNT(*) AS lots
+  FROM lots
+  WHERE user_id = %s {}
+  GROUP BY name
+  ORDER BY name
+  LIMIT %s"""
+
+
+def encode_cursor(name):
+  return base64.urlsafe_b64encode(name.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+  return base64.b64decode(cursor.encode("ascii"), altchars=b"-_", validate=True).decode("utf-8")
+
+
+def operation_status(user_id, op):
+  queue = invqueue.open_queue()
+  if queue is None:
+    return {
+      'statusCode': 404,
+      'body': json.dumps('queued writes are not enabled')
+    }
+
+  try:
+    op_id = int(op)
+  except ValueError:
+    return {
+      'statusCode': 400,
+      'body': json.dumps('invalid op parameter')
+    }
+
+  with instrument.span("status"):
+    status = queue.status(user_id, op_id)
+
+  if status is None:
+    return {
+      'statusCode': 404,
+      'body': json.dumps(f'operation {op_id} not found')
+    }
+
+  return {
+    'statusCode': 200,
+    'body': json.dumps(status)
+  }
+
+
+@instrument.handler("inventory")
 def lambda_handler(event, context):
   try:
     print("**STARTING**")
     print("**lambda: proj05_inventory*")
-    
-    config_file = 'mealapp-config.ini'
-    os.environ['AWS_SHARED_CREDENTIALS_FILE'] = config_file
-    
-    configur = ConfigParser()
-    configur.read(config_file)
-    
-    rds_endpoint = configur.get('rds', 'endpoint')
-    rds_portnum = int(configur.get('rds', 'port_number'))
-    rds_username = configur.get('rds', 'user_name')
-    rds_pwd = configur.get('rds', 'user_pwd')
-    rds_dbname = configur.get('rds', 'db_name')
 
+    try:
+      user_id = auth.user_id(event)
+    except auth.AuthError as err:
+      return auth.unauthorized(err)
+
+    params = event.get('queryStringParameters') or {}
+
+    if params.get('op'):
+      return operation_status(user_id, params['op'])
+
+    try:
+      limit = int(params.get('limit', DEFAULT_LIMIT))
+      after = decode_cursor(params['after']) if params.get('after') else None
+    except Exception:
+      return {
+        'statusCode': 400,
+        'body': json.dumps('invalid limit or after parameter')
+      }
+
+    limit = max(1, min(limit, MAX_LIMIT))
+    columns = params.get('format') == 'columns'
+    
     print("**Opening connection**")
     
-    dbConn = datatier.get_dbConn(rds_endpoint, rds_portnum, rds_username, rds_pwd, rds_dbname)
+    dbConn = dbpool.get_dbConn()
     
+    with instrument.span("version"):
+      version = invversion.current_version(dbConn, user_id)
+    etag = invversion.make_etag(version, "inventory", user_id, limit, after, columns)
+
+    if invversion.is_not_modified(event, etag):
+      print("**Not modified, returning 304**")
+      return invversion.not_modified(etag)
+
     print("**Retrieving data**")
 
-    sql = "SELECT * FROM inventory ORDER BY name";
-    
-    rows = datatier.retrieve_all_rows(dbConn, sql)
-    
-    for row in rows:
-      print(row)
+    #
+    # fetch one extra row to know whether there is a next page:
+    #
+    with instrument.span("query"):
+      if after is None:
+        sql = TOTALS_SQL.format("")
+        rows = datatier.retrieve_all_rows(dbConn, sql, [user_id, limit + 1])
+      else:
+        sql = TOTALS_SQL.format("AND name > %s")
+        rows = datatier.retrieve_all_rows(dbConn, sql, [user_id, after, limit + 1])
+
+    rows = list(rows)
+    instrument.count("rows", len(rows))
 
-    print("**DONE, returning rows**")
+    if instrument.DEBUG:
+      for row in rows:
+        print(row)
+
+    next_cursor = None
+    if len(rows) > limit:
+      rows = rows[:limit]
+      next_cursor = encode_cursor(rows[-1][0])
+
+    print(f"**DONE, returning {len(rows)} rows**")
+
+    if columns:
+      page = {
+        'columns': invitem.rows_to_columns(rows),
+        'next': next_cursor
+      }
+    else:
+      page = {
+        'items': rows,
+        'next': next_cursor
+      }
     
     return {
       'statusCode': 200,
-      'body': json.dumps(rows)
+      'headers': {'ETag': etag},
+      'body': json.dumps(page)
     }
     
   except Exception as err:
@@ -50,3 +185,8 @@ def lambda_handler(event, context):
       'statusCode': 500,
       'body': json.dumps(str(err))
     }
+
+  finally:
+    if 'dbConn' in locals():
+      dbpool.release(dbConn)
+      print("**Pool stats**", dbpool.stats())
@@ -1,27 +1,45 @@
 import json
-import os
-import datatier
-from configparser import ConfigParser
-
+import time
+import auth
+import dbpool
+import instrument
+import invmutate
+import invqueue
+
+# [ingest] mode = queue: consumes are queued and applied in batches
+# (see invqueue.py); None writes them before responding
+queue = invqueue.open_queue()
+
+# seconds a scheduled drain leaves itself before the lambda timeout
+DRAIN_MARGIN = 5.0
+
+
+def drain(context):
+    remaining = context.get_remaining_time_in_millis() / 1000.0 if context else 60.0
+    with instrument.span("drain"):
+        summary = invqueue.drain_all(queue, time.monotonic() + remaining - DRAIN_MARGIN)
+    instrument.count("ops", summary['ops'])
+    print("**Scheduled drain**", summary)
+    return {
+        'statusCode': 200,
+        'body': json.dumps(summary)
+    }
+
+
+@instrument.handler("inventory_delete")
 def lambda_handler(event, context):
     try:
         print("**STARTING**")
         print("**lambda: proj05_inventory_delete**")
-        
-        config_file = 'mealapp-config.ini'
-        os.environ['AWS_SHARED_CREDENTIALS_FILE'] = config_file
-        
-        configur = ConfigParser()
-        configur.read(config_file)
-
-        rds_endpoint = configur.get('rds', 'endpoint')
-        rds_portnum = int(configur.get('rds', 'port_number'))
-        rds_username = configur.get('rds', 'user_name')
-        rds_pwd = configur.get('rds', 'user_pwd')
-        rds_dbname = configur.get('rds', 'db_name')
 
-        print("**Opening connection**")
-        dbConn = datatier.get_dbConn(rds_endpoint, rds_portnum, rds_username, rds_pwd, rds_dbname)
+        if queue is not None and event.get('source') == 'aws.events':
+            # EventBridge rule: apply what the containers queued
+            return drain(context)
+
+        try:
+            user_id = auth.user_id(event)
+        except auth.AuthError as err:
+            return auth.unauthorized(err)
 
         print("**Processing request body**")
 
@@ -39,64 +57,55 @@ def lambda_handler(event, context):
                 'statusCode': 400,
                 'body': json.dumps({'error': 'Missing required parameter'})
             }
-
-        select_sql = "SELECT quantity FROM inventory WHERE name = %s"
-        select_params = (item_name,)
-
-        result = datatier.retrieve_all_rows(dbConn, select_sql, select_params)
-
-        if not result:
+        if not isinstance(remove_quantity, int) or remove_quantity <= 0:
             return {
-                'statusCode': 404,
-                'body': json.dumps({'error': f'Item "{item_name}" not found'})
+                'statusCode': 400,
+                'body': json.dumps({'error': 'quantity must be a positive integer'})
             }
-        
-        current_quantity = result[0][0]
-        print(f"**Current quantity of {item_name}: {current_quantity}**")
-
-        new_quantity = current_quantity - remove_quantity
-    
-        if new_quantity <= 0:
-            delete_sql = "DELETE FROM inventory WHERE name = %s"
-            delete_params = (item_name,)
-
-            rows_affected = datatier.perform_action(dbConn, delete_sql, delete_params)
-            if rows_affected == 0:
-                return {
-                    'statusCode': 404,
-                    'body': json.dumps({'error': f'Could not delete "{item_name}". Item not found.'})
-                }
-            
+
+        if queue is not None:
+            with instrument.span("enqueue"):
+                op_id = queue.enqueue(user_id, "consume", [[item_name, remove_quantity]])
             return {
-                'statusCode': 200,
+                'statusCode': 202,
                 'body': json.dumps({
-                    'message': f'Delete.'
+                    'message': f'Removal of {remove_quantity} from "{item_name}" queued.',
+                    'op_id': op_id,
+                    'status': 'queued'
                 })
             }
 
-        else:
-            update_sql = "UPDATE inventory SET quantity = %s WHERE name = %s"
-            update_params = (new_quantity, item_name)
+        print("**Opening connection**")
+        dbConn = dbpool.get_dbConn()
 
-            rows_affected = datatier.perform_action(dbConn, update_sql, update_params)
-            print(f"**Rows affected by update: {rows_affected}**")
+        # one atomic decrement; the row is deleted if it reaches zero
+        with instrument.span("consume"):
+            new_quantity = invmutate.consume(dbConn, user_id, item_name, remove_quantity)
 
-            if rows_affected == 0:
-                return {
-                    'statusCode': 404,
-                    'body': json.dumps({
-                        'error': f'Unable to update. "{item_name}" was not found.'
-                    })
-                }
+        if new_quantity is None:
+            return {
+                'statusCode': 404,
+                'body': json.dumps({'error': f'Item "{item_name}" not found'})
+            }
 
+        print(f"**New quantity of {item_name}: {new_quantity}**")
+
+        if new_quantity == 0:
             return {
                 'statusCode': 200,
                 'body': json.dumps({
-                    'message': f'Successfully removed {remove_quantity} from "{item_name}".',
-                    'new_quantity': new_quantity
+                    'message': f'Delete.'
                 })
             }
 
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'message': f'Successfully removed {remove_quantity} from "{item_name}".',
+                'new_quantity': new_quantity
+            })
+        }
+
     except FileNotFoundError as e:
         print(f"**ERROR: {e}**")
         return {
@@ -112,6 +121,6 @@ def lambda_handler(event, context):
         }
 
     finally:
-        if 'dbConn' in locals() and dbConn is not None:
-            dbConn.close()
-            print("**Database connection closed**")
+        if 'dbConn' in locals():
+            dbpool.release(dbConn)
+            print("**Pool stats**", dbpool.stats())
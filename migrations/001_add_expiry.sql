@@ -0,0 +1,21 @@
+--
+-- 001_add_expiry.sql
+--
+-- Adds the indexed expiry DATE column that notify filters on. It is a
+-- STORED generated column, so MySQL computes it for every existing
+-- row during the ALTER and keeps it in sync with day/month/year on
+-- every insert/update; no handler writes it directly.
+--
+-- Run once against an existing mealapp database:
+--
+--   mysql -h <endpoint> -u admin -p < migrations/001_add_expiry.sql
+--
+
+USE mealapp;
+
+ALTER TABLE inventory
+  ADD COLUMN expiry DATE GENERATED ALWAYS AS
+    (MAKEDATE(year, 1) + INTERVAL (month - 1) MONTH + INTERVAL (day - 1) DAY) STORED,
+  ADD INDEX idx_inventory_expiry (expiry);
+
+SELECT name, day, month, year, expiry FROM inventory ORDER BY expiry;
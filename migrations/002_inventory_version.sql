@@ -0,0 +1,17 @@
+--
+-- 002_inventory_version.sql
+--
+-- Adds the inventory version counter behind the ETags of
+-- GET /inventory and GET /mealplan. /upload and /inventory (delete)
+-- bump it in the same transaction as their write.
+--
+
+USE mealapp;
+
+CREATE TABLE IF NOT EXISTS inventory_version (
+  id TINYINT NOT NULL,
+  version BIGINT NOT NULL,
+  PRIMARY KEY (id)
+);
+
+INSERT IGNORE INTO inventory_version (id, version) VALUES (1, 0);
@@ -0,0 +1,18 @@
+--
+-- 003_mealplan_cache.sql
+--
+-- Table for the shared meal-plan cache ([mealplan_cache] backend =
+-- mysql in mealapp-config.ini). Not needed with the default sqlite
+-- backend.
+--
+
+USE mealapp;
+
+CREATE TABLE IF NOT EXISTS mealplan_cache (
+  cache_key CHAR(64) NOT NULL,
+  plan TEXT NOT NULL,
+  created DATETIME NOT NULL,
+  last_used DATETIME(6) NOT NULL,
+  PRIMARY KEY (cache_key),
+  INDEX idx_mealplan_cache_last_used (last_used)
+);
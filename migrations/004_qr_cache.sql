@@ -0,0 +1,17 @@
+--
+-- 004_qr_cache.sql
+--
+-- Table for the shared decoded-QR cache ([qr_cache] database = true
+-- in mealapp-config.ini). Not needed with the default in-memory
+-- cache. Rows are never updated (the same image always decodes to
+-- the same text); prune by `created` if the table grows too large.
+--
+
+USE mealapp;
+
+CREATE TABLE IF NOT EXISTS qr_cache (
+  image_hash CHAR(64) NOT NULL,
+  qr_text VARCHAR(255) NOT NULL,
+  created DATETIME NOT NULL,
+  PRIMARY KEY (image_hash)
+);
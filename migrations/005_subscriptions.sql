@@ -0,0 +1,15 @@
+--
+-- 005_subscriptions.sql
+--
+-- Recipients of the scheduled expiry digest (notify, action
+-- "send_all" or an EventBridge schedule).
+--
+
+USE mealapp;
+
+CREATE TABLE IF NOT EXISTS subscriptions (
+  email VARCHAR(255) NOT NULL,
+  days INT NOT NULL DEFAULT 3,
+  created DATETIME NOT NULL,
+  PRIMARY KEY (email)
+);
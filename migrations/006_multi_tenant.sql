@@ -0,0 +1,44 @@
+--
+-- 006_multi_tenant.sql
+--
+-- Adds the user_id dimension. Existing rows (from the single-user
+-- schema) are assigned to the user 'default'; move them to a real
+-- user id with
+--
+--   UPDATE inventory SET user_id = '<id>' WHERE user_id = 'default';
+--   UPDATE inventory_version SET user_id = '<id>' WHERE user_id = 'default';
+--   UPDATE subscriptions SET user_id = '<id>' WHERE user_id = 'default';
+--
+
+USE mealapp;
+
+ALTER TABLE inventory
+  ADD COLUMN user_id VARCHAR(64) NOT NULL DEFAULT 'default' FIRST,
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (user_id, name),
+  DROP INDEX idx_inventory_expiry,
+  ADD INDEX idx_inventory_user_expiry (user_id, expiry);
+
+ALTER TABLE inventory ALTER COLUMN user_id DROP DEFAULT;
+
+-- one version counter per user, carrying over the global one
+CREATE TABLE inventory_version_new (
+  user_id VARCHAR(64) NOT NULL,
+  version BIGINT NOT NULL,
+  PRIMARY KEY (user_id)
+);
+
+INSERT INTO inventory_version_new (user_id, version)
+  SELECT 'default', version FROM inventory_version WHERE id = 1;
+
+RENAME TABLE inventory_version TO inventory_version_old,
+             inventory_version_new TO inventory_version;
+
+DROP TABLE inventory_version_old;
+
+ALTER TABLE subscriptions
+  ADD COLUMN user_id VARCHAR(64) NOT NULL DEFAULT 'default' FIRST,
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (user_id, email);
+
+ALTER TABLE subscriptions ALTER COLUMN user_id DROP DEFAULT;
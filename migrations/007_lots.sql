@@ -0,0 +1,29 @@
+--
+-- 007_lots.sql
+--
+-- Replaces the inventory table (one row per item, keeping the first
+-- upload's date) with lots (one row per item and expiration date).
+-- Every existing row becomes one lot. FIFO consumption uses window
+-- functions, so this needs MySQL 8.0+.
+--
+
+USE mealapp;
+
+CREATE TABLE IF NOT EXISTS lots (
+  user_id VARCHAR(64) NOT NULL,
+  name VARCHAR(64) NOT NULL,
+  quantity INT NOT NULL,
+  day INT NOT NULL,
+  month INT NOT NULL,
+  year INT NOT NULL,
+  expiry DATE GENERATED ALWAYS AS
+    (MAKEDATE(year, 1) + INTERVAL (month - 1) MONTH + INTERVAL (day - 1) DAY) STORED,
+  PRIMARY KEY (user_id, name, year, month, day),
+  INDEX idx_lots_user_expiry (user_id, expiry)
+);
+
+INSERT INTO lots (user_id, name, quantity, day, month, year)
+  SELECT user_id, name, quantity, day, month, year FROM inventory
+  WHERE quantity > 0;
+
+DROP TABLE inventory;
@@ -0,0 +1,22 @@
+--
+-- 008_ingest_queue.sql
+--
+-- Write-behind queue of inventory mutations ([ingest] mode = queue
+-- with backend = mysql, see shared/invqueue.py). Not needed with the
+-- default sync mode or the sqlite backend.
+--
+
+USE mealapp;
+
+CREATE TABLE IF NOT EXISTS ingest_queue (
+  op_id BIGINT NOT NULL AUTO_INCREMENT,
+  user_id VARCHAR(64) NOT NULL,
+  kind VARCHAR(16) NOT NULL,
+  changes TEXT NOT NULL,
+  status VARCHAR(16) NOT NULL,
+  result TEXT NULL,
+  created DATETIME(6) NOT NULL,
+  applied DATETIME(6) NULL,
+  PRIMARY KEY (op_id),
+  INDEX idx_ingest_queue_status (status, op_id)
+);
@@ -0,0 +1,17 @@
+--
+-- 009_expiry_index.sql
+--
+-- Widens the (user_id, expiry) index of lots to (user_id, expiry,
+-- name, quantity). It covers the expiring-items query of notify and
+-- GET /expiring, in its (expiry, name) order: a user's lots expiring
+-- within N days are one range of the index, read without visiting
+-- the rows or sorting, so the cost depends on how many lots expire,
+-- not on how many the user has. MySQL keeps it current in the
+-- transaction of every upload and consume.
+--
+
+USE mealapp;
+
+ALTER TABLE lots
+  DROP INDEX idx_lots_user_expiry,
+  ADD INDEX idx_lots_user_expiry (user_id, expiry, name, quantity);
@@ -0,0 +1,101 @@
+#
+# mealplan_stream_server.py
+#
+# Local streaming front end for slashMealplan.stream_handler: serves
+# GET /mealplan with chunked transfer encoding, writing each chunk as
+# the handler yields it. Use it with mocks/openai_mock.py to try the
+# client's streaming mode without AWS:
+#
+#   python3 mocks/openai_mock.py --port 8081 &
+#   MEALAPP_CONFIG=local-config.ini python3 mocks/mealplan_stream_server.py --port 8082
+#
+# where local-config.ini has [openai] url = http://localhost:8081/...
+# and an [rds] section for a local MySQL ([auth] trust_header = true
+# lets the client pick the user with X-User-Id). With --fake the
+# handler is replaced by a canned plan so not even a database is
+# needed.
+#
+
+import argparse
+import os
+import sys
+import time
+import urllib.parse
+
+from http.server import BaseHTTPRequestHandler
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, here)
+
+from openai_mock import MockServer
+
+
+def fake_stream_handler(token_delay):
+    import openai_mock
+
+
+    def handler(event, context):
+        for word in openai_mock.PLAN.split(' '):
+            time.sleep(token_delay)
+            yield word + ' '
+    return handler
+
+
+def load_stream_handler():
+    sys.path.insert(0, os.path.join(here, '..', 'slashMealplan'))
+    sys.path.insert(0, os.path.join(here, '..', 'shared'))
+    import lambda_function
+    return lambda_function.stream_handler
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    handler = None
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        if url.path != '/mealplan':
+            self.send_error(404)
+            return
+
+        event = {
+            'httpMethod': 'GET',
+            'path': url.path,
+            'headers': dict(self.headers),
+            'queryStringParameters': dict(urllib.parse.parse_qsl(url.query)) or None
+        }
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        for text in type(self).handler(event, None):
+            data = text.encode('utf-8')
+            if data:
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+                self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(handler, port=0):
+    cls = type('Handler', (StreamHandler,), {'handler': staticmethod(handler)})
+    return MockServer(('localhost', port), cls)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="local streaming /mealplan server")
+    parser.add_argument('--port', type=int, default=8082)
+    parser.add_argument('--fake', action='store_true', help="canned plan, no database or OpenAI")
+    parser.add_argument('--token-delay', type=float, default=0.05)
+    args = parser.parse_args()
+
+    handler = fake_stream_handler(args.token_delay) if args.fake else load_stream_handler()
+
+    server = make_server(handler, args.port)
+    print(f"streaming /mealplan on http://localhost:{args.port}/mealplan")
+    server.serve_forever()
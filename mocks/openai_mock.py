@@ -0,0 +1,142 @@
+#
+# openai_mock.py
+#
+# Local stand-in for POST /v1/chat/completions, buffered or streamed
+# (server-sent events, like the real API with "stream": true). Point
+# slashMealplan at it with
+#
+#   [openai]
+#   url = http://localhost:8081/v1/chat/completions
+#
+# and run:
+#
+#   python3 mocks/openai_mock.py --port 8081 --latency 0.5 --token-delay 0.02
+#
+# --latency is the wait before the first token, --token-delay the gap
+# between tokens, so time-to-first-token and total time can be tuned.
+# --prompt-delay adds a wait per 1000 prompt tokens (estimated at 4
+# characters each), so longer prompts answer later like the real API.
+#
+
+import argparse
+import json
+import sys
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+PLAN = ("Day 1: Scrambled eggs with toast, apple slices. "
+        "Day 2: Roast chicken with bread and a glass of milk. "
+        "Day 3: Apple and egg salad, chicken sandwiches.")
+
+
+class OpenAIMockHandler(BaseHTTPRequestHandler):
+
+    latency = 0.0
+    token_delay = 0.0
+    prompt_delay = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+
+        prompt_chars = sum(len(m.get('content', '')) for m in request.get('messages', []))
+        prompt_tokens = -(-prompt_chars // 4)
+
+        time.sleep(self.latency + self.prompt_delay * prompt_tokens / 1000.0)
+
+        words = PLAN.split(' ')
+        max_tokens = int(request.get('max_tokens', len(words)))
+        tokens = [w + ' ' for w in words[:max_tokens]]
+
+        if not request.get('stream'):
+            for _ in tokens:
+                time.sleep(self.token_delay)
+            self.send_json({
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "model": request.get('model', 'mock'),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(tokens),
+                    "total_tokens": prompt_tokens + len(tokens)
+                }
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        for token in tokens:
+            event = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+            }
+            self.write_chunk(f"data: {json.dumps(event)}\n\n")
+            time.sleep(self.token_delay)
+
+        self.write_chunk("data: [DONE]\n\n")
+        self.write_chunk("")
+
+    def send_json(self, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def write_chunk(self, text):
+        data = text.encode('utf-8')
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients dropping keep-alive connections is normal here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def make_server(port=0, latency=0.0, token_delay=0.0, prompt_delay=0.0):
+    """
+    Builds (but does not start) a mock server; port 0 picks a free
+    port, read it back from server.server_address.
+    """
+    handler = type('Handler', (OpenAIMockHandler,), {
+        'latency': latency,
+        'token_delay': token_delay,
+        'prompt_delay': prompt_delay,
+        'protocol_version': 'HTTP/1.1'
+    })
+    return MockServer(('localhost', port), handler)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="mock OpenAI chat completions server")
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--token-delay', type=float, default=0.02)
+    parser.add_argument('--prompt-delay', type=float, default=0.0,
+                        help="extra seconds per 1000 prompt tokens")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency, args.token_delay, args.prompt_delay)
+    print(f"mock OpenAI on http://localhost:{args.port}/v1/chat/completions")
+    server.serve_forever()
@@ -0,0 +1,95 @@
+#
+# qrserver_mock.py
+#
+# Local stand-in for api.qrserver.com's POST /v1/read-qr-code/, for
+# testing and benchmarking /upload without the remote round trip.
+# Point slashUpload at it with
+#
+#   [qr]
+#   backend = qrserver
+#   qrserver_url = http://localhost:8084/v1/read-qr-code/
+#
+# and run:
+#
+#   python3 mocks/qrserver_mock.py --port 8084 --latency 0.3
+#
+# It does not scan images: the "image" is any file containing
+# QR:<text>; (see fake_image), which is answered like a scanned code.
+# Anything else gets the service's "no QR code found" answer.
+#
+
+import argparse
+import json
+import re
+import time
+
+from http.server import BaseHTTPRequestHandler
+
+from openai_mock import MockServer
+
+
+MARKER = re.compile(rb"QR:([^;]*);")
+
+
+def fake_image(text, salt=""):
+    """
+    Bytes the mock decodes to `text`; a different salt gives different
+    bytes (a different image hash) for the same text.
+    """
+    return f"QR:{text};{salt}".encode('utf-8')
+
+
+class QRServerMockHandler(BaseHTTPRequestHandler):
+
+    latency = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+
+        time.sleep(self.latency)
+
+        if not self.path.startswith('/v1/read-qr-code'):
+            self.send_json(404, {"error": "not found"})
+            return
+
+        match = MARKER.search(body)
+        if match:
+            symbol = {"seq": 0, "data": match.group(1).decode('utf-8'), "error": None}
+        else:
+            symbol = {"seq": 0, "data": None, "error": "could not find/read QR Code"}
+        self.send_json(200, [{"type": "qrcode", "symbol": [symbol]}])
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(port=0, latency=0.0):
+    """
+    Builds (but does not start) a mock server; port 0 picks a free
+    port, read it back from server.server_address.
+    """
+    handler = type('Handler', (QRServerMockHandler,), {
+        'latency': latency,
+        'protocol_version': 'HTTP/1.1'
+    })
+    return MockServer(('localhost', port), handler)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="mock api.qrserver.com read-qr-code server")
+    parser.add_argument('--port', type=int, default=8084)
+    parser.add_argument('--latency', type=float, default=0.3)
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency)
+    print(f"mock qrserver on http://localhost:{args.port}/v1/read-qr-code/")
+    server.serve_forever()
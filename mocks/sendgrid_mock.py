@@ -0,0 +1,119 @@
+#
+# sendgrid_mock.py
+#
+# Local stand-in for SendGrid's POST /v3/mail/send, for testing and
+# benchmarking notify without sending real email. Point notify at it
+# with
+#
+#   [sendgrid]
+#   api_key = anything
+#   host = http://localhost:8083
+#
+# and run:
+#
+#   python3 mocks/sendgrid_mock.py --port 8083 --latency 0.1
+#
+# Like the real API it answers 202 with an empty body, and 400 for
+# more than 1000 personalizations. GET /stats returns the number of
+# send calls and recipients seen so far.
+#
+
+import argparse
+import json
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+MAX_PERSONALIZATIONS = 1000
+
+
+class SendGridMockHandler(BaseHTTPRequestHandler):
+
+    latency = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+
+        time.sleep(self.latency)
+
+        if self.path != '/v3/mail/send':
+            self.send_json(404, {"errors": [{"message": "not found"}]})
+            return
+
+        personalizations = request.get('personalizations', [])
+        if not 1 <= len(personalizations) <= MAX_PERSONALIZATIONS:
+            self.send_json(400, {"errors": [{
+                "message": f"personalizations must have 1 to {MAX_PERSONALIZATIONS} items",
+                "field": "personalizations"
+            }]})
+            return
+
+        recipients = sum(len(p.get('to', [])) for p in personalizations)
+        with self.server.lock:
+            self.server.stats["calls"] += 1
+            self.server.stats["recipients"] += recipients
+
+        self.send_response(202)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path != '/stats':
+            self.send_json(404, {"errors": [{"message": "not found"}]})
+            return
+        with self.server.lock:
+            self.send_json(200, dict(self.server.stats))
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "recipients": 0}
+
+    def handle_error(self, request, client_address):
+        # clients dropping keep-alive connections is normal here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def make_server(port=0, latency=0.0):
+    """
+    Builds (but does not start) a mock server; port 0 picks a free
+    port, read it back from server.server_address. Counters are in
+    server.stats.
+    """
+    handler = type('Handler', (SendGridMockHandler,), {
+        'latency': latency,
+        'protocol_version': 'HTTP/1.1'
+    })
+    return MockServer(('localhost', port), handler)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="mock SendGrid mail send server")
+    parser.add_argument('--port', type=int, default=8083)
+    parser.add_argument('--latency', type=float, default=0.1)
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency)
+    print(f"mock SendGrid on http://localhost:{args.port}/v3/mail/send")
+    server.serve_forever()
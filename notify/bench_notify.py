@@ -0,0 +1,89 @@
+#
+# bench_notify.py
+#
+# Offline throughput of the digest sends against mocks/sendgrid_mock.py
+# (started in-process, nothing leaves the machine). Compares
+#
+#   per-recipient  a new SendGrid client and one API call per email
+#                  (how /notify used to send)
+#   batched        one client, up to 1000 personalizations per call
+#                  (digest.send, used by the scheduled mode)
+#
+# Run from the repo root:
+#
+#   python3 notify/bench_notify.py [-n 2000] [--latency 0.02]
+#
+
+import argparse
+import datetime
+import os
+import sys
+import threading
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, here)
+sys.path.insert(0, os.path.join(here, '..', 'shared'))
+sys.path.insert(0, os.path.join(here, '..', 'mocks'))
+
+import sendgrid_mock
+
+from appconfig import configur
+
+
+def main():
+    parser = argparse.ArgumentParser(description="notify fan-out throughput")
+    parser.add_argument('-n', '--recipients', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help="mock SendGrid latency per call, seconds")
+    parser.add_argument('--per-recipient-max', type=int, default=200,
+                        help="recipients timed in per-recipient mode (extrapolated)")
+    args = parser.parse_args()
+
+    server = sendgrid_mock.make_server(0, args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f"http://localhost:{server.server_address[1]}"
+
+    configur.read_dict({'sendgrid': {'api_key': 'bench', 'host': host}})
+
+    import digest
+    from sendgrid import SendGridAPIClient
+
+    today = datetime.date.today()
+    items = [{'name': f'item{i}', 'quantity': i % 5 + 1,
+              'expires': today + datetime.timedelta(days=i % 3)} for i in range(25)]
+    recipients = [f'user{i}@example.com' for i in range(args.recipients)]
+    subject, body_text = digest.render(items, 3)
+
+    print(f"{len(recipients)} recipients, mock latency {args.latency * 1000:.0f} ms per call")
+
+    # per-recipient: the old path
+    sample = recipients[:args.per_recipient_max]
+    start = time.perf_counter()
+    for email in sample:
+        client = SendGridAPIClient('bench', host=host)
+        client.send({
+            "personalizations": [{"to": [{"email": email}]}],
+            "from": {"email": digest.FROM_EMAIL},
+            "subject": subject,
+            "content": [{"type": "text/plain", "value": body_text}]
+        })
+    elapsed = time.perf_counter() - start
+    estimate = elapsed * len(recipients) / len(sample)
+    print(f"  per-recipient  {len(sample)} calls in {elapsed:7.2f} s"
+          f"  ({len(sample) / elapsed:8.0f} emails/s, ~{estimate:.1f} s for all)")
+
+    # batched
+    server.stats.update(calls=0, recipients=0)
+    start = time.perf_counter()
+    calls = digest.send(recipients, subject, body_text)
+    elapsed = time.perf_counter() - start
+    print(f"  batched        {calls} calls in {elapsed:7.2f} s"
+          f"  ({len(recipients) / elapsed:8.0f} emails/s)"
+          f"  server saw {server.stats['recipients']} recipients")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
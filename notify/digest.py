@@ -0,0 +1,145 @@
+#
+# digest.py
+#
+# Renders expiry digests and sends them through SendGrid. One
+# SendGridAPIClient is kept per container, and mail to many
+# recipients is sent as SendGrid personalizations: one API call
+# carries up to MAX_PERSONALIZATIONS recipients, each getting their
+# own copy (recipients never see each other's address). Digests that
+# differ per recipient ride in the same call as substitutions. The
+# sendgrid package is only imported when the first email goes out, so
+# runs with nothing to send do not pay for it.
+#
+#   [sendgrid]
+#   api_key = ...
+#   from_email = ...        ; must be a verified sender
+#   host = https://api.sendgrid.com   ; mocks/sendgrid_mock.py locally
+#
+
+from appconfig import configur
+
+
+MAX_PERSONALIZATIONS = 1000
+
+# SendGrid caps the substitutions of one personalization at 10000
+# bytes; longer digests are sent in a call of their own
+MAX_SUBSTITUTION = 9000
+DIGEST_TAG = "-digest-"
+
+FROM_EMAIL = configur.get('sendgrid', 'from_email',
+                          fallback="jackcarroll2027@u.northwestern.edu")
+
+_client = None
+
+
+def sendgrid_client():
+    """
+    Returns the container's SendGrid client, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        from sendgrid import SendGridAPIClient
+        _client = SendGridAPIClient(
+            configur.get('sendgrid', 'api_key'),
+            host=configur.get('sendgrid', 'host', fallback='https://api.sendgrid.com'))
+    return _client
+
+
+def render(items, days):
+    """
+    Builds the digest email for a list of expiring items.
+
+    Parameters
+    ----------
+    items: list of {"name", "quantity", "expires" (date)}
+    days: the window the items were selected for
+
+    Returns
+    -------
+    (subject, body_text)
+    """
+    subject = f"Expiration Alert: Items Expiring in {days} Days"
+    body_lines = [
+        "The following items expire soon:",
+        ""
+    ]
+    for item in items:
+        expires_str = item['expires'].strftime("%m/%d/%Y")
+        body_lines.append(f"- {item['name']} (qty: {item['quantity']}), expires on {expires_str}")
+
+    return subject, "\n".join(body_lines)
+
+
+def send(recipients, subject, body_text, client=None):
+    """
+    Sends one digest to every recipient, MAX_PERSONALIZATIONS per
+    API call.
+
+    Parameters
+    ----------
+    recipients: list of email addresses
+    subject, body_text: the rendered digest
+    client: SendGrid client, default sendgrid_client()
+
+    Returns
+    -------
+    number of API calls made
+    """
+    client = client or sendgrid_client()
+    calls = 0
+
+    for start in range(0, len(recipients), MAX_PERSONALIZATIONS):
+        chunk = recipients[start:start + MAX_PERSONALIZATIONS]
+        message = {
+            "personalizations": [{"to": [{"email": email}]} for email in chunk],
+            "from": {"email": FROM_EMAIL},
+            "subject": subject,
+            "content": [{"type": "text/plain", "value": body_text}]
+        }
+        response = client.send(message)
+        print("**Digest sent via SendGrid**:", response.status_code, len(chunk), "recipients")
+        calls += 1
+
+    return calls
+
+
+def send_each(messages, client=None):
+    """
+    Sends a different digest to each recipient, batching up to
+    MAX_PERSONALIZATIONS of them per API call.
+
+    Parameters
+    ----------
+    messages: list of (email, subject, body_text)
+    client: SendGrid client, default sendgrid_client()
+
+    Returns
+    -------
+    number of API calls made
+    """
+    client = client or sendgrid_client()
+    calls = 0
+
+    batch = []
+    for email, subject, body_text in messages:
+        if len(body_text.encode("utf-8")) > MAX_SUBSTITUTION:
+            calls += send([email], subject, body_text, client)
+        else:
+            batch.append({
+                "to": [{"email": email}],
+                "subject": subject,
+                "substitutions": {DIGEST_TAG: body_text}
+            })
+
+    for start in range(0, len(batch), MAX_PERSONALIZATIONS):
+        chunk = batch[start:start + MAX_PERSONALIZATIONS]
+        message = {
+            "personalizations": chunk,
+            "from": {"email": FROM_EMAIL},
+            "content": [{"type": "text/plain", "value": DIGEST_TAG}]
+        }
+        response = client.send(message)
+        print("**Digests sent via SendGrid**:", response.status_code, len(chunk), "recipients")
+        calls += 1
+
+    return calls
@@ -1,116 +1,257 @@
+#
+# /notify -> emails the items that expire soon.
+#
+# POST {"email": ..., "days": 3}
+#   sends the calling user's digest to that address now
+# POST {"action": "subscribe", "email": ..., "days": 3}
+# POST {"action": "unsubscribe", "email": ...}
+#   maintain the calling user's rows in the subscriptions table
+# scheduled (EventBridge rule, no body)
+#   reads the expiring items of every subscribed user in one query,
+#   renders one digest per (user, window) and sends them all in
+#   batched SendGrid calls (digest.py)
+# GET /expiring?days=N
+#   the calling user's lots expiring within N days (any N >= 0,
+#   default 3), soonest first:
+#   {"days", "cutoff", "items": [{"name", "quantity", "expires"}]}
+#   with an ETag from the inventory version (304 while unchanged)
+#
+# Every read is a range scan of the (user_id, expiry, name, quantity)
+# index (migrations/009_expiry_index.sql), which MySQL updates in the
+# same transaction as every upload and consume. It covers the query,
+# so the cost grows with the number of expiring lots, not the size of
+# the inventory.
+#
+
 import json
-import os
 import datetime
-import boto3
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
 
-from configparser import ConfigParser
+from appconfig import configur
+import auth
 import datatier
+import dbpool
+import digest
+import instrument
+import invversion
 
-def lambda_handler(event, context):
-    try:
-        print("**STARTING**")
-        print("**lambda: proj05_notify**")
-        
-        config_file = 'mealapp-config.ini'
-        os.environ['AWS_SHARED_CREDENTIALS_FILE'] = config_file
-        
-        configur = ConfigParser()
-        configur.read(config_file)
 
-        rds_endpoint = configur.get('rds', 'endpoint')
-        rds_portnum  = int(configur.get('rds', 'port_number'))
-        rds_username = configur.get('rds', 'user_name')
-        rds_pwd      = configur.get('rds', 'user_pwd')
-        rds_dbname   = configur.get('rds', 'db_name')
+# windows past this many days are the whole inventory anyway
+MAX_DAYS = 36500
 
-        sendgrid_apikey = configur.get('sendgrid', 'api_key')
 
-        print("**Opening DB connection**")
-        dbConn = datatier.get_dbConn(rds_endpoint,
-                                     rds_portnum,
-                                     rds_username,
-                                     rds_pwd,
-                                     rds_dbname)
+def expiring_items(dbConn, user_id, days):
+    today = datetime.date.today()
+    cutoff = today + datetime.timedelta(days=days)
 
-        #ses_client = boto3.client('ses')  
+    #
+    # the expiry predicate runs in SQL against the (user_id, expiry,
+    # name, quantity) index, which covers the query: only the user's
+    # expiring lots are read, from the index alone; every lot is
+    # listed with its own date
+    #
+    sql = """
+        SELECT name, quantity, expiry FROM lots
+        WHERE user_id = %s AND expiry <= %s
+        ORDER BY expiry, name
+    """
+    with instrument.span("query"):
+        items = datatier.retrieve_all_rows(dbConn, sql, [user_id, cutoff])
+    instrument.count("rows", len(items))
 
-        input_data = json.loads(event['body'])
-        recipient_email = input_data.get("email")
+    expiring_items = []
+    for row in items:
+        expiring_items.append({
+            'name': row[0],
+            'quantity': row[1],
+            'expires': row[2]
+        })
 
-        today = datetime.date.today()
-        three_days = today + datetime.timedelta(days=3)
+    return expiring_items
 
-        sql = "SELECT name, quantity, day, month, year FROM inventory;"
-        items = datatier.retrieve_all_rows(dbConn, sql)
 
-        if not items:
-            print("**No items found in inventory**")
-            return {
-                'statusCode': 200,
-                'body': json.dumps({'message': 'No items in inventory'})
-            }
+def send_one(dbConn, user_id, recipient_email, days):
+    items = expiring_items(dbConn, user_id, days)
+
+    if items:
+        subject, body_text = digest.render(items, days)
+        with instrument.span("sendgrid"):
+            digest.send([recipient_email], subject, body_text)
+        instrument.count("emails", 1)
+    else:
+        print(f"**No items expiring in {days} days, no email sent**")
+
+    return {
+        'message': f'Checked for {days} day expiring items.',
+        'num_expiring': len(items)
+    }
+
+
+def send_all(dbConn):
+    """
+    Sends every subscriber the digest of their user's inventory.
+
+    Parameters
+    ----------
+    dbConn: open connection
+
+    Returns
+    -------
+    summary dict: subscribers, digests rendered, emails and API calls
+    """
+    with instrument.span("subscribers"):
+        subscribers = datatier.retrieve_all_rows(dbConn,
+            "SELECT user_id, days, email FROM subscriptions ORDER BY user_id, days, email")
+
+    summary = {'subscribers': len(subscribers), 'digests': 0, 'emails': 0, 'api_calls': 0}
+    if not subscribers:
+        return summary
+
+    #
+    # one set-based query for every (user, window) pair, each probing
+    # the (user_id, expiry) index; recipients sharing a pair (e.g. a
+    # household) share its rows
+    #
+    with instrument.span("query"):
+        rows = datatier.retrieve_all_rows(dbConn, """
+            SELECT w.user_id, w.days, i.name, i.quantity, i.expiry
+            FROM (SELECT DISTINCT user_id, days FROM subscriptions) w
+            JOIN lots i
+              ON i.user_id = w.user_id AND i.expiry <= %s + INTERVAL w.days DAY
+            ORDER BY w.user_id, w.days, i.expiry, i.name""",
+            [datetime.date.today()])
+    instrument.count("rows", len(rows))
+
+    windows = {}
+    for user_id, days, name, quantity, expires in rows:
+        windows.setdefault((user_id, days), []).append({
+            'name': name,
+            'quantity': quantity,
+            'expires': expires
+        })
+
+    messages = []
+    with instrument.span("render"):
+        for user_id, days, email in subscribers:
+            items = windows.get((user_id, days))
+            if items:
+                subject, body_text = digest.render(items, days)
+                messages.append((email, subject, body_text))
+
+    summary['digests'] = len(windows)
+    summary['emails'] = len(messages)
+    with instrument.span("sendgrid"):
+        summary['api_calls'] = digest.send_each(messages)
+    instrument.count("emails", len(messages))
+    return summary
+
+
+def subscribe(dbConn, user_id, email, days):
+    datatier.perform_action(dbConn, """
+        INSERT INTO subscriptions (user_id, email, days, created) VALUES (%s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE days = VALUES(days)""",
+        [user_id, email, days])
+    return {'message': f'{email} subscribed to {days} day expiry digests.'}
+
 
-        expiring_items = []
-        for row in items:
-            item_type = row[0]
-            item_qty  = row[1]
-            item_day  = row[2]
-            item_mon  = row[3]
-            item_yr   = row[4]
+def unsubscribe(dbConn, user_id, email):
+    removed = datatier.perform_action(dbConn,
+        "DELETE FROM subscriptions WHERE user_id = %s AND email = %s", [user_id, email])
+    return {'message': f'{email} unsubscribed.' if removed else f'{email} was not subscribed.'}
 
+
+def expiring(event, dbConn, user_id):
+    params = event.get('queryStringParameters') or {}
+    try:
+        days = int(params.get('days', 3))
+    except ValueError:
+        days = -1
+    if days < 0:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': 'days must be a non-negative integer'})
+        }
+    days = min(days, MAX_DAYS)
+
+    today = datetime.date.today()
+    with instrument.span("version"):
+        version = invversion.current_version(dbConn, user_id)
+    etag = invversion.make_etag(version, "expiring", user_id, days, today)
+    if invversion.is_not_modified(event, etag):
+        return invversion.not_modified(etag)
+
+    items = expiring_items(dbConn, user_id, days)
+    for item in items:
+        item['expires'] = item['expires'].isoformat()
+
+    return {
+        'statusCode': 200,
+        'headers': {'ETag': etag},
+        'body': json.dumps({
+            'days': days,
+            'cutoff': (today + datetime.timedelta(days=days)).isoformat(),
+            'items': items
+        })
+    }
+
+
+def is_scheduled(event):
+    return event.get('source') == 'aws.events' or not event.get('body')
+
+
+@instrument.handler("notify")
+def lambda_handler(event, context):
+    try:
+        print("**STARTING**")
+        print("**lambda: proj05_notify**")
+
+        if event.get('httpMethod') == 'GET':
             try:
-                exp_date = datetime.date(item_yr, item_mon, item_day)
-            except ValueError:
-                print(f"**Skipping invalid date {item_yr}-{item_mon}-{item_day} for '{item_type}'**")
-                continue
-
-            if exp_date <= three_days:
-                expiring_items.append({
-                    'name': item_type,
-                    'quantity': item_qty,
-                    'expires': exp_date
-                })
-
-        if expiring_items:
-            
-        
-            subject = "Expiration Alert: Items Expiring in 3 Days"
-            body_lines = [
-                "The following items expire soon:",
-                ""
-            ]
-            for item in expiring_items:
-                expires_str = item['expires'].strftime("%m/%d/%Y")
-                body_lines.append(f"- {item['name']} (qty: {item['quantity']}), expires on {expires_str}")
-
-            body_text = "\n".join(body_lines)
-
-            message = Mail(
-                from_email="jackcarroll2027@u.northwestern.edu",  # This sender email must be verified in SendGrid
-                to_emails=recipient_email,
-                subject=subject,
-                plain_text_content=body_text
-            )
-
-            # Send the email via SendGrid
-            sg = SendGridAPIClient(sendgrid_apikey)
-            response = sg.send(message)
-            print("**Email sent via SendGrid**:", response.status_code)
+                user_id = auth.user_id(event)
+            except auth.AuthError as err:
+                return auth.unauthorized(err)
+            dbConn = dbpool.get_dbConn()
+            return expiring(event, dbConn, user_id)
 
+        if is_scheduled(event):
+            input_data = {'action': 'send_all'}
+            user_id = None
         else:
-            print("**No items expiring in 3 days, no email sent**")
+            try:
+                user_id = auth.user_id(event)
+            except auth.AuthError as err:
+                return auth.unauthorized(err)
+            input_data = json.loads(event['body'])
 
+        print("**Opening DB connection**")
+        dbConn = dbpool.get_dbConn()
 
+        action = input_data.get('action', 'send')
+        days = int(input_data.get("days", 3))
 
+        if action == 'send_all':
+            if user_id is not None:
+                # mails every user's subscribers, not one user's call to make
+                return {
+                    'statusCode': 403,
+                    'body': json.dumps({'error': 'send_all only runs on the schedule'})
+                }
+            result = send_all(dbConn)
+            print("**Scheduled digests**", result)
+        elif action == 'subscribe':
+            result = subscribe(dbConn, user_id, input_data['email'], days)
+        elif action == 'unsubscribe':
+            result = unsubscribe(dbConn, user_id, input_data['email'])
+        elif action == 'send':
+            result = send_one(dbConn, user_id, input_data.get("email"), days)
+        else:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': f"unknown action '{action}'"})
+            }
 
         return {
             'statusCode': 200,
-            'body': json.dumps({
-                'message': 'Checked for 3 day expiring items.',
-                'num_expiring': len(expiring_items)
-            })
+            'body': json.dumps(result)
         }
 
     except Exception as err:
@@ -122,6 +263,6 @@ def lambda_handler(event, context):
         }
 
     finally:
-        if 'dbConn' in locals() and dbConn is not None:
-            dbConn.close()
-            print("**Database connection closed**")
+        if 'dbConn' in locals():
+            dbpool.release(dbConn)
+            print("**Pool stats**", dbpool.stats())
@@ -0,0 +1,42 @@
+#!/bin/bash
+#
+# BASH script to build one deployment zip per lambda in ./build:
+#
+#   ./package.bash
+#
+# Each zip gets, flattened into its top level:
+#   <lambda>/*.py        (lambda_function.py and its helper modules,
+#                         benchmark scripts excluded)
+#   <lambda>/*.json      (data files, e.g. slashMealplan/recipes.json)
+#   shared/*.py          (appconfig.py, dbpool.py, ...)
+#   datatier.py          (not in the repo; copy it to the repo root or
+#                         point DATATIER at it)
+#   mealapp-config.ini   (not in the repo; keep it at the repo root or
+#                         point MEALAPP_CONFIG at it)
+#
+# Third-party packages (pymysql, requests, sendgrid, ...) are expected
+# to come from lambda layers, as before.
+#
+set -e
+cd "$(dirname "$0")"
+
+lambdas="inventory inventory_delete notify slashMealplan slashUpload"
+datatier="${DATATIER:-datatier.py}"
+config="${MEALAPP_CONFIG:-mealapp-config.ini}"
+
+for f in "$datatier" "$config"; do
+  if [[ ! -f "$f" ]]; then
+    echo "**ERROR: '$f' not found, see comments in package.bash"
+    exit 1
+  fi
+done
+
+mkdir -p build
+
+for name in $lambdas; do
+  zipfile="build/$name.zip"
+  rm -f "$zipfile"
+  files=$(ls "$name"/*.py "$name"/*.json 2>/dev/null | grep -v '/bench_')
+  zip -q -j "$zipfile" $files shared/*.py "$datatier" "$config"
+  echo "built $zipfile"
+done
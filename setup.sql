@@ -2,14 +2,81 @@ CREATE DATABASE IF NOT EXISTS mealapp;
 USE mealapp;
 
 DROP TABLE IF EXISTS inventory;
+DROP TABLE IF EXISTS lots;
 
-CREATE TABLE inventory (
+-- one row per (user, item, expiration date); uploads with a new date
+-- start a new lot, consumption drains the earliest lots first; the
+-- expiry index also holds name and quantity, so the expiring-items
+-- reads come from the index alone, already in (expiry, name) order
+CREATE TABLE lots (
+  user_id VARCHAR(64) NOT NULL,
   name VARCHAR(64) NOT NULL,
   quantity INT NOT NULL,
   day INT NOT NULL,
   month INT NOT NULL,
   year INT NOT NULL,
-  PRIMARY KEY (name)
+  expiry DATE GENERATED ALWAYS AS
+    (MAKEDATE(year, 1) + INTERVAL (month - 1) MONTH + INTERVAL (day - 1) DAY) STORED,
+  PRIMARY KEY (user_id, name, year, month, day),
+  INDEX idx_lots_user_expiry (user_id, expiry, name, quantity)
+);
+
+DROP TABLE IF EXISTS inventory_version;
+
+-- per user, bumped by every inventory mutation, used as the ETag of GET /inventory and /mealplan
+CREATE TABLE inventory_version (
+  user_id VARCHAR(64) NOT NULL,
+  version BIGINT NOT NULL,
+  PRIMARY KEY (user_id)
+);
+
+DROP TABLE IF EXISTS mealplan_cache;
+
+-- generated meal plans keyed by inventory fingerprint ([mealplan_cache] backend = mysql)
+CREATE TABLE mealplan_cache (
+  cache_key CHAR(64) NOT NULL,
+  plan TEXT NOT NULL,
+  created DATETIME NOT NULL,
+  last_used DATETIME(6) NOT NULL,
+  PRIMARY KEY (cache_key),
+  INDEX idx_mealplan_cache_last_used (last_used)
+);
+
+DROP TABLE IF EXISTS qr_cache;
+
+-- decoded QR text by SHA-256 of the image ([qr_cache] database = true)
+CREATE TABLE qr_cache (
+  image_hash CHAR(64) NOT NULL,
+  qr_text VARCHAR(255) NOT NULL,
+  created DATETIME NOT NULL,
+  PRIMARY KEY (image_hash)
+);
+
+DROP TABLE IF EXISTS subscriptions;
+
+-- recipients of the scheduled expiry digest (/notify)
+CREATE TABLE subscriptions (
+  user_id VARCHAR(64) NOT NULL,
+  email VARCHAR(255) NOT NULL,
+  days INT NOT NULL DEFAULT 3,
+  created DATETIME NOT NULL,
+  PRIMARY KEY (user_id, email)
+);
+
+DROP TABLE IF EXISTS ingest_queue;
+
+-- queued uploads and consumes ([ingest] mode = queue, backend = mysql)
+CREATE TABLE ingest_queue (
+  op_id BIGINT NOT NULL AUTO_INCREMENT,
+  user_id VARCHAR(64) NOT NULL,
+  kind VARCHAR(16) NOT NULL,
+  changes TEXT NOT NULL,
+  status VARCHAR(16) NOT NULL,
+  result TEXT NULL,
+  created DATETIME(6) NOT NULL,
+  applied DATETIME(6) NULL,
+  PRIMARY KEY (op_id),
+  INDEX idx_ingest_queue_status (status, op_id)
 );
 
 DROP USER IF EXISTS 'mealapp-read-only';
@@ -23,11 +90,12 @@ TO 'mealapp-read-write';
 FLUSH PRIVILEGES;
 
 USE mealapp;
-INSERT INTO inventory (name, quantity, day, month, year) VALUES ('Milk', 2, 10, 3, 2025);
-INSERT INTO inventory (name, quantity, day, month, year) VALUES ('Eggs', 12, 15, 3, 2025);
-INSERT INTO inventory (name, quantity, day, month, year) VALUES ('Bread', 1, 5, 4, 2025);
-INSERT INTO inventory (name, quantity, day, month, year) VALUES ('Apples', 10, 20, 3, 2025);
-INSERT INTO inventory (name, quantity, day, month, year) VALUES ('Chicken', 2, 25, 3, 2025);
+INSERT INTO lots (user_id, name, quantity, day, month, year) VALUES ('demo', 'Milk', 2, 10, 3, 2025);
+INSERT INTO lots (user_id, name, quantity, day, month, year) VALUES ('demo', 'Milk', 1, 18, 3, 2025);
+INSERT INTO lots (user_id, name, quantity, day, month, year) VALUES ('demo', 'Eggs', 12, 15, 3, 2025);
+INSERT INTO lots (user_id, name, quantity, day, month, year) VALUES ('demo', 'Bread', 1, 5, 4, 2025);
+INSERT INTO lots (user_id, name, quantity, day, month, year) VALUES ('demo', 'Apples', 10, 20, 3, 2025);
+INSERT INTO lots (user_id, name, quantity, day, month, year) VALUES ('demo', 'Chicken', 2, 25, 3, 2025);
 
 USE mealapp;
-SELECT * FROM inventory;
+SELECT * FROM lots;
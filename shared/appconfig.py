@@ -0,0 +1,47 @@
+#
+# appconfig.py
+#
+# Parses mealapp-config.ini once per Lambda container. Handlers
+# import `configur` from here instead of building a new ConfigParser
+# on every request, so warm invocations skip the file read entirely.
+#
+# Deployed alongside lambda_function.py (like datatier.py) in every
+# lambda that needs it. The parse is timed for instrument.py's
+# cold-start record.
+#
+
+import os
+import time
+
+from configparser import ConfigParser
+
+
+loaded_at = time.perf_counter()
+
+config_file = os.environ.get('MEALAPP_CONFIG', 'mealapp-config.ini')
+os.environ['AWS_SHARED_CREDENTIALS_FILE'] = config_file
+
+configur = ConfigParser()
+configur.read(config_file)
+
+load_ms = round((time.perf_counter() - loaded_at) * 1000.0, 2)
+
+
+def rds_settings():
+    """
+    Returns the [rds] section as connection arguments for
+    datatier.get_dbConn.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    tuple (endpoint, portnum, username, pwd, dbname)
+    """
+    return (configur.get('rds', 'endpoint'),
+            configur.getint('rds', 'port_number'),
+            configur.get('rds', 'user_name'),
+            configur.get('rds', 'user_pwd'),
+            configur.get('rds', 'db_name'))
@@ -0,0 +1,75 @@
+#
+# auth.py
+#
+# Who is calling: every handler scopes its queries to the user id
+# returned by user_id(event). The id comes from the API Gateway
+# authorizer, which has already verified the caller:
+#
+#   Cognito user pool authorizer (REST API)  requestContext.authorizer.claims.sub
+#   JWT authorizer (HTTP API)                requestContext.authorizer.jwt.claims.sub
+#   Lambda authorizer                        requestContext.authorizer[.lambda].user_id
+#                                            or .principalId
+#
+# For local testing without an authorizer, [auth] trust_header = true
+# takes the id from the X-User-Id request header instead. Never turn
+# that on behind a public endpoint: anyone could claim any user.
+#
+
+import json
+
+from appconfig import configur
+
+
+MAX_USER_ID = 64    # inventory.user_id is VARCHAR(64)
+
+TRUST_HEADER = configur.getboolean('auth', 'trust_header', fallback=False)
+
+
+class AuthError(Exception):
+    pass
+
+
+def _header(event, name):
+    headers = event.get('headers') or {}
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def user_id(event):
+    """
+    Returns the authenticated user's id for an API Gateway event.
+
+    Parameters
+    ----------
+    event: Lambda event
+
+    Returns
+    -------
+    user id string; raises AuthError if the request carries none
+    """
+    authorizer = (event.get('requestContext') or {}).get('authorizer') or {}
+
+    claims = authorizer.get('claims') or (authorizer.get('jwt') or {}).get('claims') or {}
+    context = authorizer.get('lambda') or authorizer
+
+    uid = claims.get('sub') or context.get('user_id') or context.get('principalId')
+
+    if not uid and TRUST_HEADER:
+        uid = _header(event, 'x-user-id')
+
+    if not uid:
+        raise AuthError("not authenticated")
+
+    uid = str(uid)
+    if len(uid) > MAX_USER_ID:
+        raise AuthError("invalid user id")
+    return uid
+
+
+def unauthorized(err):
+    return {
+        'statusCode': 401,
+        'body': json.dumps({'error': str(err)})
+    }
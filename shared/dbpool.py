@@ -0,0 +1,159 @@
+#
+# dbpool.py
+#
+# Warm connection pool shared across invocations of a Lambda
+# container. Opening a MySQL connection costs a TCP + TLS + auth
+# handshake, which is more than most of our queries take, so
+# connections are kept at module scope and handed back out on the
+# next request.
+#
+# Usage:
+#
+#   dbConn = dbpool.get_dbConn()
+#   try:
+#     ...
+#   finally:
+#     dbpool.release(dbConn)
+#
+# Idle connections that have not been used for `ping_interval`
+# seconds are pinged before reuse; a failed ping closes the
+# connection and opens a fresh one (counted as a reconnect).
+#
+# release() rolls back whatever transaction the handler left open
+# (so no stale snapshot leaks into the next invocation) and only
+# pools the connection if that rollback succeeds. A connection that
+# broke mid-request therefore never goes back into the pool.
+#
+
+import logging
+import threading
+import time
+
+import datatier
+import instrument
+
+from appconfig import configur, rds_settings
+
+
+#
+# a Lambda container runs one invocation at a time, so one idle
+# connection is all it can reuse; raise pool_size only when handlers
+# run on threads (e.g. a local test server)
+#
+pool_size = configur.getint('rds', 'pool_size', fallback=1)
+ping_interval = configur.getfloat('rds', 'ping_interval', fallback=30.0)
+
+_idle = []          # list of (dbConn, last_used) pairs
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'reconnects': 0}
+
+
+def _count(key):
+    with _lock:
+        _stats[key] += 1
+
+
+def _connect():
+    with instrument.span("db_connect"):
+        return datatier.get_dbConn(*rds_settings())
+
+
+def get_dbConn():
+    """
+    Returns a live connection, reusing an idle pooled one when
+    possible.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    pymysql connection object
+    """
+    with _lock:
+        entry = _idle.pop() if _idle else None
+
+    if entry is None:
+        _count('misses')
+        return _connect()
+
+    dbConn, last_used = entry
+
+    if not dbConn.open:
+        _count('misses')
+        return _connect()
+
+    if time.monotonic() - last_used < ping_interval:
+        _count('hits')
+        return dbConn
+
+    try:
+        with instrument.span("db_ping"):
+            dbConn.ping(reconnect=False)
+        _count('hits')
+        return dbConn
+    except Exception as err:
+        logging.warning("dbpool: stale connection, reconnecting: " + str(err))
+        _count('reconnects')
+        _close(dbConn)
+        return _connect()
+
+
+def release(dbConn, discard=False):
+    """
+    Returns a connection to the pool. Any open transaction is rolled
+    back; connections that are closed or fail the rollback are closed
+    instead of pooled. Pass discard=True to always close.
+
+    Parameters
+    ----------
+    dbConn: connection from get_dbConn (None is ignored)
+    discard: close instead of pooling
+
+    Returns
+    -------
+    nothing
+    """
+    if dbConn is None:
+        return
+
+    if not discard and dbConn.open:
+        try:
+            dbConn.rollback()
+        except Exception as err:
+            logging.warning("dbpool: discarding broken connection: " + str(err))
+            discard = True
+
+    if not discard and dbConn.open:
+        with _lock:
+            if len(_idle) < pool_size:
+                _idle.append((dbConn, time.monotonic()))
+                return
+
+    _close(dbConn)
+
+
+def stats():
+    """
+    Returns a snapshot of the pool counters.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    dict with hits, misses, reconnects and idle counts
+    """
+    with _lock:
+        snapshot = dict(_stats)
+        snapshot['idle'] = len(_idle)
+    return snapshot
+
+
+def _close(dbConn):
+    try:
+        dbConn.close()
+    except Exception:
+        pass
@@ -0,0 +1,132 @@
+#
+# instrument.py
+#
+# Per-invocation timings for the lambdas. Each lambda_handler is
+# wrapped with @instrument.handler("<lambda>") and its phases with
+#
+#   with instrument.span("query"):
+#       rows = datatier.retrieve_all_rows(...)
+#   instrument.count("rows", len(rows))
+#
+# When the handler returns, one JSON line goes to the log, e.g.
+#
+#   {"lambda": "inventory", "cold": true, "status": 200, "total_ms": 41.2,
+#    "phases": {"init": 310.5, "config": 1.1, "db_connect": 28.0, "query": 3.9},
+#    "counts": {"rows": 100}, "request_id": "..."}
+#
+# "cold" marks the first invocation of a container, which also reports
+# "init" (from parsing mealapp-config.ini to the first request, i.e.
+# module loading) and "config" (the parse itself). Spans of the same
+# name add up. Spans outside an instrumented handler, or on a worker
+# thread, are not recorded.
+#
+#   [instrument]
+#   server_timing = false   ; true also returns the phases in a
+#                           ; Server-Timing response header
+#   debug = false           ; true logs every row read (slow at scale)
+#
+
+import contextlib
+import contextvars
+import functools
+import json
+import time
+
+import appconfig
+
+from appconfig import configur
+
+
+SERVER_TIMING = configur.getboolean('instrument', 'server_timing', fallback=False)
+
+# handlers only print per-row detail when this is on
+DEBUG = configur.getboolean('instrument', 'debug', fallback=False)
+
+_record = contextvars.ContextVar('instrument_record', default=None)
+_cold = True
+
+
+def _ms(start):
+    return round((time.perf_counter() - start) * 1000.0, 2)
+
+
+@contextlib.contextmanager
+def span(name):
+    """
+    Times the enclosed block as phase `name` of the current invocation.
+    """
+    record = _record.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if record is not None:
+            record["phases"][name] = round(record["phases"].get(name, 0.0) + _ms(start), 2)
+
+
+def count(name, n):
+    """
+    Adds n to counter `name` of the current invocation (rows read,
+    images decoded, emails sent, ...).
+    """
+    record = _record.get()
+    if record is not None:
+        record["counts"][name] = record["counts"].get(name, 0) + n
+
+
+def server_timing(record):
+    """
+    Server-Timing header value for a finished record.
+    """
+    metrics = [f"{name};dur={ms}" for name, ms in record["phases"].items()]
+    metrics.append(f"total;dur={record['total_ms']}")
+    return ", ".join(metrics)
+
+
+def handler(name):
+    """
+    Decorator for a lambda_handler: records its spans and counts and
+    logs them as one JSON line per invocation.
+
+    Parameters
+    ----------
+    name: lambda name for the log record
+
+    Returns
+    -------
+    decorator
+    """
+    def decorate(fn):
+
+        @functools.wraps(fn)
+        def wrapper(event, context):
+            global _cold
+
+            start = time.perf_counter()
+            record = {"lambda": name, "cold": _cold, "phases": {}, "counts": {}}
+            if _cold:
+                record["phases"]["init"] = round((start - appconfig.loaded_at) * 1000.0, 2)
+                record["phases"]["config"] = appconfig.load_ms
+                _cold = False
+
+            token = _record.set(record)
+            response = None
+            try:
+                response = fn(event, context)
+            finally:
+                _record.reset(token)
+                record["status"] = response.get("statusCode") if isinstance(response, dict) else None
+                record["total_ms"] = _ms(start)
+                request_id = getattr(context, "aws_request_id", None)
+                if request_id:
+                    record["request_id"] = request_id
+                print(json.dumps(record))
+
+            if SERVER_TIMING and isinstance(response, dict):
+                response["headers"] = dict(response.get("headers") or {})
+                response["headers"]["Server-Timing"] = server_timing(record)
+            return response
+
+        return wrapper
+
+    return decorate
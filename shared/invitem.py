@@ -0,0 +1,167 @@
+#
+# invitem.py
+#
+# The inventory item shared by the lambdas and the client: one
+# __slots__ object per item (no per-instance dict) whose expiration
+# date is kept as a single proleptic Gregorian ordinal
+# (date.toordinal()), computed once, instead of day, month and year.
+# Days left and sorting are then integer arithmetic.
+#
+# On the wire a list of items travels in columnar JSON, one array per
+# field instead of one array per row:
+#
+#   {"names": ["Apples", "Bread"], "qty": [10, 1],
+#    "expiry": [20167, 20183], "lots": [1, 2]}
+#
+# expiry holds days since 1970-01-01, which is shorter than the
+# ordinal. GET /inventory?format=columns answers in this form.
+#
+# This file is copied verbatim to SmartMealPlanner-client/invitem.py,
+# which is what the client's Docker image sees; tests/test_invitem.py
+# checks that the two stay identical.
+#
+
+import datetime
+import functools
+
+
+# ordinal of 1970-01-01, the zero of the wire's expiry column
+EPOCH = datetime.date(1970, 1, 1).toordinal()
+
+
+def ordinal(day, month, year):
+    """
+    Ordinal of a (day, month, year) date, normalized the way the
+    lots.expiry column is: day 31 of a 30-day month is the 1st of the
+    next month.
+    """
+    return _month_start(year, month) + day - 1
+
+
+@functools.lru_cache(maxsize=1024)
+def _month_start(year, month):
+    # an inventory spans few months, so most rows hit the cache
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return datetime.date(year, month, 1).toordinal()
+
+
+class InventoryItem:
+    """
+    One item: name, total quantity, expiry (ordinal of the earliest
+    expiration date) and the number of lots the quantity spans.
+    """
+
+    __slots__ = ('name', 'quantity', 'expiry', 'lots')
+
+    def __init__(self, name, quantity, expiry, lots=1):
+        self.name = name
+        self.quantity = quantity
+        self.expiry = expiry
+        self.lots = lots
+
+    @classmethod
+    def from_row(cls, row):
+        """
+        Item from an inventory row: (name, quantity, day, month, year)
+        with an optional lot count.
+        """
+        return cls(row[0], row[1], ordinal(row[2], row[3], row[4]), row[5] if len(row) > 5 else 1)
+
+    @property
+    def date(self):
+        return datetime.date.fromordinal(self.expiry)
+
+    @property
+    def day(self):
+        return self.date.day
+
+    @property
+    def month(self):
+        return self.date.month
+
+    @property
+    def year(self):
+        return self.date.year
+
+    def days_left(self, today):
+        return self.expiry - today.toordinal()
+
+    def row(self):
+        """
+        The item as an inventory row: [name, quantity, day, month,
+        year, lots].
+        """
+        date = self.date
+        return [self.name, self.quantity, date.day, date.month, date.year, self.lots]
+
+    def __eq__(self, other):
+        if not isinstance(other, InventoryItem):
+            return NotImplemented
+        return (self.name, self.quantity, self.expiry, self.lots) == \
+            (other.name, other.quantity, other.expiry, other.lots)
+
+    def __repr__(self):
+        return f"InventoryItem({self.name!r}, {self.quantity}, {self.date.isoformat()}, lots={self.lots})"
+
+
+def encode_columns(items):
+    """
+    Columnar form of a list of items, ready for json.dumps.
+
+    Parameters
+    ----------
+    items: list of InventoryItem
+
+    Returns
+    -------
+    dict with the lists names, qty, expiry (days since 1970-01-01)
+    and lots
+    """
+    return {
+        "names": [item.name for item in items],
+        "qty": [item.quantity for item in items],
+        "expiry": [item.expiry - EPOCH for item in items],
+        "lots": [item.lots for item in items],
+    }
+
+
+def rows_to_columns(rows):
+    """
+    Columnar form straight from inventory rows (name, quantity, day,
+    month, year, lots), without building items: what the lambdas send.
+
+    Parameters
+    ----------
+    rows: list of inventory rows
+
+    Returns
+    -------
+    dict as returned by encode_columns
+    """
+    names, quantities, expiry, lots = [], [], [], []
+    for name, quantity, day, month, year, count in rows:
+        names.append(name)
+        quantities.append(quantity)
+        expiry.append(_month_start(year, month) + day - 1 - EPOCH)
+        lots.append(count)
+    return {"names": names, "qty": quantities, "expiry": expiry, "lots": lots}
+
+
+def decode_columns(columns):
+    """
+    Items from their columnar form (see encode_columns); lots may be
+    left out, it defaults to 1 per item.
+
+    Parameters
+    ----------
+    columns: dict as returned by encode_columns
+
+    Returns
+    -------
+    list of InventoryItem
+    """
+    names = columns["names"]
+    lots = columns.get("lots") or [1] * len(names)
+    return [InventoryItem(name, quantity, expiry + EPOCH, count)
+            for name, quantity, expiry, count in zip(names, columns["qty"], columns["expiry"], lots)]
@@ -0,0 +1,179 @@
+#
+# invmutate.py
+#
+# invmutate.py
+#
+# Atomic inventory mutations shared by /upload and /inventory
+# (delete). Each operation is a single set-based UPDATE/INSERT that
+# MySQL applies under row locks, so concurrent requests cannot lose
+# updates the way SELECT-then-write did.
+#
+# The inventory is stored as lots: one row per (user, item, expiry
+# date). Uploads add to the lot with the same date or start a new
+# lot; consumption drains the earliest-expiring lots first (FIFO).
+#
+# Rows are (name, day, month, year, quantity) tuples; every operation
+# is scoped to one user's lots (primary key (user_id, name, year,
+# month, day)).
+#
+# Every successful mutation also bumps that user's inventory version
+# in the same transaction, which invalidates their clients' ETags.
+# add_lots/take_lots are the same statements without the bump and
+# commit, for callers that batch several changes in one transaction
+# (invqueue.py).
+#
+
+import invversion
+
+
+UPSERT_SQL = """
+    INSERT INTO lots (user_id, name, day, month, year, quantity)
+    VALUES {}
+    ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity)
+"""
+
+#
+# FIFO in one statement: the derived table computes, per lot in
+# expiry order, how many units the earlier lots hold (`before`); a
+# lot gives up whatever of the requested quantity those did not
+# cover. Lots the request does not reach are not touched.
+#
+CONSUME_SQL = """
+    UPDATE lots l
+    JOIN (
+      SELECT year, month, day,
+             SUM(quantity) OVER (ORDER BY expiry ROWS UNBOUNDED PRECEDING) - quantity AS before_qty
+      FROM lots
+      WHERE user_id = %s AND name = %s
+    ) f ON l.year = f.year AND l.month = f.month AND l.day = f.day
+    SET l.quantity = GREATEST(l.quantity - (%s - f.before_qty), 0)
+    WHERE l.user_id = %s AND l.name = %s AND f.before_qty < %s
+"""
+
+DELETE_EMPTY_SQL = "DELETE FROM lots WHERE user_id = %s AND name = %s AND quantity = 0"
+
+#
+# locks the item's lots up front: the derived table in CONSUME_SQL
+# would otherwise take shared locks first, and two concurrent
+# consumes upgrading them would deadlock
+#
+LOCK_SQL = """
+    SELECT COALESCE(SUM(quantity), 0), COUNT(*) FROM lots
+    WHERE user_id = %s AND name = %s
+    FOR UPDATE
+"""
+
+
+def add_lots(dbCursor, user_id, rows):
+    """
+    The upsert of upsert_items, run inside the caller's transaction:
+    no version bump, no commit.
+
+    Parameters
+    ----------
+    dbCursor: cursor of the open write transaction
+    user_id: owner of the inventory
+    rows: non-empty list of (name, day, month, year, quantity) tuples
+
+    Returns
+    -------
+    MySQL affected-row count: 1 per new lot, 2 per updated lot
+    """
+    sql = UPSERT_SQL.format(", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(rows)))
+    params = [value for row in rows for value in (user_id,) + tuple(row)]
+    dbCursor.execute(sql, params)
+    return dbCursor.rowcount
+
+
+def take_lots(dbCursor, user_id, name, quantity):
+    """
+    The FIFO decrement of consume, run inside the caller's
+    transaction: no version bump, no commit.
+
+    Parameters
+    ----------
+    dbCursor: cursor of the open write transaction
+    user_id: owner of the inventory
+    name: item name
+    quantity: positive number of units to remove
+
+    Returns
+    -------
+    the remaining quantity over all lots, or None if the item is not
+    in the inventory (nothing was changed)
+    """
+    dbCursor.execute(LOCK_SQL, (user_id, name))
+    total, lots = dbCursor.fetchone()
+    if lots == 0:
+        return None
+
+    dbCursor.execute(CONSUME_SQL, (user_id, name, quantity, user_id, name, quantity))
+    dbCursor.execute(DELETE_EMPTY_SQL, (user_id, name))
+    return max(int(total) - quantity, 0)
+
+
+def upsert_items(dbConn, user_id, rows):
+    """
+    Adds items to the inventory in one statement and one transaction.
+    An item with a new expiration date starts a new lot; one with the
+    date of an existing lot adds to that lot's quantity.
+
+    Parameters
+    ----------
+    dbConn: open database connection
+    user_id: owner of the inventory
+    rows: list of (name, day, month, year, quantity) tuples
+
+    Returns
+    -------
+    MySQL affected-row count: 1 per new lot, 2 per updated lot
+    """
+    if not rows:
+        return 0
+
+    dbCursor = dbConn.cursor()
+    try:
+        rows_affected = add_lots(dbCursor, user_id, rows)
+        invversion.bump_version(dbCursor, user_id)
+        dbConn.commit()
+        return rows_affected
+    except Exception:
+        dbConn.rollback()
+        raise
+    finally:
+        dbCursor.close()
+
+
+def consume(dbConn, user_id, name, quantity):
+    """
+    Removes quantity units of an item, earliest-expiring lots first.
+    The lots are decremented in one statement (never below zero) and
+    the ones that reach zero are deleted, in the same transaction.
+
+    Parameters
+    ----------
+    dbConn: open database connection
+    user_id: owner of the inventory
+    name: item name
+    quantity: positive number of units to remove
+
+    Returns
+    -------
+    the remaining quantity over all lots (0 if none are left), or
+    None if the item is not in the inventory
+    """
+    dbCursor = dbConn.cursor()
+    try:
+        new_quantity = take_lots(dbCursor, user_id, name, quantity)
+        if new_quantity is None:
+            dbConn.rollback()
+            return None
+
+        invversion.bump_version(dbCursor, user_id)
+        dbConn.commit()
+        return new_quantity
+    except Exception:
+        dbConn.rollback()
+        raise
+    finally:
+        dbCursor.close()
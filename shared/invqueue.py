@@ -0,0 +1,510 @@
+#
+# invqueue.py
+#
+# Write-behind queue for inventory mutations. With [ingest] mode =
+# queue, /upload and consume (POST /inventory) only append their
+# change to a durable queue and answer 202 with an operation id; a
+# drain applies the queued changes to the lots table later, many
+# operations per transaction, and GET /inventory?op=<id> reports how
+# each one ended.
+#
+# Before a batch is applied it is coalesced per (user, item): runs of
+# consecutive adds become one multi-row upsert (five +1 Milk with the
+# same date are one +5), runs of consecutive consumes one FIFO
+# decrement. Changes to the same item keep their order; changes to
+# different items commute. Every touched user's inventory version is
+# bumped once per batch. A batch that fails is retried one operation
+# per transaction, so a bad operation is marked failed instead of
+# blocking the queue.
+#
+# Backends:
+#
+#   sqlite  a file (in /tmp on Lambda) per container. Drained by the
+#           container's own worker thread, so it only fits a single
+#           long-lived process that serves every route (the local
+#           build, bench/e2e.py). The queue and the database commit
+#           separately: an operation applied right before a crash is
+#           applied again after it (at least once).
+#   mysql   the ingest_queue table (migrations/008_ingest_queue.sql),
+#           shared by all containers. Each batch is claimed with
+#           SKIP LOCKED, applied and marked in one transaction
+#           (exactly once), by any container's worker thread or by
+#           the scheduled drain of inventory_delete (an EventBridge
+#           rule, e.g. rate(1 minute)).
+#
+#   [ingest]
+#   mode = sync             ; sync (write before responding) or queue
+#   backend = sqlite        ; sqlite or mysql
+#   path = /tmp/mealapp-ingest.db
+#   batch_size = 500        ; operations per drain transaction
+#   interval = 0.2          ; seconds the worker sleeps when idle
+#   keep = 86400            ; seconds finished operations stay pollable
+#
+
+import itertools
+import json
+import sqlite3
+import threading
+import time
+
+from collections import namedtuple
+
+import datatier
+import dbpool
+import invmutate
+import invversion
+
+from appconfig import configur
+
+
+MODE = configur.get('ingest', 'mode', fallback='sync')
+BATCH_SIZE = configur.getint('ingest', 'batch_size', fallback=500)
+INTERVAL = configur.getfloat('ingest', 'interval', fallback=0.2)
+KEEP = configur.getint('ingest', 'keep', fallback=86400)
+
+#
+# one queued operation; changes is a list of
+#   add:     [name, day, month, year, quantity] per row
+#   consume: [name, quantity]
+#
+Op = namedtuple('Op', ['op_id', 'user_id', 'kind', 'changes'])
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def coalesce(ops):
+    """
+    Merges queued operations into as few statements as possible,
+    keeping the order of the changes to each item.
+
+    Parameters
+    ----------
+    ops: list of Op in arrival order
+
+    Returns
+    -------
+    list of steps (round, kind, user_id, name, amount, op_ids), sorted
+    by round, user and name: round n holds the n-th run of same-kind
+    changes of each item; amount is {(day, month, year): quantity}
+    for adds and the total quantity for consumes
+    """
+    runs = {}    # (user_id, name) -> [[kind, amount, op_ids], ...]
+
+    for op in ops:
+        for change in op.changes:
+            item_runs = runs.setdefault((op.user_id, change[0]), [])
+            if not item_runs or item_runs[-1][0] != op.kind:
+                item_runs.append([op.kind, {} if op.kind == 'add' else 0, []])
+            run = item_runs[-1]
+            if op.kind == 'add':
+                lot = tuple(int(v) for v in change[1:4])
+                run[1][lot] = run[1].get(lot, 0) + int(change[4])
+            else:
+                run[1] += int(change[1])
+            if not run[2] or run[2][-1] != op.op_id:
+                run[2].append(op.op_id)
+
+    steps = [(index, kind, user_id, name, amount, op_ids)
+             for (user_id, name), item_runs in runs.items()
+             for index, (kind, amount, op_ids) in enumerate(item_runs)]
+    steps.sort(key=lambda step: step[:4])
+    return steps
+
+
+def apply_ops(dbCursor, ops):
+    """
+    Applies coalesced operations inside the caller's transaction (no
+    commit): per round one upsert per user for the adds, then one
+    decrement per consumed item; every touched user's version is
+    bumped once.
+
+    Parameters
+    ----------
+    dbCursor: cursor of the open write transaction
+    ops: list of Op
+
+    Returns
+    -------
+    (outcomes, statements): op_id -> (status, result dict), and the
+    number of lot statements run
+    """
+    outcomes = {op.op_id: ('done', {}) for op in ops}
+    touched = set()
+    statements = 0
+
+    for index, steps in itertools.groupby(coalesce(ops), key=lambda step: step[0]):
+        steps = list(steps)
+
+        adds = {}
+        for _, kind, user_id, name, amount, op_ids in steps:
+            if kind == 'add':
+                adds.setdefault(user_id, []).extend(
+                    (name, day, month, year, quantity) for (day, month, year), quantity in amount.items())
+        for user_id, rows in adds.items():
+            invmutate.add_lots(dbCursor, user_id, rows)
+            touched.add(user_id)
+            statements += 1
+
+        for _, kind, user_id, name, amount, op_ids in steps:
+            if kind != 'consume':
+                continue
+            new_quantity = invmutate.take_lots(dbCursor, user_id, name, amount)
+            statements += 1
+            if new_quantity is None:
+                outcome = ('failed', {'error': f'Item "{name}" not found'})
+            else:
+                outcome = ('done', {'new_quantity': new_quantity})
+                touched.add(user_id)
+            for op_id in op_ids:
+                outcomes[op_id] = outcome
+
+    for user_id in sorted(touched):
+        invversion.bump_version(dbCursor, user_id)
+
+    return outcomes, statements
+
+
+def grouped(outcomes):
+    """
+    Operations with the same outcome, so they can be marked with one
+    statement: (status, result JSON) -> [op_ids].
+    """
+    groups = {}
+    for op_id, (status, result) in outcomes.items():
+        groups.setdefault((status, json.dumps(result, sort_keys=True)), []).append(op_id)
+    return groups
+
+
+def _record(op_id, kind, status, result, created, applied):
+    record = {'op_id': op_id, 'kind': kind, 'status': status, 'created': created, 'applied': applied}
+    record.update(json.loads(result) if result else {})
+    return record
+
+
+class SQLiteQueue:
+    """
+    Queue in a local SQLite file, drained by one thread at a time.
+    """
+
+    def __init__(self, path, keep=KEEP):
+        self.keep = keep
+        self.lock = threading.Lock()
+        self.drain_lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS ingest_queue (
+              op_id INTEGER PRIMARY KEY AUTOINCREMENT,
+              user_id TEXT NOT NULL,
+              kind TEXT NOT NULL,
+              changes TEXT NOT NULL,
+              status TEXT NOT NULL DEFAULT 'queued',
+              result TEXT,
+              created REAL NOT NULL,
+              applied REAL
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_ingest_status ON ingest_queue (status, op_id)")
+        self.db.commit()
+
+    def enqueue(self, user_id, kind, changes):
+        """
+        Appends one operation; it is on disk when this returns.
+
+        Returns
+        -------
+        the operation id
+        """
+        with self.lock:
+            cursor = self.db.execute(
+                "INSERT INTO ingest_queue (user_id, kind, changes, created) VALUES (?, ?, ?, ?)",
+                (user_id, kind, json.dumps(changes), time.time()))
+            self.db.commit()
+            return cursor.lastrowid
+
+    def status(self, user_id, op_id):
+        """
+        Returns the caller's operation as a dict, or None.
+        """
+        with self.lock:
+            row = self.db.execute("""
+                SELECT op_id, kind, status, result, created, applied FROM ingest_queue
+                WHERE op_id = ? AND user_id = ?""", (op_id, user_id)).fetchone()
+        return _record(*row) if row else None
+
+    def pending(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM ingest_queue WHERE status = 'queued'").fetchone()[0]
+
+    def drain(self, limit=BATCH_SIZE):
+        """
+        Applies up to `limit` queued operations to the database in one
+        transaction (one per operation if that fails) and records how
+        each ended.
+
+        Returns
+        -------
+        summary dict: ops, statements, failed
+        """
+        with self.drain_lock:
+            with self.lock:
+                rows = self.db.execute("""
+                    SELECT op_id, user_id, kind, changes FROM ingest_queue
+                    WHERE status = 'queued' ORDER BY op_id LIMIT ?""", (limit,)).fetchall()
+            ops = [Op(op_id, user_id, kind, json.loads(changes)) for op_id, user_id, kind, changes in rows]
+            if not ops:
+                self.purge()
+                return {'ops': 0, 'statements': 0, 'failed': 0}
+
+            dbConn = dbpool.get_dbConn()
+            try:
+                outcomes, statements = self._apply(dbConn, ops)
+            finally:
+                dbpool.release(dbConn)
+
+            now = time.time()
+            with self.lock:
+                for (status, result), op_ids in grouped(outcomes).items():
+                    marks = ", ".join(["?"] * len(op_ids))
+                    self.db.execute(
+                        f"UPDATE ingest_queue SET status = ?, result = ?, applied = ? WHERE op_id IN ({marks})",
+                        [status, result, now] + op_ids)
+                self.db.commit()
+
+        return {'ops': len(ops), 'statements': statements,
+                'failed': sum(1 for status, _ in outcomes.values() if status == 'failed')}
+
+    def _apply(self, dbConn, ops):
+        try:
+            return _commit(dbConn, ops)
+        except Exception as err:
+            if len(ops) == 1:
+                return {ops[0].op_id: ('failed', {'error': str(err)})}, 0
+            print("**ingest batch failed, applying one at a time**", err)
+
+        outcomes, statements = {}, 0
+        for op in ops:
+            op_outcomes, op_statements = self._apply(dbConn, [op])
+            outcomes.update(op_outcomes)
+            statements += op_statements
+        return outcomes, statements
+
+    def purge(self):
+        with self.lock:
+            self.db.execute("DELETE FROM ingest_queue WHERE status != 'queued' AND applied < ?",
+                            (time.time() - self.keep,))
+            self.db.commit()
+
+
+def _commit(dbConn, ops):
+    dbCursor = dbConn.cursor()
+    try:
+        result = apply_ops(dbCursor, ops)
+        dbConn.commit()
+        return result
+    except Exception:
+        dbConn.rollback()
+        raise
+    finally:
+        dbCursor.close()
+
+
+class MySQLQueue:
+    """
+    Queue in the ingest_queue table, drained by any number of
+    containers at once.
+    """
+
+    CLAIM_SQL = """
+        SELECT op_id, user_id, kind, changes FROM ingest_queue
+        WHERE status = 'queued' {}
+        ORDER BY op_id LIMIT %s
+        FOR UPDATE SKIP LOCKED"""
+
+    def __init__(self, keep=KEEP):
+        self.keep = keep
+
+    def enqueue(self, user_id, kind, changes):
+        dbConn = dbpool.get_dbConn()
+        try:
+            dbCursor = dbConn.cursor()
+            try:
+                dbCursor.execute("""
+                    INSERT INTO ingest_queue (user_id, kind, changes, status, created)
+                    VALUES (%s, %s, %s, 'queued', NOW(6))""",
+                    (user_id, kind, json.dumps(changes)))
+                dbConn.commit()
+                return dbCursor.lastrowid
+            finally:
+                dbCursor.close()
+        finally:
+            dbpool.release(dbConn)
+
+    def status(self, user_id, op_id):
+        dbConn = dbpool.get_dbConn()
+        try:
+            row = datatier.retrieve_one_row(dbConn, """
+                SELECT op_id, kind, status, result,
+                       UNIX_TIMESTAMP(created), UNIX_TIMESTAMP(applied)
+                FROM ingest_queue WHERE op_id = %s AND user_id = %s""",
+                [op_id, user_id])
+        finally:
+            dbpool.release(dbConn)
+        if not row:
+            return None
+        op_id, kind, status, result, created, applied = row
+        return _record(op_id, kind, status, result,
+                       float(created), float(applied) if applied is not None else None)
+
+    def pending(self):
+        dbConn = dbpool.get_dbConn()
+        try:
+            row = datatier.retrieve_one_row(dbConn,
+                "SELECT COUNT(*) FROM ingest_queue WHERE status = 'queued'")
+            return row[0]
+        finally:
+            dbpool.release(dbConn)
+
+    def drain(self, limit=BATCH_SIZE):
+        """
+        Claims up to `limit` queued operations no other drain holds,
+        applies them and marks them, all in one transaction. If that
+        fails, each operation is claimed and applied on its own.
+
+        Returns
+        -------
+        summary dict: ops, statements, failed
+        """
+        dbConn = dbpool.get_dbConn()
+        try:
+            try:
+                summary = self._claim_and_apply(dbConn, "", [limit])
+            except Exception as err:
+                print("**ingest batch failed, applying one at a time**", err)
+                summary = {'ops': 0, 'statements': 0, 'failed': 0}
+                for op_id in self._queued_ids(dbConn, limit):
+                    try:
+                        one = self._claim_and_apply(dbConn, "AND op_id = %s", [op_id, 1])
+                    except Exception as err:
+                        one = self._fail(dbConn, op_id, err)
+                    for key in summary:
+                        summary[key] += one[key]
+
+            if summary['ops'] == 0:
+                datatier.perform_action(dbConn, """
+                    DELETE FROM ingest_queue
+                    WHERE status != 'queued' AND applied < NOW() - INTERVAL %s SECOND""",
+                    [self.keep])
+            return summary
+        finally:
+            dbpool.release(dbConn)
+
+    def _queued_ids(self, dbConn, limit):
+        rows = datatier.retrieve_all_rows(dbConn,
+            "SELECT op_id FROM ingest_queue WHERE status = 'queued' ORDER BY op_id LIMIT %s", [limit])
+        return [row[0] for row in rows]
+
+    def _claim_and_apply(self, dbConn, where, params):
+        dbCursor = dbConn.cursor()
+        try:
+            dbCursor.execute(self.CLAIM_SQL.format(where), params)
+            ops = [Op(op_id, user_id, kind, json.loads(changes))
+                   for op_id, user_id, kind, changes in dbCursor.fetchall()]
+            if not ops:
+                dbConn.rollback()
+                return {'ops': 0, 'statements': 0, 'failed': 0}
+
+            outcomes, statements = apply_ops(dbCursor, ops)
+            for (status, result), op_ids in grouped(outcomes).items():
+                marks = ", ".join(["%s"] * len(op_ids))
+                dbCursor.execute(
+                    f"UPDATE ingest_queue SET status = %s, result = %s, applied = NOW(6) WHERE op_id IN ({marks})",
+                    [status, result] + op_ids)
+            dbConn.commit()
+            return {'ops': len(ops), 'statements': statements,
+                    'failed': sum(1 for status, _ in outcomes.values() if status == 'failed')}
+        except Exception:
+            dbConn.rollback()
+            raise
+        finally:
+            dbCursor.close()
+
+    def _fail(self, dbConn, op_id, err):
+        marked = datatier.perform_action(dbConn, """
+            UPDATE ingest_queue SET status = 'failed', result = %s, applied = NOW(6)
+            WHERE op_id = %s AND status = 'queued'""",
+            [json.dumps({'error': str(err)}), op_id])
+        return {'ops': marked, 'statements': 0, 'failed': marked}
+
+
+def run_worker(queue):
+    """
+    Drains the queue until the process exits, sleeping `interval`
+    seconds whenever it is empty. Runs on a daemon thread (see
+    open_queue).
+    """
+    while True:
+        try:
+            summary = queue.drain(BATCH_SIZE)
+            if summary['ops']:
+                print("**Ingest drain**", summary)
+        except Exception as err:
+            print("**ingest drain failed**", err)
+            summary = {'ops': 0}
+        if not summary['ops']:
+            time.sleep(INTERVAL)
+
+
+def drain_all(queue, deadline=None):
+    """
+    Drains until the queue is empty or time.monotonic() passes the
+    deadline (the scheduled drain).
+
+    Returns
+    -------
+    summary dict: ops, statements, failed, batches
+    """
+    total = {'ops': 0, 'statements': 0, 'failed': 0, 'batches': 0}
+    while deadline is None or time.monotonic() < deadline:
+        summary = queue.drain(BATCH_SIZE)
+        if not summary['ops']:
+            break
+        for key in summary:
+            total[key] += summary[key]
+        total['batches'] += 1
+    return total
+
+
+def open_queue():
+    """
+    The container's queue configured in [ingest], with its worker
+    thread started; None in sync mode. Built once and shared by every
+    handler in the process.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    SQLiteQueue, MySQLQueue or None
+    """
+    global _queue
+
+    if MODE == 'sync':
+        return None
+    if MODE != 'queue':
+        raise Exception(f"unknown [ingest] mode '{MODE}'")
+
+    with _queue_lock:
+        if _queue is None:
+            backend = configur.get('ingest', 'backend', fallback='sqlite')
+            if backend == 'sqlite':
+                queue = SQLiteQueue(configur.get('ingest', 'path', fallback='/tmp/mealapp-ingest.db'))
+            elif backend == 'mysql':
+                queue = MySQLQueue()
+            else:
+                raise Exception(f"unknown [ingest] backend '{backend}'")
+            threading.Thread(target=run_worker, args=(queue,), daemon=True).start()
+            _queue = queue
+        return _queue
@@ -0,0 +1,102 @@
+#
+# invversion.py
+#
+# Inventory version counter for conditional GETs. Every inventory
+# mutation bumps the user's inventory_version.version in its own
+# transaction (see invmutate.py); readers turn the version into an
+# ETag, and a request whose If-None-Match still matches gets a 304
+# without the inventory being read at all.
+#
+
+import hashlib
+
+import datatier
+
+
+def current_version(dbConn, user_id):
+    """
+    Returns the current version of a user's inventory (a primary key
+    lookup).
+
+    Parameters
+    ----------
+    dbConn: open database connection
+    user_id: owner of the inventory
+
+    Returns
+    -------
+    version number, 0 if the user never changed their inventory
+    """
+    row = datatier.retrieve_one_row(dbConn,
+        "SELECT version FROM inventory_version WHERE user_id = %s", [user_id])
+    return row[0] if row else 0
+
+
+def bump_version(dbCursor, user_id):
+    """
+    Increments the version of a user's inventory. Call with the cursor
+    of the mutating transaction, before it commits.
+
+    Parameters
+    ----------
+    dbCursor: cursor of the open write transaction
+    user_id: owner of the inventory
+
+    Returns
+    -------
+    nothing
+    """
+    dbCursor.execute("""
+        INSERT INTO inventory_version (user_id, version) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1""", (user_id,))
+
+
+def make_etag(version, *parts):
+    """
+    Builds a strong ETag from the inventory version plus anything else
+    that shapes the response (page parameters, prompt, ...).
+
+    Parameters
+    ----------
+    version: inventory version
+    parts: other response inputs, str()-ed into the tag
+
+    Returns
+    -------
+    quoted ETag string
+    """
+    extra = hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:16]
+    return f'"{version}-{extra}"'
+
+
+def if_none_match(event):
+    """
+    Returns the If-None-Match request header (any case), or None.
+    """
+    headers = event.get('headers') or {}
+    for key, value in headers.items():
+        if key.lower() == 'if-none-match':
+            return value
+    return None
+
+
+def is_not_modified(event, etag):
+    """
+    True if the request's If-None-Match lists the given ETag.
+    """
+    header = if_none_match(event)
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(',')]
+    return '*' in tags or etag in tags or ('W/' + etag) in tags
+
+
+def not_modified(etag):
+    """
+    The 304 response returned when the client's copy is current.
+    """
+    return {
+        'statusCode': 304,
+        'headers': {'ETag': etag},
+        'body': ''
+    }
@@ -0,0 +1,120 @@
+#
+# bench_planner.py
+#
+# Latency and item coverage of the two /mealplan backends on synthetic
+# inventories of 10, 100 and 1000 lots drawn from the recipe
+# ingredients:
+#
+#   local    localplanner.plan, in process
+#   openai   the budgeted prompt posted to a chat completions URL;
+#            by default mocks/openai_mock.py started in-process (its
+#            canned plan makes the coverage figure meaningless, only
+#            the latency is), with --live the [openai] url and key of
+#            mealapp-config.ini (real, paid calls)
+#
+# Coverage is the share of the inventory's items the plan mentions.
+# Run from the repo root:
+#
+#   python3 slashMealplan/bench_planner.py [--sizes 10,100,1000] [--live]
+#
+
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, here)
+sys.path.insert(0, os.path.join(here, '..', 'shared'))
+sys.path.insert(0, os.path.join(here, '..', 'mocks'))
+
+import localplanner
+import openai_mock
+import promptbuilder
+import requests
+
+from appconfig import configur
+
+
+HEADER = "Generate a healthy and efficient meal plan from the following inventory, do not use " \
+    "anything not on the list. Items are listed soonest-expiring first; use those first."
+
+
+def synthetic_lots(lots, today):
+    rng = random.Random(lots)
+    names = sorted({name for recipe in localplanner.recipe_book().recipes for name in recipe['ingredients']})
+    rows = []
+    for i in range(lots):
+        name = names[i % len(names)] if i < len(names) else rng.choice(names)
+        expires = today + datetime.timedelta(days=rng.randint(0, 21))
+        rows.append((name, rng.randint(1, 6), expires.day, expires.month, expires.year))
+    return rows
+
+
+def coverage(text, rows):
+    names = {name for name, *_ in rows}
+    words = {localplanner.normalize(word.strip(".,:;()")) for word in text.split()}
+    return sum(1 for name in names if localplanner.normalize(name) in words) / len(names)
+
+
+def openai_plan(url, key, rows, today):
+    prompt = promptbuilder.build(rows, HEADER, today).text
+    response = requests.post(url, headers={"Authorization": f"Bearer {key}"}, json={
+        "model": "gpt-4",
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": 1000,
+        "temperature": 0.7
+    })
+    response.raise_for_status()
+    return response.json()["choices"][0]["message"]["content"]
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return result, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="local vs OpenAI meal planner")
+    parser.add_argument('--sizes', default="10,100,1000", help="lots per synthetic inventory")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per backend, the median is shown")
+    parser.add_argument('--latency', type=float, default=2.0, help="mock OpenAI latency, seconds")
+    parser.add_argument('--live', action='store_true', help="call the configured OpenAI endpoint")
+    args = parser.parse_args()
+
+    if args.live:
+        url = configur.get('openai', 'url', fallback="https://api.openai.com/v1/chat/completions")
+        key = configur.get('openai', 'key')
+    else:
+        server = openai_mock.make_server(0, args.latency)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://localhost:{server.server_address[1]}/v1/chat/completions"
+        key = "bench"
+
+    today = datetime.date.today()
+    print(f"{'lots':>6} {'items':>6}  {'backend':8} {'median ms':>10} {'coverage':>9}")
+
+    for lots in [int(n) for n in args.sizes.split(',')]:
+        rows = synthetic_lots(lots, today)
+        items = len({name for name, *_ in rows})
+
+        plan, ms = timed(lambda: localplanner.plan(rows, today), args.repeat)
+        print(f"{lots:6} {items:6}  {'local':8} {ms:10.2f} {coverage(plan.text, rows):9.0%}")
+
+        text, ms = timed(lambda: openai_plan(url, key, rows, today), 1 if args.live else args.repeat)
+        print(f"{lots:6} {items:6}  {'openai':8} {ms:10.2f} {coverage(text, rows):9.0%}")
+
+    if not args.live:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
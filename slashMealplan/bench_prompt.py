@@ -0,0 +1,110 @@
+#
+# bench_prompt.py
+#
+# Prompt size and OpenAI latency for synthetic inventories of 10, 100
+# and 1000 items (each item one to three lots). Compares
+#
+#   one line per lot   every lot, unbounded (how /mealplan used to
+#                      build its prompt)
+#   budgeted           promptbuilder.build: grouped, soonest-expiring
+#                      first, cut at the token budget
+#
+# The latency is measured against mocks/openai_mock.py, started
+# in-process with --prompt-delay seconds per 1000 prompt tokens, so
+# nothing leaves the machine. Run from the repo root:
+#
+#   python3 slashMealplan/bench_prompt.py [--sizes 10,100,1000] [--budget 1500]
+#
+
+import argparse
+import datetime
+import os
+import random
+import sys
+import threading
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, here)
+sys.path.insert(0, os.path.join(here, '..', 'shared'))
+sys.path.insert(0, os.path.join(here, '..', 'mocks'))
+
+import openai_mock
+import promptbuilder
+import requests
+
+
+OLD_HEADER = "Generate a healthy meal plan and efficent meal plan that uses every item from the following " \
+    "inventory, do not use anything not on the list."
+
+NEW_HEADER = "Generate a healthy and efficient meal plan from the following inventory, do not use " \
+    "anything not on the list. Items are listed soonest-expiring first; use those first."
+
+
+def synthetic_lots(items, today):
+    rng = random.Random(items)
+    rows = []
+    for i in range(items):
+        name = f"Item {i:04d}"
+        for _ in range(rng.randint(1, 3)):
+            expires = today + datetime.timedelta(days=rng.randint(0, 90))
+            rows.append((name, rng.randint(1, 12), expires.day, expires.month, expires.year))
+    return rows
+
+
+def one_line_per_lot(rows):
+    prompt = OLD_HEADER
+    for name, quantity, day, month, year in rows:
+        prompt += f"{name}: {quantity} units, expires on {year}-{month}-{day}\n"
+    return prompt
+
+
+def completion_ms(url, prompt):
+    start = time.perf_counter()
+    response = requests.post(url, json={
+        "model": "gpt-4",
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": 300
+    })
+    response.raise_for_status()
+    return (time.perf_counter() - start) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="meal plan prompt size and latency")
+    parser.add_argument('--sizes', default="10,100,1000", help="items per synthetic inventory")
+    parser.add_argument('--budget', type=int, default=1500, help="prompt token budget")
+    parser.add_argument('--latency', type=float, default=0.2, help="mock OpenAI base latency, seconds")
+    parser.add_argument('--prompt-delay', type=float, default=0.05,
+                        help="mock OpenAI seconds per 1000 prompt tokens")
+    args = parser.parse_args()
+
+    server = openai_mock.make_server(0, args.latency, 0.0, args.prompt_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://localhost:{server.server_address[1]}/v1/chat/completions"
+
+    today = datetime.date.today()
+    counter = "tiktoken" if promptbuilder._encoder("gpt-4") else f"{promptbuilder.CHARS_PER_TOKEN} chars/token"
+    print(f"token budget {args.budget}, counted with {counter}")
+    print(f"{'items':>6} {'lots':>6}  {'variant':18} {'tokens':>7} {'chars':>8} {'listed':>7} "
+          f"{'build ms':>9} {'openai ms':>10}")
+
+    for items in [int(n) for n in args.sizes.split(',')]:
+        rows = synthetic_lots(items, today)
+
+        start = time.perf_counter()
+        old = one_line_per_lot(rows)
+        old_ms = (time.perf_counter() - start) * 1000.0
+        print(f"{items:6} {len(rows):6}  {'one line per lot':18} {promptbuilder.count_tokens(old):7} "
+              f"{len(old):8} {len(rows):7} {old_ms:9.2f} {completion_ms(url, old):10.1f}")
+
+        new = promptbuilder.build(rows, NEW_HEADER, today, args.budget)
+        print(f"{items:6} {len(rows):6}  {'budgeted':18} {new.stats['tokens']:7} "
+              f"{new.stats['chars']:8} {new.stats['listed']:7} {new.stats['build_ms']:9.2f} "
+              f"{completion_ms(url, new.text):10.1f}")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
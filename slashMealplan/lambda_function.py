@@ -1,86 +1,316 @@
+import datetime
 import json
-import os
+import time
+import auth
 import datatier
-from configparser import ConfigParser
-import requests
+import dbpool
+import instrument
+import invversion
+import localplanner
+import plancache
+import promptbuilder
+from appconfig import configur
 
+
+PROMPT_HEADER = "Generate a healthy and efficient meal plan from the following inventory, do not use " \
+    "anything not on the list. Items are listed soonest-expiring first; use those first."
+
+DAY_HEADER = "Generate a healthy and efficient meal plan (breakfast, lunch and dinner) for day {day} of a " \
+    "{days}-day plan from the following inventory, do not use anything not on the list. Items are listed " \
+    "soonest-expiring first; use those first."
+
+MODEL = "gpt-4"
+MAX_TOKENS = configur.getint('mealplan', 'max_tokens', fallback=1000)
+TEMPERATURE = 0.7
+
+# multi-day plans (?days=N): one completion per day, MAX_CONCURRENCY of
+# them in flight, each given up after CALL_TIMEOUT seconds
+MAX_DAYS = 14
+MAX_CONCURRENCY = configur.getint('mealplan', 'max_concurrency', fallback=4)
+CALL_TIMEOUT = configur.getfloat('mealplan', 'call_timeout', fallback=30.0)
+
+# "openai" (GPT-4) or "local" (localplanner.py, offline)
+BACKEND = configur.get('mealplan', 'backend', fallback='openai')
+
+OPENAI_URL = configur.get('openai', 'url', fallback="https://api.openai.com/v1/chat/completions")
+
+# opened once per container, so the sqlite backend survives warm invocations
+cache = plancache.open_cache()
+
+
+def force_refresh_requested(event):
+    params = event.get('queryStringParameters') or {}
+    return str(params.get('force_refresh', '')).lower() in ['1', 'true', 'yes']
+
+
+def requested_days(event):
+    """
+    The ?days=N of the request: None when absent (OpenAI plans the
+    whole inventory in one call, the local planner [mealplan] days),
+    else 1..MAX_DAYS; raises ValueError otherwise.
+    """
+    params = event.get('queryStringParameters') or {}
+    if not params.get('days'):
+        return None
+    days = int(params['days'])
+    if not 1 <= days <= MAX_DAYS:
+        raise ValueError(f"days must be between 1 and {MAX_DAYS}")
+    return days
+
+
+def read_inventory(dbConn, user_id):
+    # Retrieve the user's lots from the database, each with its own date
+    sql = "SELECT name, quantity, day, month, year FROM lots WHERE user_id = %s ORDER BY name, expiry"
+    with instrument.span("query"):
+        inventory_rows = datatier.retrieve_all_rows(dbConn, sql, [user_id])
+    instrument.count("rows", len(inventory_rows))
+    print("**Inventory retrieved**")
+    if instrument.DEBUG:
+        for row in inventory_rows:
+            print(row)
+    return inventory_rows
+
+
+def plan_cache_key(inventory_rows, today, days):
+    # the prompt lists days left, so the same lots make a new prompt each day
+    return plancache.fingerprint(inventory_rows, {
+        "model": MODEL,
+        "max_tokens": MAX_TOKENS,
+        "temperature": TEMPERATURE,
+        "prompt": PROMPT_HEADER,
+        "prompt_tokens": promptbuilder.PROMPT_TOKENS,
+        "backend": BACKEND,
+        "days": days or localplanner.PLAN_DAYS,
+        "multi_day": days is not None,
+        "today": today.isoformat()
+    })
+
+
+def build_prompt(inventory_rows, today, header=PROMPT_HEADER):
+    with instrument.span("prompt"):
+        prompt = promptbuilder.build(inventory_rows, header, today, model=MODEL)
+    instrument.count("prompt_tokens", prompt.stats["tokens"])
+    print("**Prompt built**", json.dumps(prompt.stats))
+    return prompt.text
+
+
+def openai_request(prompt, stream=False, timeout=None):
+    # imported here: the local backend and cache hits never need it
+    import requests
+
+    # Retrieve the OpenAI API key from config file
+    openai_api_key = configur.get('openai', 'key')
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {openai_api_key}"
+    }
+    data = {
+        "model": MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": MAX_TOKENS,
+        "temperature": TEMPERATURE,
+        "n": 1,
+        "stream": stream
+    }
+
+    response = requests.post(OPENAI_URL, headers=headers, json=data, stream=stream, timeout=timeout)
+    if response.status_code != 200:
+        raise Exception(f"OpenAI API error: {response.status_code}, {response.text}")
+    return response
+
+
+def request_meal_plan(prompt, timeout=None):
+    """
+    Buffered completion: returns the whole plan text, or None if the
+    model returned no choices.
+    """
+    start = time.perf_counter()
+    res = openai_request(prompt, timeout=timeout).json()
+    print("**OpenAI completion**", json.dumps({
+        "latency_ms": round((time.perf_counter() - start) * 1000.0, 1),
+        "usage": res.get("usage")
+    }))
+    if "choices" in res and res["choices"]:
+        return res["choices"][0]["message"]["content"].strip()
+    return None
+
+
+def stream_meal_plan(prompt):
+    """
+    Streamed completion: yields pieces of the plan text as the model
+    produces them (server-sent events, one "data:" line per chunk).
+    """
+    start = time.perf_counter()
+    first_token_ms = None
+    response = openai_request(prompt, stream=True)
+    try:
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            payload = line[len("data:"):].strip()
+            if payload == "[DONE]":
+                break
+            chunk = json.loads(payload)
+            for choice in chunk.get("choices", []):
+                text = choice.get("delta", {}).get("content")
+                if text:
+                    if first_token_ms is None:
+                        first_token_ms = round((time.perf_counter() - start) * 1000.0, 1)
+                    yield text
+    finally:
+        response.close()
+        print("**OpenAI stream**", json.dumps({
+            "first_token_ms": first_token_ms,
+            "latency_ms": round((time.perf_counter() - start) * 1000.0, 1)
+        }))
+
+
+def day_plans(inventory_rows, today, days):
+    """
+    Plans each day from its share of the inventory (the soonest-expiring
+    items go to day 1), with the days' completions run concurrently.
+
+    Parameters
+    ----------
+    inventory_rows: the user's lots
+    today: date the days left are counted from
+    days: number of days
+
+    Returns
+    -------
+    generator of (day section text, generated ok), in day order; a day
+    is yielded as soon as it and the days before it are done
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    allocations = promptbuilder.allocate_days(inventory_rows, today, days)
+
+    def plan_day(day, rows):
+        if not rows:
+            return "nothing left in the inventory for this day", True
+        try:
+            header = DAY_HEADER.format(day=day, days=days)
+            text = request_meal_plan(build_prompt(rows, today, header), timeout=CALL_TIMEOUT)
+            return (text, True) if text else ("no plan generated", False)
+        except Exception as err:
+            print(f"**ERROR: day {day}**", str(err))
+            return f"not generated ({type(err).__name__})", False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENCY, days)) as pool:
+        futures = [pool.submit(plan_day, day, rows) for day, rows in enumerate(allocations, 1)]
+        for day, future in enumerate(futures, 1):
+            text, ok = future.result()
+            yield f"Day {day}:\n{text}", ok
+
+    print("**Multi-day plan**", json.dumps({
+        "days": days,
+        "max_concurrency": MAX_CONCURRENCY,
+        "latency_ms": round((time.perf_counter() - start) * 1000.0, 1)
+    }))
+
+
+def openai_plan(inventory_rows, today, days):
+    if days is None:
+        prompt = build_prompt(inventory_rows, today)
+        with instrument.span("openai"):
+            text = request_meal_plan(prompt)
+        return text, text is not None
+
+    # the day calls run on worker threads, timed here as a whole
+    with instrument.span("openai"):
+        sections = list(day_plans(inventory_rows, today, days))
+    return "\n\n".join(text for text, ok in sections), all(ok for text, ok in sections)
+
+
+def local_plan(inventory_rows, today, days):
+    with instrument.span("local_plan"):
+        plan = localplanner.plan(inventory_rows, today, days)
+    print("**Local plan**", json.dumps(plan.stats))
+    return plan.text, True
+
+
+PLANNERS = {
+    "openai": openai_plan,
+    "local": local_plan
+}
+
+if BACKEND not in PLANNERS:
+    raise Exception(f"unknown [mealplan] backend '{BACKEND}'")
+
+
+@instrument.handler("mealplan")
 def lambda_handler(event, context):
     try:
         print("**STARTING /mealplan Lambda**")
         print("**lambda: proj05_mealplan**")
-        
-        # Load configuration
-        config_file = 'mealapp-config.ini'
-        os.environ['AWS_SHARED_CREDENTIALS_FILE'] = config_file
-        
-        configur = ConfigParser()
-        configur.read(config_file)
-        
-        rds_endpoint = configur.get('rds', 'endpoint')
-        rds_portnum = int(configur.get('rds', 'port_number'))
-        rds_username = configur.get('rds', 'user_name')
-        rds_pwd = configur.get('rds', 'user_pwd')
-        rds_dbname = configur.get('rds', 'db_name')
-        
-        print("**Opening DB connection**")
-        dbConn = datatier.get_dbConn(rds_endpoint, rds_portnum, rds_username, rds_pwd, rds_dbname)
 
+        try:
+            user_id = auth.user_id(event)
+        except auth.AuthError as err:
+            return auth.unauthorized(err)
 
-        # Retrieve inventory from the database
-        sql = "SELECT * FROM inventory ORDER BY name"
-        inventory_rows = datatier.retrieve_all_rows(dbConn, sql)
-        print("**Inventory retrieved**")
-        for row in inventory_rows:
-            print(row)
+        try:
+            days = requested_days(event)
+        except ValueError as err:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"error": str(err)})
+            }
 
-        
-        prompt = "Generate a healthy meal plan and efficent meal plan that uses every item from the following " \
-        "inventory, do not use anything not on the list."
+        print("**Opening DB connection**")
+        dbConn = dbpool.get_dbConn()
 
+        # The plan only depends on the inventory and the prompt settings,
+        # so a client holding a plan for the current inventory version
+        # gets a 304 without the inventory read or the OpenAI call
+        today = datetime.date.today()
+        with instrument.span("version"):
+            version = invversion.current_version(dbConn, user_id)
+        etag = invversion.make_etag(version, "mealplan", user_id, BACKEND, MODEL, MAX_TOKENS, TEMPERATURE,
+                                    PROMPT_HEADER, promptbuilder.PROMPT_TOKENS, localplanner.PLAN_DAYS, days, today)
 
-        for item in inventory_rows:
-            name = item[0]
-            quantity = item[1]
-            day = item[2]
-            month = item[3]
-            year = item[4]
-            prompt += f"{name}: {quantity} units, expires on {year}-{month}-{day}\n"
+        force_refresh = force_refresh_requested(event)
 
-        print("Constructed prompt:")
-        print(prompt)
+        if not force_refresh and invversion.is_not_modified(event, etag):
+            print("**Not modified, returning 304**")
+            return invversion.not_modified(etag)
 
+        inventory_rows = read_inventory(dbConn, user_id)
 
-        # Retrieve the OpenAI API key from config file
-        openai_api_key = configur.get('openai', 'key')
-        
-        # Set up the request to the OpenAI API using the text-davinci-003 model.
-        openai_url = "https://api.openai.com/v1/chat/completions"
+        # The connection is not needed for the OpenAI call, hand it back now
+        dbpool.release(dbConn)
+        dbConn = None
 
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {openai_api_key}"
-        }
-        data = {
-            "model": "gpt-4",
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 300,
-            "temperature": 0.7,
-            "n": 1
-        }
+        cache_key = plan_cache_key(inventory_rows, today, days)
 
-        response = requests.post(openai_url, headers=headers, json=data)
-        if response.status_code != 200:
-            raise Exception(f"OpenAI API error: {response.status_code}, {response.text}")
-        
-        res = response.json()
-        meal_plan_text = res["choices"][0]["message"]["content"].strip() if "choices" in res and res["choices"] else "No meal plan generated"
+        if not force_refresh:
+            with instrument.span("cache"):
+                cached_plan = cache.get(cache_key)
+            if cached_plan is not None:
+                print("**Meal plan cache hit**")
+                return {
+                    "statusCode": 200,
+                    "headers": {"ETag": etag, "X-Cache": "HIT"},
+                    "body": json.dumps({"meal_plan": cached_plan, "cached": True})
+                }
 
+        meal_plan_text, complete = PLANNERS[BACKEND](inventory_rows, today, days)
 
-        print(meal_plan_text)
+        if meal_plan_text is None:
+            meal_plan_text = "No meal plan generated"
+        elif complete:
+            with instrument.span("cache"):
+                cache.put(cache_key, meal_plan_text)
+
+        if instrument.DEBUG:
+            print(meal_plan_text)
 
         return {
             "statusCode": 200,
-            "body": json.dumps({"meal_plan": meal_plan_text})
+            "headers": {"ETag": etag, "X-Cache": "MISS"},
+            "body": json.dumps({"meal_plan": meal_plan_text, "complete": complete})
         }
 
 
@@ -93,3 +323,85 @@ def lambda_handler(event, context):
         'statusCode': 500,
         'body': json.dumps(str(err))
         }
+
+    finally:
+        if 'dbConn' in locals():
+            dbpool.release(dbConn)
+            print("**Pool stats**", dbpool.stats())
+
+
+def stream_handler(event, context):
+    """
+    Streaming variant of lambda_handler: a generator of plain-text
+    chunks, written to the client as they arrive. Deploy it behind a
+    response-streaming front end (a function URL with the Lambda Web
+    Adapter, or mocks/mealplan_stream_server.py locally); API Gateway
+    REST endpoints buffer, so /mealplan through the gateway keeps
+    using lambda_handler.
+
+    Parameters
+    ----------
+    event: same as lambda_handler (force_refresh and days are honored)
+    context: lambda context
+
+    Returns
+    -------
+    generator of str chunks; errors are reported in-band as a final
+    "**ERROR: ..." chunk since the status line is already sent
+    """
+    print("**STARTING /mealplan streaming Lambda**")
+
+    try:
+        user_id = auth.user_id(event)
+        days = requested_days(event)
+        today = datetime.date.today()
+
+        dbConn = dbpool.get_dbConn()
+        try:
+            inventory_rows = read_inventory(dbConn, user_id)
+        finally:
+            dbpool.release(dbConn)
+
+        cache_key = plan_cache_key(inventory_rows, today, days)
+
+        if not force_refresh_requested(event):
+            cached_plan = cache.get(cache_key)
+            if cached_plan is not None:
+                print("**Meal plan cache hit**")
+                yield cached_plan
+                return
+
+        if BACKEND != "openai":
+            meal_plan_text, complete = PLANNERS[BACKEND](inventory_rows, today, days)
+            if complete:
+                cache.put(cache_key, meal_plan_text)
+            yield meal_plan_text
+            return
+
+        if days is not None:
+            # days are streamed whole, in order, as they complete
+            sections = []
+            complete = True
+            for text, ok in day_plans(inventory_rows, today, days):
+                sections.append(text)
+                complete = complete and ok
+                yield ("\n\n" if len(sections) > 1 else "") + text
+            if complete:
+                cache.put(cache_key, "\n\n".join(sections))
+            return
+
+        prompt = build_prompt(inventory_rows, today)
+
+        pieces = []
+        for text in stream_meal_plan(prompt):
+            pieces.append(text)
+            yield text
+
+        meal_plan_text = "".join(pieces).strip()
+        if meal_plan_text:
+            cache.put(cache_key, meal_plan_text)
+
+    except Exception as err:
+        print("**ERROR**")
+        print(str(err))
+        yield f"\n**ERROR: {err}"
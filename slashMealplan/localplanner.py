@@ -0,0 +1,198 @@
+#
+# localplanner.py
+#
+# Offline meal planner, the "local" /mealplan backend. Fills every
+# meal of a plan with a recipe from recipes.json (deployed with the
+# lambda) whose ingredients are all in the user's inventory; pantry
+# staples (salt, oil, flour, spices) are assumed. No network call, so
+# a plan takes milliseconds instead of a multi-second OpenAI round trip.
+#
+# The recipes are indexed by ingredient once per container, so only the
+# recipes sharing an ingredient with the inventory are looked at. Each
+# meal gets the recipe that covers the most soon-expiring items: an
+# item weighs 1 / (1 + days left), a quarter of that once an earlier
+# meal has used it, and an item is not planned past its expiry day.
+# Ties go to the recipe listed first, so the same inventory always
+# gives the same plan.
+#
+#   [mealplan]
+#   backend = local         ; or openai (default)
+#   days = 3                ; days per plan
+#   recipes = ...           ; another recipe file, default recipes.json
+#                           ; next to this module
+#
+
+import json
+import os
+import time
+
+from collections import Counter, namedtuple
+
+from appconfig import configur
+
+import promptbuilder
+
+
+MEALS = ['breakfast', 'lunch', 'dinner']
+
+PLAN_DAYS = configur.getint('mealplan', 'days', fallback=3)
+
+RECIPES_PATH = configur.get('mealplan', 'recipes',
+                            fallback=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recipes.json'))
+
+# weight of an item an earlier meal of the plan already uses
+REUSE_WEIGHT = 0.25
+
+Plan = namedtuple('Plan', ['text', 'stats'])
+
+_book = None
+
+
+def normalize(name):
+    """
+    Index key for an ingredient or inventory item name, so "Tomatoes",
+    "tomato" and " TOMATO " meet.
+    """
+    key = " ".join(name.lower().split())
+    if key.endswith("oes"):
+        return key[:-2]
+    if key.endswith("s") and not key.endswith("ss"):
+        return key[:-1]
+    return key
+
+
+class RecipeBook:
+    """
+    Recipes plus an ingredient -> recipes index.
+    """
+
+    def __init__(self, recipes):
+        self.recipes = recipes
+        self.keys = []
+        self.index = {}
+        for position, recipe in enumerate(recipes):
+            keys = sorted({normalize(name) for name in recipe['ingredients']})
+            self.keys.append(keys)
+            for key in keys:
+                self.index.setdefault(key, []).append(position)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def candidates(self, keys):
+        """
+        Positions of the recipes whose every ingredient is in keys,
+        found through the index.
+
+        Parameters
+        ----------
+        keys: set of normalized item names
+
+        Returns
+        -------
+        sorted list of recipe positions
+        """
+        hits = Counter()
+        for key in keys:
+            for position in self.index.get(key, ()):
+                hits[position] += 1
+        return sorted(position for position, count in hits.items() if count == len(self.keys[position]))
+
+
+def recipe_book():
+    """
+    Returns the container's recipe book, loading it on first use.
+    """
+    global _book
+    if _book is None:
+        _book = RecipeBook.load(RECIPES_PATH)
+    return _book
+
+
+def plan(rows, today, days=None, book=None):
+    """
+    Plans `days` days of meals from a user's lots.
+
+    Parameters
+    ----------
+    rows: (name, quantity, day, month, year) lots
+    today: date of the first day of the plan
+    days: days to plan, default [mealplan] days
+    book: RecipeBook, default recipe_book()
+
+    Returns
+    -------
+    Plan(text, stats), stats being a dict with the number of items,
+    candidate recipes, meals planned, the share of the items the plan
+    uses (coverage) and the planning time in ms
+    """
+    start = time.perf_counter()
+    days = days or PLAN_DAYS
+    book = book or recipe_book()
+
+    # key -> [item name, quantity left, days left]
+    stock = {}
+    items, _ = promptbuilder.group_items(rows, today)
+    for name, quantity, days_left in items:
+        key = normalize(name)
+        if key in stock:
+            stock[key][1] += quantity
+            stock[key][2] = min(stock[key][2], days_left)
+        else:
+            stock[key] = [name, quantity, days_left]
+
+    by_meal = {meal: [] for meal in MEALS}
+    candidates = book.candidates(stock.keys())
+    for position in candidates:
+        by_meal.setdefault(book.recipes[position]['meal'], []).append(position)
+
+    picked = set()
+    used = set()
+    lines = []
+    meals_planned = 0
+
+    for day in range(days):
+        lines.append(f"Day {day + 1}:")
+        for meal in MEALS:
+            best = None
+            best_score = 0.0
+            for position in by_meal[meal]:
+                if position in picked:
+                    continue
+                score = 0.0
+                for key in book.keys[position]:
+                    name, quantity, days_left = stock[key]
+                    if quantity <= 0 or days_left < day:
+                        break
+                    weight = 1.0 / (1 + days_left)
+                    score += weight * REUSE_WEIGHT if key in used else weight
+                else:
+                    if score > best_score:
+                        best, best_score = position, score
+
+            if best is None:
+                lines.append(f"  {meal.capitalize()}: nothing left in the inventory for this meal")
+                continue
+
+            picked.add(best)
+            used.update(book.keys[best])
+            for key in book.keys[best]:
+                stock[key][1] -= 1
+            names = ", ".join(stock[key][0] for key in book.keys[best])
+            lines.append(f"  {meal.capitalize()}: {book.recipes[best]['name']} ({names})")
+            meals_planned += 1
+
+    unused = sorted(item[0] for key, item in stock.items() if key not in used)
+    if unused:
+        lines.append("Not used: " + ", ".join(unused))
+
+    stats = {
+        "items": len(stock),
+        "candidates": len(candidates),
+        "meals": meals_planned,
+        "coverage": round(len(used) / len(stock), 3) if stock else 0.0,
+        "plan_ms": round((time.perf_counter() - start) * 1000.0, 2)
+    }
+    return Plan("\n".join(lines), stats)
@@ -0,0 +1,184 @@
+#
+# plancache.py
+#
+# Cache of generated meal plans, keyed by a fingerprint of the
+# inventory rows and the prompt settings. The same inventory asked
+# for with the same settings is answered from the cache instead of
+# another multi-second, paid OpenAI call.
+#
+# Entries expire after `ttl` seconds; past `max_entries` the least
+# recently used ones are evicted. Configured in mealapp-config.ini:
+#
+#   [mealplan_cache]
+#   backend = sqlite        ; sqlite (file in /tmp, per container),
+#                           ; mysql (mealplan_cache table, shared by
+#                           ; all containers) or none
+#   path = /tmp/mealplan-cache.db
+#   ttl = 86400
+#   max_entries = 256
+#
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+import datatier
+import dbpool
+
+from appconfig import configur
+
+
+def fingerprint(rows, params):
+    """
+    Stable hash of the inventory and the prompt parameters; row order
+    does not matter.
+
+    Parameters
+    ----------
+    rows: inventory rows (tuples/lists of JSON-able values)
+    params: dict of prompt/model settings
+
+    Returns
+    -------
+    hex sha256 string
+    """
+    payload = {
+        "rows": sorted(list(row) for row in rows),
+        "params": params
+    }
+    text = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SQLiteCache:
+    """
+    Plan cache in a local SQLite file. On Lambda the file lives in
+    /tmp, so it survives warm invocations of the same container.
+    """
+
+    def __init__(self, path, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS mealplan_cache (
+              cache_key TEXT PRIMARY KEY,
+              plan TEXT NOT NULL,
+              created REAL NOT NULL,
+              last_used REAL NOT NULL
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON mealplan_cache (last_used)")
+        self.db.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            row = self.db.execute(
+                "SELECT plan FROM mealplan_cache WHERE cache_key = ? AND created > ?",
+                (key, now - self.ttl)).fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE mealplan_cache SET last_used = ? WHERE cache_key = ?", (now, key))
+            self.db.commit()
+        return row[0]
+
+    def put(self, key, plan):
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO mealplan_cache (cache_key, plan, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, plan, now, now))
+            self.db.execute("DELETE FROM mealplan_cache WHERE created <= ?", (now - self.ttl,))
+            self.db.execute("""
+                DELETE FROM mealplan_cache WHERE cache_key NOT IN
+                  (SELECT cache_key FROM mealplan_cache ORDER BY last_used DESC LIMIT ?)""",
+                (self.max_entries,))
+            self.db.commit()
+
+
+class MySQLCache:
+    """
+    Plan cache in the mealapp database (table mealplan_cache, see
+    setup.sql), shared by every container.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    def get(self, key):
+        dbConn = dbpool.get_dbConn()
+        try:
+            row = datatier.retrieve_one_row(dbConn, """
+                SELECT plan FROM mealplan_cache
+                WHERE cache_key = %s AND created > NOW() - INTERVAL %s SECOND""",
+                [key, self.ttl])
+            if not row:
+                return None
+            datatier.perform_action(dbConn,
+                "UPDATE mealplan_cache SET last_used = NOW(6) WHERE cache_key = %s", [key])
+            return row[0]
+        finally:
+            dbpool.release(dbConn)
+
+    def put(self, key, plan):
+        dbConn = dbpool.get_dbConn()
+        try:
+            datatier.perform_action(dbConn, """
+                INSERT INTO mealplan_cache (cache_key, plan, created, last_used)
+                VALUES (%s, %s, NOW(), NOW(6))
+                ON DUPLICATE KEY UPDATE plan = VALUES(plan), created = NOW(), last_used = NOW(6)""",
+                [key, plan])
+            #
+            # LRU trim: drop everything older than the max_entries-th
+            # most recently used entry (and anything past its TTL)
+            #
+            datatier.perform_action(dbConn, """
+                DELETE c FROM mealplan_cache c
+                JOIN (SELECT last_used FROM mealplan_cache
+                      ORDER BY last_used DESC LIMIT 1 OFFSET %s) cutoff
+                  ON c.last_used <= cutoff.last_used""",
+                [self.max_entries])
+            datatier.perform_action(dbConn,
+                "DELETE FROM mealplan_cache WHERE created <= NOW() - INTERVAL %s SECOND",
+                [self.ttl])
+        finally:
+            dbpool.release(dbConn)
+
+
+class NoCache:
+
+    def get(self, key):
+        return None
+
+    def put(self, key, plan):
+        pass
+
+
+def open_cache():
+    """
+    Builds the cache configured in [mealplan_cache].
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    object with get(key) -> plan or None, and put(key, plan)
+    """
+    backend = configur.get('mealplan_cache', 'backend', fallback='sqlite')
+    ttl = configur.getint('mealplan_cache', 'ttl', fallback=86400)
+    max_entries = configur.getint('mealplan_cache', 'max_entries', fallback=256)
+
+    if backend == 'sqlite':
+        path = configur.get('mealplan_cache', 'path', fallback='/tmp/mealplan-cache.db')
+        return SQLiteCache(path, ttl, max_entries)
+    if backend == 'mysql':
+        return MySQLCache(ttl, max_entries)
+    if backend == 'none':
+        return NoCache()
+    raise Exception(f"unknown [mealplan_cache] backend '{backend}'")
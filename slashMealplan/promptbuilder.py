@@ -0,0 +1,191 @@
+#
+# promptbuilder.py
+#
+# Builds the /mealplan prompt within a token budget. The lots are
+# grouped by item into one compact table row each (total quantity,
+# days until the earliest lot expires) and listed soonest-expiring
+# first; once the budget is reached the remaining items, the ones
+# that keep longest, are left out and only counted. Lots that have
+# already expired are never listed.
+#
+# Tokens are counted with tiktoken when it is installed (exact for
+# OpenAI models), otherwise estimated at CHARS_PER_TOKEN characters
+# per token. allocate_days() splits the lots of a multi-day plan into
+# one share per day. Configured in mealapp-config.ini:
+#
+#   [mealplan]
+#   prompt_tokens = 1500    ; budget for the whole prompt
+#   max_tokens = 1000       ; budget for the generated plan
+#
+
+import datetime
+import time
+
+from collections import namedtuple
+
+import invitem
+
+from appconfig import configur
+
+
+PROMPT_TOKENS = configur.getint('mealplan', 'prompt_tokens', fallback=1500)
+
+CHARS_PER_TOKEN = 4
+
+TABLE_HEADER = "item|qty|days left"
+
+Prompt = namedtuple('Prompt', ['text', 'stats'])
+
+_encoders = {}
+
+
+def _encoder(model):
+    if model not in _encoders:
+        try:
+            import tiktoken
+            _encoders[model] = tiktoken.encoding_for_model(model)
+        except (ImportError, KeyError):
+            # not installed, or a model tiktoken does not know
+            _encoders[model] = None
+    return _encoders[model]
+
+
+def count_tokens(text, model="gpt-4"):
+    """
+    Number of tokens in text for the given model; estimated from its
+    length if tiktoken is not available.
+    """
+    encoder = _encoder(model)
+    if encoder is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoder.encode(text))
+
+
+def expiry_date(day, month, year):
+    """
+    The date of a lot's (day, month, year), normalized the way the
+    lots.expiry column is (see invitem.ordinal).
+    """
+    return datetime.date.fromordinal(invitem.ordinal(day, month, year))
+
+
+def group_items(rows, today):
+    """
+    Folds lots into one entry per item.
+
+    Parameters
+    ----------
+    rows: (name, quantity, day, month, year) lots
+    today: date the days left are counted from
+
+    Returns
+    -------
+    (items, expired): items is a list of [name, total quantity, days
+    until the earliest lot expires], soonest first; expired is the
+    number of lots left out because their date has passed
+    """
+    items = {}
+    expired = 0
+    today = today.toordinal()
+
+    for name, quantity, day, month, year in rows:
+        days_left = invitem.ordinal(day, month, year) - today
+        if days_left < 0:
+            expired += 1
+            continue
+        item = items.setdefault(name, [name, 0, days_left])
+        item[1] += quantity
+        item[2] = min(item[2], days_left)
+
+    ordered = sorted(items.values(), key=lambda item: (item[2], item[0]))
+    return ordered, expired
+
+
+def allocate_days(rows, today, days):
+    """
+    Splits lots into per-day shares for a multi-day plan: the items,
+    soonest-expiring first, are cut into `days` runs of (nearly) equal
+    length, so day 1 gets the items that expire first. All lots of an
+    item go to the same day; expired lots go nowhere.
+
+    Parameters
+    ----------
+    rows: (name, quantity, day, month, year) lots
+    today: date the days left are counted from
+    days: number of days
+
+    Returns
+    -------
+    list of `days` lists of lots
+    """
+    items, _ = group_items(rows, today)
+    per_day = -(-len(items) // days)
+
+    day_of = {}
+    for position, item in enumerate(items):
+        day_of[item[0]] = position // per_day
+
+    allocations = [[] for _ in range(days)]
+    for row in rows:
+        if row[0] in day_of:
+            allocations[day_of[row[0]]].append(row)
+    return allocations
+
+
+def build(rows, header, today=None, budget=None, model="gpt-4"):
+    """
+    Builds the prompt for a user's lots.
+
+    Parameters
+    ----------
+    rows: (name, quantity, day, month, year) lots
+    header: instructions placed before the inventory table
+    today: date the days left are counted from, default today
+    budget: maximum prompt tokens, default [mealplan] prompt_tokens
+    model: model the tokens are counted for
+
+    Returns
+    -------
+    Prompt(text, stats), stats being a dict with the number of lots,
+    items, items listed, items omitted, expired lots, tokens, chars
+    and the build time in ms
+    """
+    start = time.perf_counter()
+    today = today or datetime.date.today()
+    budget = budget or PROMPT_TOKENS
+
+    items, expired = group_items(rows, today)
+
+    lines = [header, TABLE_HEADER]
+    tokens = count_tokens("\n".join(lines) + "\n", model)
+
+    # room for the omitted-items line, so adding it never overshoots
+    reserve = count_tokens(f"(+{len(items)} more items that keep longer)\n", model)
+
+    listed = 0
+    for name, quantity, days_left in items:
+        line = f"{name}|{quantity}|{days_left}"
+        cost = count_tokens(line + "\n", model)
+        if tokens + cost + reserve > budget:
+            break
+        lines.append(line)
+        tokens += cost
+        listed += 1
+
+    omitted = len(items) - listed
+    if omitted:
+        lines.append(f"(+{omitted} more items that keep longer)")
+
+    text = "\n".join(lines) + "\n"
+
+    stats = {
+        "lots": len(rows),
+        "items": len(items),
+        "listed": listed,
+        "omitted": omitted,
+        "expired": expired,
+        "tokens": count_tokens(text, model),
+        "chars": len(text),
+        "build_ms": round((time.perf_counter() - start) * 1000.0, 2)
+    }
+    return Prompt(text, stats)
@@ -0,0 +1,69 @@
+#
+# bench_qrdecode.py
+#
+# Compares per-image decode latency of the QR backends in qrdecode.py.
+# Run from the repo root:
+#
+#   python3 slashUpload/bench_qrdecode.py [-n 20] [image ...]
+#
+# Defaults to SmartMealPlanner-client/orange.png. The qrserver backend
+# makes a real call to api.qrserver.com (or [qr] qrserver_url); skip
+# it with --local-only.
+#
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, here)
+sys.path.insert(0, os.path.join(here, '..', 'shared'))
+
+import qrdecode
+
+
+def time_backend(backend, image_data, runs):
+    timings = []
+    text = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        text = qrdecode.decode(image_data, backend=backend, fallback='')
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return text, timings
+
+
+def main():
+    default_image = os.path.join(here, '..', 'SmartMealPlanner-client', 'orange.png')
+
+    parser = argparse.ArgumentParser(description="QR decoder backend latency")
+    parser.add_argument('images', nargs='*', default=[default_image])
+    parser.add_argument('-n', '--runs', type=int, default=20)
+    parser.add_argument('--local-only', action='store_true')
+    args = parser.parse_args()
+
+    backends = qrdecode.available_backends()
+    if args.local_only:
+        backends = [b for b in backends if b != 'qrserver']
+    print("backends:", ", ".join(backends) or "(none)")
+
+    for path in args.images:
+        with open(path, 'rb') as f:
+            image_data = f.read()
+        print()
+        print(f"{os.path.basename(path)} ({len(image_data)} bytes)")
+        for backend in backends:
+            # the qrserver backend is a paid-for round trip, keep it short
+            runs = args.runs if backend != 'qrserver' else min(args.runs, 5)
+            try:
+                text, timings = time_backend(backend, image_data, runs)
+            except Exception as err:
+                print(f"  {backend:9} failed: {err}")
+                continue
+            print(f"  {backend:9} median {statistics.median(timings):8.2f} ms"
+                  f"  min {min(timings):8.2f} ms  ({runs} runs) -> {text!r}")
+
+
+if __name__ == '__main__':
+    main()
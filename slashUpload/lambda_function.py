@@ -3,30 +3,56 @@
 ##/upload -> will take in a qr code image and then add the necesarry input in.
 #all qr codes will be in the format:
 #ITEMNAME-DD-MM-YY-QUANITIY
+#
+#batch mode: a JSON body {"images": [<base64>, ...]} is decoded
+#concurrently and every parsed item is written with one upsert.
+#
+#request bodies:
+#  raw image bytes (Content-Type application/octet-stream or image/*,
+#    isBase64Encoded from API Gateway binary media types / function URLs)
+#  {"image": <base64>}       single image as JSON
+#  {"qr_text": "..."}        already decoded on the client, no scan needed
+#  {"images": [...]}         batch, entries are base64 images or
+#                            {"qr_text": "..."} objects
+#
+#items go into the calling user's inventory (see auth.py).
+#
+#images already decoded once (same SHA-256) are answered from
+#qrcache.py instead of being scanned again; the response carries
+#the cache counters under "qr_cache".
+#
+#with [ingest] mode = queue the decoded items are queued instead of
+#written (see invqueue.py): the response is a 202 with the "op_id"
+#to poll at GET /inventory?op=<id>.
 
 
 import json
-import requests
 import base64
-import pymysql
-from configparser import ConfigParser
+import auth
+import dbpool
+import instrument
+import invmutate
+import invqueue
+import qrcache
+import qrdecode
+from appconfig import configur
+from concurrent.futures import ThreadPoolExecutor
 
 
-def scan_QR(image_path):
-    url = "https://api.qrserver.com/v1/read-qr-code/"
-    with open(image_path, "rb") as image_file:
-        files = {"file": image_file}
-        response = requests.post(url, files=files)
-    
+DECODE_WORKERS = configur.getint('upload', 'decode_workers', fallback=8)
+MAX_BATCH = configur.getint('upload', 'max_batch', fallback=50)
+
+# module scope: survives warm invocations of this container
+cache = qrcache.open_cache()
 
-    if response.status_code == 200:
-        data = response.json()
+# None: items are written before responding
+queue = invqueue.open_queue()
 
-        # The decoded text is found under data[0]['symbol'][0]['data'].
-        qr_text = data[0]['symbol'][0]['data']
-        return qr_text
-    else:
-        raise Exception("BAD SCAN!")
+
+def scan_QR(image_data):
+    # decoded in memory by the configured backend (see qrdecode.py),
+    # api.qrserver.com is only used when configured as backend/fallback
+    return qrdecode.decode(image_data)
 
 
 def parse_qr_text(text):
@@ -48,97 +74,263 @@ def parse_qr_text(text):
     }
 
 
+def inventory_row(parsed_data):
+    # Split the expiration_date (YYYY-MM-DD) into its components:
+    year_val, month_val, day_val = parsed_data["expiration_date"].split("-")
+    return (parsed_data["item_name"], day_val, month_val, year_val, parsed_data["quantity"])
+
+
+def decode_entries(entries, dbConn=None):
+    """
+    Turns upload entries into QR text. Images seen before are looked
+    up by hash (memory, then the qr_cache table if enabled) and only
+    the rest are scanned, concurrently: the qrserver backend is
+    network bound and zbar/opencv release the GIL while decoding.
+
+    Parameters
+    ----------
+    entries: list of base64 strings, raw image bytes or
+      {"qr_text": ...} dicts
+    dbConn: connection for the qr_cache table (None: memory only)
+
+    Returns
+    -------
+    (texts, counts): per entry the QR text or the exception it
+    failed with, and this request's {"hits", "db_hits", "misses"}
+    """
+    texts = [None] * len(entries)
+    counts = {"hits": 0, "db_hits": 0, "misses": 0}
+    pending = {}    # image hash -> (image bytes, [entry indexes])
+
+    for index, entry in enumerate(entries):
+        try:
+            if isinstance(entry, dict):
+                texts[index] = entry["qr_text"]
+                continue
+            image_data = entry if isinstance(entry, bytes) else base64.b64decode(entry)
+        except Exception as e:
+            texts[index] = e
+            continue
+
+        key = qrcache.digest(image_data)
+        text = cache.get(key)
+        if text is not None:
+            texts[index] = text
+            counts["hits"] += 1
+        else:
+            pending.setdefault(key, (image_data, []))[1].append(index)
+
+    use_db = pending and dbConn is not None and cache.use_db
+
+    if use_db:
+        try:
+            found = cache.get_db(dbConn, list(pending))
+        except Exception as e:
+            # the cache is an optimization, never a reason to fail
+            print("**qr_cache lookup failed**", e)
+            found = {}
+        for key, text in found.items():
+            image_data, indexes = pending.pop(key)
+            cache.put(key, text)
+            for index in indexes:
+                texts[index] = text
+            counts["db_hits"] += len(indexes)
+
+    if pending:
+        keys = list(pending)
+        workers = min(DECODE_WORKERS, len(keys))
+
+        def scan(key):
+            try:
+                return scan_QR(pending[key][0])
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            decoded = list(pool.map(scan, keys))
+
+        new = []
+        for key, text in zip(keys, decoded):
+            if isinstance(text, str):
+                cache.put(key, text)
+                new.append((key, text))
+            for index in pending[key][1]:
+                texts[index] = text
+            counts["misses"] += len(pending[key][1])
+
+        if use_db and new:
+            try:
+                cache.put_db(dbConn, new)
+            except Exception as e:
+                print("**qr_cache store failed**", e)
+
+    cache.count(**counts)
+    return texts, counts
+
+
+def cache_metadata(counts):
+    return {"request": counts, "container": cache.stats()}
+
+
+def parse_result(text):
+    try:
+        if isinstance(text, Exception):
+            raise text
+        return {"status": "ok", "item": parse_qr_text(text)}
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
+
+def batch_upload(user_id, images):
+    if not isinstance(images, list) or not images:
+        raise Exception("'images' must be a non-empty list")
+    if len(images) > MAX_BATCH:
+        raise Exception(f"Too many images in one request (max {MAX_BATCH})")
+
+    connection = dbpool.get_dbConn() if cache.use_db else None
+    op_id = None
+    try:
+        with instrument.span("decode"):
+            texts, counts = decode_entries(images, connection)
+        instrument.count("images", len(images))
+
+        results = [parse_result(text) for text in texts]
+        for index, result in enumerate(results):
+            result["index"] = index
+
+        rows = [inventory_row(r["item"]) for r in results if r["status"] == "ok"]
+
+        if rows and queue is not None:
+            with instrument.span("enqueue"):
+                op_id = queue.enqueue(user_id, "add", rows)
+            instrument.count("rows", len(rows))
+        elif rows:
+            # one statement, one transaction for the whole batch
+            connection = connection or dbpool.get_dbConn()
+            with instrument.span("upsert"):
+                invmutate.upsert_items(connection, user_id, rows)
+            instrument.count("rows", len(rows))
+    finally:
+        dbpool.release(connection)
+        print("**Pool stats**", dbpool.stats())
+
+    body = {
+        "message": f"{len(rows)} of {len(images)} images {'queued' if op_id else 'added'}",
+        "results": results,
+        "qr_cache": cache_metadata(counts)
+    }
+    if op_id:
+        body.update(op_id=op_id, status="queued")
+
+    return {
+        "statusCode": (202 if op_id else 200) if rows else 400,
+        "body": json.dumps(body)
+    }
+
+
+def content_type(event):
+    headers = event.get('headers') or {}
+    for key, value in headers.items():
+        if key.lower() == 'content-type':
+            return value.split(';')[0].strip().lower()
+    return ''
+
+
+def is_binary_type(ctype):
+    return ctype == 'application/octet-stream' or ctype.startswith('image/')
+
+
+def read_upload(event):
+    """
+    Classifies the request body.
+
+    Returns
+    -------
+    ("image", bytes), ("text", qr_text) or ("batch", list)
+    """
+    ctype = content_type(event)
+    body = event['body']
+
+    if event.get('isBase64Encoded', False):
+        body = base64.b64decode(body)
+        if ctype != 'application/json':
+            # binary body: the image itself, no JSON or second base64 layer
+            return ("image", body)
+    elif is_binary_type(ctype):
+        # binary body passed through as a latin-1 string (no gateway encoding)
+        return ("image", body.encode('latin-1'))
+
+    data = json.loads(body)
+    if 'images' in data:
+        return ("batch", data['images'])
+    if 'qr_text' in data:
+        return ("text", data['qr_text'])
+    if 'image' not in data:
+        raise Exception("Missing 'image' field in request body")
+    return ("image", base64.b64decode(data['image']))
+
+
+@instrument.handler("upload")
 def lambda_handler(event, context):
     
-    
-    config_file = 'mealapp-config.ini'
-    configur = ConfigParser()
-    configur.read(config_file)
-    
-    
-    # Load config from mealappconfig.ini
-
-    # RDS configuration from [rds] section
-    DB_HOST = configur.get('rds', 'endpoint')
-    DB_PORT = configur.getint('rds', 'port_number')
-    DB_USER = configur.get('rds', 'user_name')
-    DB_PASSWORD = configur.get('rds', 'user_pwd')
-    DB_NAME = configur.get('rds', 'db_name')
+    connection = None
 
     try:
 
-        # Determine if the body is base64-encoded directly or inside a JSON key "image"
-        if event.get('isBase64Encoded', False):
-            image_data = base64.b64decode(event['body'])
-        else:
-            data = json.loads(event['body'])
-            if 'image' not in data:
-                raise Exception("Missing 'image' field in request body")
-            image_data = base64.b64decode(data['image'])
+        try:
+            user_id = auth.user_id(event)
+        except auth.AuthError as err:
+            return auth.unauthorized(err)
 
-        # write the qr code to lambdas /tmp file
-        tmp_image_path = '/tmp/upload.jpg'
-        with open(tmp_image_path, 'wb') as f:
-            f.write(image_data)
+        # raw bytes, JSON base64 image, client-decoded text or a batch
+        kind, value = read_upload(event)
 
-        
-        qr_text = scan_QR(tmp_image_path)
+        if kind == "batch":
+            return batch_upload(user_id, value)
+
+        # warm pooled connection, config is parsed once per container;
+        # a queued upload only needs one for the qr_cache table
+        if queue is None or cache.use_db:
+            connection = dbpool.get_dbConn()
+
+        if kind == "image":
+            with instrument.span("decode"):
+                texts, counts = decode_entries([value], connection)
+            instrument.count("images", 1)
+            if isinstance(texts[0], Exception):
+                raise texts[0]
+            qr_text = texts[0]
+        else:
+            qr_text, counts = value, {"hits": 0, "db_hits": 0, "misses": 0}
 
         parsed_data = parse_qr_text(qr_text)
 
-        connection = pymysql.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            cursorclass=pymysql.cursors.DictCursor
-        )
-
-        with connection.cursor() as cursor:
-            select_sql = "SELECT quantity FROM inventory WHERE name = %s"
-            cursor.execute(select_sql, (parsed_data["item_name"],))
-            result = cursor.fetchone()
-            if result:
-                update_sql = """
-                    UPDATE inventory
-                    SET quantity = quantity + %s
-                    WHERE name = %s
-                """
-                cursor.execute(update_sql, (parsed_data["quantity"], parsed_data["item_name"]))
-                connection.commit()
-                
-                return {
-                    "statusCode": 200,
-                    "body": json.dumps({
-                        "message": "Item quantity updated",
-                        "item": parsed_data
-                    })
-                }
+        if queue is not None:
+            with instrument.span("enqueue"):
+                op_id = queue.enqueue(user_id, "add", [inventory_row(parsed_data)])
+            instrument.count("rows", 1)
+            return {
+                "statusCode": 202,
+                "body": json.dumps({
+                    "message": "Item queued",
+                    "item": parsed_data,
+                    "op_id": op_id,
+                    "status": "queued",
+                    "qr_cache": cache_metadata(counts)
+                })
+            }
 
-        try:
-            with connection.cursor() as cursor:
-                    insert_sql = """
-                        INSERT INTO inventory (name, day, month, year, quantity)
-                        VALUES (%s, %s, %s, %s, %s)
-                    """
-                    # Split the expiration_date (YYYY-MM-DD) into its components:
-                    exp_parts = parsed_data["expiration_date"].split("-")
-                    year_val = exp_parts[0]
-                    month_val = exp_parts[1]
-                    day_val = exp_parts[2]
-                    
-                    cursor.execute(insert_sql, (parsed_data["item_name"], day_val, month_val, year_val, parsed_data["quantity"]))
-                    connection.commit()
-        finally:                       
-            connection.close()
-        
+        # single atomic upsert: inserts the item or increments its quantity
+        with instrument.span("upsert"):
+            rows_affected = invmutate.upsert_items(connection, user_id, [inventory_row(parsed_data)])
+        instrument.count("rows", 1)
 
         return {
             "statusCode": 200,
             "body": json.dumps({
-                "message": "Item successfully added",
-                "item": parsed_data
+                "message": "Item quantity updated" if rows_affected == 2 else "Item successfully added",
+                "item": parsed_data,
+                "qr_cache": cache_metadata(counts)
             })
         }
 
@@ -149,3 +341,7 @@ def lambda_handler(event, context):
             "statusCode": 500,
             "body": json.dumps({"error": str(e)})
         }
+
+    finally:
+        dbpool.release(connection)
+        print("**Pool stats**", dbpool.stats())
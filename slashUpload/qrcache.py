@@ -0,0 +1,114 @@
+#
+# qrcache.py
+#
+# Decoded-QR cache: SHA-256 of the image bytes -> QR text. People
+# upload the same label photo again and again, and an exact
+# duplicate does not need another scan (or another round trip to
+# api.qrserver.com).
+#
+# The in-memory LRU lives at module scope, so it survives warm
+# invocations of the same container. With `database = true` the
+# qr_cache table (see setup.sql) is consulted on a memory miss and
+# filled after every decode, which shares results between containers
+# and survives cold starts. Only successful decodes are cached.
+#
+#   [qr_cache]
+#   max_entries = 1024      ; in-memory entries per container, 0 disables
+#   database = false        ; also use the qr_cache table
+#
+
+import hashlib
+import threading
+
+from collections import OrderedDict
+
+import datatier
+
+from appconfig import configur
+
+
+def digest(image_data):
+    return hashlib.sha256(image_data).hexdigest()
+
+
+class QRCache:
+
+    def __init__(self, max_entries, use_db):
+        self.max_entries = max_entries
+        self.use_db = use_db
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.counts = {"hits": 0, "db_hits": 0, "misses": 0}
+
+    def get(self, key):
+        with self.lock:
+            text = self.entries.get(key)
+            if text is not None:
+                self.entries.move_to_end(key)
+            return text
+
+    def put(self, key, text):
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[key] = text
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_db(self, dbConn, keys):
+        """
+        Looks up several image hashes in the qr_cache table with one
+        query.
+
+        Returns
+        -------
+        dict of hash -> QR text for the hashes found
+        """
+        if not keys:
+            return {}
+        marks = ", ".join(["%s"] * len(keys))
+        rows = datatier.retrieve_all_rows(dbConn,
+            f"SELECT image_hash, qr_text FROM qr_cache WHERE image_hash IN ({marks})",
+            list(keys))
+        return {row[0]: row[1] for row in rows}
+
+    def put_db(self, dbConn, pairs):
+        """
+        Stores (hash, QR text) pairs in the qr_cache table with one
+        statement; hashes already present are left alone.
+        """
+        if not pairs:
+            return
+        values = ", ".join(["(%s, %s, NOW())"] * len(pairs))
+        params = [value for pair in pairs for value in pair]
+        datatier.perform_action(dbConn,
+            f"INSERT IGNORE INTO qr_cache (image_hash, qr_text, created) VALUES {values}",
+            params)
+
+    def count(self, hits=0, db_hits=0, misses=0):
+        with self.lock:
+            self.counts["hits"] += hits
+            self.counts["db_hits"] += db_hits
+            self.counts["misses"] += misses
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts, entries=len(self.entries))
+
+
+def open_cache():
+    """
+    Builds the cache configured in [qr_cache].
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    QRCache
+    """
+    return QRCache(
+        configur.getint('qr_cache', 'max_entries', fallback=1024),
+        configur.getboolean('qr_cache', 'database', fallback=False))
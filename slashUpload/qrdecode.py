@@ -0,0 +1,221 @@
+#
+# qrdecode.py
+#
+# Pluggable QR decoder backends for /upload. Decoding happens on the
+# in-memory image bytes, so there is no /tmp write and, for the local
+# backends, no network call.
+#
+# Backends:
+#   zbar      -- pyzbar + Pillow (needs the libzbar shared library)
+#   opencv    -- OpenCV's QRCodeDetector (opencv-python-headless)
+#   qrserver  -- the api.qrserver.com web service (remote round trip)
+#
+# The backend is picked from the [qr] section of mealapp-config.ini:
+#
+#   [qr]
+#   backend = local         ; local (first installed of zbar, opencv),
+#                           ; zbar, opencv or qrserver
+#   fallback = qrserver     ; used when the backend's library is not
+#                           ; installed; set empty to disable
+#   fallback_on = unavailable
+#                           ; "any" also retries bad scans on the
+#                           ; fallback (costs a network round trip)
+#
+# With the defaults an install without pyzbar/opencv keeps working
+# through api.qrserver.com, exactly as before; see
+# slashUpload/requirements.txt for the local decoder packages.
+#
+
+import importlib
+import io
+import logging
+
+from appconfig import configur
+
+
+QRSERVER_URL = "https://api.qrserver.com/v1/read-qr-code/"
+
+LOCAL_BACKENDS = ['zbar', 'opencv']
+
+_IMPORTS = {
+    'zbar': ('PIL.Image', 'pyzbar.pyzbar'),
+    'opencv': ('cv2', 'numpy'),
+}
+
+
+class QRDecodeError(Exception):
+    pass
+
+
+class QRBackendUnavailable(QRDecodeError):
+    pass
+
+
+def decode_zbar(image_data):
+    from PIL import Image
+    from pyzbar.pyzbar import decode, ZBarSymbol
+
+    image = Image.open(io.BytesIO(image_data))
+    symbols = decode(image, symbols=[ZBarSymbol.QRCODE])
+    if not symbols:
+        raise QRDecodeError("BAD SCAN!")
+    return symbols[0].data.decode("utf-8")
+
+
+def decode_opencv(image_data):
+    import cv2
+    import numpy
+
+    buffer = numpy.frombuffer(image_data, dtype=numpy.uint8)
+    image = cv2.imdecode(buffer, cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise QRDecodeError("BAD SCAN! (unreadable image)")
+    text, points, _ = cv2.QRCodeDetector().detectAndDecode(image)
+    if not text:
+        raise QRDecodeError("BAD SCAN!")
+    return text
+
+
+def decode_qrserver(image_data):
+    import requests
+
+    url = configur.get('qr', 'qrserver_url', fallback=QRSERVER_URL)
+    files = {"file": ("upload.jpg", image_data)}
+    response = requests.post(url, files=files)
+
+    if response.status_code != 200:
+        raise QRDecodeError("BAD SCAN!")
+
+    data = response.json()
+
+    # The decoded text is found under data[0]['symbol'][0]['data'].
+    qr_text = data[0]['symbol'][0]['data']
+    if not qr_text:
+        raise QRDecodeError("BAD SCAN! " + str(data[0]['symbol'][0].get('error')))
+    return qr_text
+
+
+BACKENDS = {
+    'zbar': decode_zbar,
+    'opencv': decode_opencv,
+    'qrserver': decode_qrserver,
+}
+
+
+def _check_import(name):
+    if name not in _IMPORTS:
+        return
+    try:
+        for module in _IMPORTS[name]:
+            importlib.import_module(module)
+    except ImportError as err:
+        raise QRBackendUnavailable(f"QR backend '{name}' is not installed: {err}")
+
+
+def _check_name(name):
+    if name != 'local' and name not in BACKENDS:
+        raise QRDecodeError(f"unknown QR backend '{name}'")
+
+
+def available_backends():
+    """
+    Returns the names of the backends whose dependencies import.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    list of backend names
+    """
+    names = []
+    for name in LOCAL_BACKENDS:
+        try:
+            _check_import(name)
+            names.append(name)
+        except QRBackendUnavailable:
+            pass
+    names.append('qrserver')
+    return names
+
+
+def resolve_backend(name):
+    """
+    Maps a backend name ("local" included) to a decoder function.
+    Raises QRDecodeError for an unknown name and QRBackendUnavailable
+    when the backend's library is not installed.
+
+    Parameters
+    ----------
+    name: backend name
+
+    Returns
+    -------
+    decoder function taking image bytes and returning the QR text
+    """
+    _check_name(name)
+
+    if name == 'local':
+        for candidate in LOCAL_BACKENDS:
+            try:
+                _check_import(candidate)
+                return BACKENDS[candidate]
+            except QRBackendUnavailable:
+                continue
+        raise QRBackendUnavailable("no local QR decoder installed (pyzbar or opencv)")
+
+    _check_import(name)
+    return BACKENDS[name]
+
+
+def decode(image_data, backend=None, fallback=None, fallback_on=None):
+    """
+    Decodes the QR code in the given image bytes.
+
+    The fallback backend is used when the primary one is not
+    installed. With fallback_on="any" it is also tried when the
+    primary backend cannot find a QR code in the image. A bad backend
+    name is a configuration error and is always raised.
+
+    Parameters
+    ----------
+    image_data: raw image bytes (jpg, png, ...)
+    backend: backend name, defaults to [qr] backend in the config
+    fallback: backend name or "", defaults to [qr] fallback
+    fallback_on: "unavailable" or "any", defaults to [qr] fallback_on
+
+    Returns
+    -------
+    decoded QR text
+    """
+    if backend is None:
+        backend = configur.get('qr', 'backend', fallback='local')
+    if fallback is None:
+        fallback = configur.get('qr', 'fallback', fallback='qrserver')
+    if fallback_on is None:
+        fallback_on = configur.get('qr', 'fallback_on', fallback='unavailable')
+
+    _check_name(backend)
+    if fallback:
+        _check_name(fallback)
+    if fallback == backend:
+        fallback = ''
+
+    try:
+        decoder = resolve_backend(backend)
+    except QRBackendUnavailable as err:
+        if not fallback:
+            raise
+        logging.warning(f"qrdecode: {err}, using {fallback}")
+        return resolve_backend(fallback)(image_data)
+
+    try:
+        return decoder(image_data)
+    except QRBackendUnavailable:
+        raise
+    except QRDecodeError as err:
+        if not fallback or fallback_on != 'any':
+            raise
+        logging.warning(f"qrdecode: {backend} failed ({err}), trying {fallback}")
+        return resolve_backend(fallback)(image_data)
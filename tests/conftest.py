@@ -0,0 +1,135 @@
+#
+# Shared helpers for the unit tests. The lambdas import datatier,
+# pymysql, requests, ... which are not needed to test their logic, so
+# datatier is stubbed and each lambda_function.py is loaded by path
+# under a unique module name.
+#
+
+import importlib.util
+import os
+import sys
+import types
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+sys.path.insert(0, os.path.join(ROOT, 'shared'))
+
+if 'datatier' not in sys.modules:
+    sys.modules['datatier'] = types.ModuleType('datatier')
+
+datatier = sys.modules['datatier']
+
+
+def _retrieve_all_rows(dbConn, sql, parameters=[]):
+    dbCursor = dbConn.cursor()
+    dbCursor.execute(sql, parameters)
+    return dbCursor.fetchall()
+
+
+def _retrieve_one_row(dbConn, sql, parameters=[]):
+    dbCursor = dbConn.cursor()
+    dbCursor.execute(sql, parameters)
+    return dbCursor.fetchone() or ()
+
+
+def _perform_action(dbConn, sql, parameters=[]):
+    dbCursor = dbConn.cursor()
+    dbCursor.execute(sql, parameters)
+    dbConn.commit()
+    return dbCursor.rowcount
+
+
+# same signatures as the course's datatier.py, run against FakeConn
+datatier.retrieve_all_rows = _retrieve_all_rows
+datatier.retrieve_one_row = _retrieve_one_row
+datatier.perform_action = _perform_action
+
+
+def load_lambda(name):
+    """
+    Imports <name>/lambda_function.py as module "<name>_lambda", with
+    the lambda's folder on sys.path for its helper modules.
+    """
+    folder = os.path.join(ROOT, name)
+    if folder not in sys.path:
+        sys.path.insert(0, folder)
+    spec = importlib.util.spec_from_file_location(name + '_lambda',
+                                                  os.path.join(folder, 'lambda_function.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeCursor:
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+        self.lastrowid = 0
+
+    def execute(self, sql, params=()):
+        self.conn.executed.append((' '.join(sql.split()), list(params)))
+        result = self.conn.results.pop(0) if self.conn.results else {}
+        self.rowcount = result.get('rowcount', 0)
+        self.lastrowid = result.get('lastrowid', 0)
+        self._rows = result.get('rows', [])
+        return self.rowcount
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+    def nextset(self):
+        return None
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class FakeConn:
+    """
+    Records executed SQL; `results` is a list of dicts (rowcount,
+    lastrowid, rows) handed out one per execute().
+    """
+
+    def __init__(self, results=None):
+        self.open = True
+        self.executed = []
+        self.results = list(results or [])
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def ping(self, reconnect=True):
+        pass
+
+    def close(self):
+        self.open = False
+
+
+def as_user(event, user_id='u1'):
+    """
+    Adds the caller identity a Cognito authorizer puts in the event.
+    """
+    event = dict(event)
+    event['requestContext'] = {'authorizer': {'claims': {'sub': user_id}}}
+    return event
@@ -0,0 +1,34 @@
+#
+# Unit tests for shared/auth.py
+#
+
+import pytest
+
+import auth
+
+
+@pytest.mark.parametrize('authorizer', [
+    {'claims': {'sub': 'abc'}},                     # Cognito, REST API
+    {'jwt': {'claims': {'sub': 'abc'}}},            # JWT, HTTP API
+    {'lambda': {'user_id': 'abc'}},                 # Lambda authorizer, HTTP API
+    {'principalId': 'abc'},                         # Lambda authorizer, REST API
+])
+def test_user_id_from_authorizer(authorizer):
+    assert auth.user_id({'requestContext': {'authorizer': authorizer}}) == 'abc'
+
+
+def test_header_ignored_unless_trusted(monkeypatch):
+    event = {'headers': {'X-User-Id': 'abc'}}
+
+    with pytest.raises(auth.AuthError):
+        auth.user_id(event)
+
+    monkeypatch.setattr(auth, 'TRUST_HEADER', True)
+    assert auth.user_id(event) == 'abc'
+
+
+def test_user_id_too_long():
+    event = {'requestContext': {'authorizer': {'claims': {'sub': 'x' * 65}}}}
+
+    with pytest.raises(auth.AuthError):
+        auth.user_id(event)
@@ -0,0 +1,127 @@
+#
+# Unit tests for shared/dbpool.py, with datatier.get_dbConn stubbed
+# out so no database is needed:
+#
+#   python3 -m pytest -q tests
+#
+
+import sys
+
+import pytest
+
+import dbpool
+
+
+class FakeConn:
+
+    def __init__(self):
+        self.open = True
+        self.alive = True
+        self.pings = 0
+        self.rollbacks = 0
+
+    def ping(self, reconnect=True):
+        self.pings += 1
+        if not self.alive:
+            raise ConnectionError("server has gone away")
+
+    def rollback(self):
+        if not self.alive:
+            raise ConnectionError("server has gone away")
+        self.rollbacks += 1
+
+    def close(self):
+        self.open = False
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    created = []
+
+    def get_dbConn(*args):
+        conn = FakeConn()
+        created.append(conn)
+        return conn
+
+    monkeypatch.setattr(sys.modules['datatier'], 'get_dbConn', get_dbConn, raising=False)
+    monkeypatch.setattr(dbpool, 'rds_settings', lambda: ())
+    monkeypatch.setattr(dbpool, 'pool_size', 1)
+    monkeypatch.setattr(dbpool, 'ping_interval', 30.0)
+    monkeypatch.setattr(dbpool, '_idle', [])
+    monkeypatch.setattr(dbpool, '_stats', {'hits': 0, 'misses': 0, 'reconnects': 0})
+    return created
+
+
+def test_hit_after_release(pool):
+    first = dbpool.get_dbConn()
+    dbpool.release(first)
+    second = dbpool.get_dbConn()
+
+    assert second is first
+    assert first.rollbacks == 1
+    assert first.pings == 0
+    assert dbpool.stats() == {'hits': 1, 'misses': 1, 'reconnects': 0, 'idle': 0}
+
+
+def test_ping_when_stale(pool, monkeypatch):
+    conn = dbpool.get_dbConn()
+    dbpool.release(conn)
+    monkeypatch.setattr(dbpool, 'ping_interval', 0.0)
+
+    assert dbpool.get_dbConn() is conn
+    assert conn.pings == 1
+    assert dbpool.stats()['hits'] == 1
+
+
+def test_reconnect_when_stale_ping_fails(pool, monkeypatch):
+    conn = dbpool.get_dbConn()
+    dbpool.release(conn)
+    monkeypatch.setattr(dbpool, 'ping_interval', 0.0)
+    conn.alive = False
+
+    fresh = dbpool.get_dbConn()
+
+    assert fresh is not conn
+    assert not conn.open
+    assert dbpool.stats()['reconnects'] == 1
+
+
+def test_broken_connection_is_not_pooled(pool):
+    conn = dbpool.get_dbConn()
+    conn.alive = False          # e.g. lost connection mid-query
+    dbpool.release(conn)
+
+    assert dbpool.stats()['idle'] == 0
+    assert not conn.open
+
+    closed = dbpool.get_dbConn()
+    closed.close()              # pymysql sets open = False on errors
+    dbpool.release(closed)
+    assert dbpool.stats()['idle'] == 0
+
+
+def test_closed_idle_connection_counts_as_miss(pool):
+    conn = dbpool.get_dbConn()
+    dbpool.release(conn)
+    conn.open = False
+
+    assert dbpool.get_dbConn() is not conn
+    assert dbpool.stats()['misses'] == 2
+
+
+def test_pool_size_cap(pool, monkeypatch):
+    monkeypatch.setattr(dbpool, 'pool_size', 2)
+    conns = [dbpool.get_dbConn() for _ in range(3)]
+    for conn in conns:
+        dbpool.release(conn)
+
+    assert dbpool.stats()['idle'] == 2
+    assert not conns[2].open
+
+
+def test_discard(pool):
+    conn = dbpool.get_dbConn()
+    dbpool.release(conn, discard=True)
+
+    assert dbpool.stats()['idle'] == 0
+    assert not conn.open
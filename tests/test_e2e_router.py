@@ -0,0 +1,78 @@
+#
+# bench/e2e.py's router and mocks/qrserver_mock.py, without a database:
+# stub handlers stand in for the lambdas.
+#
+
+import base64
+import json
+import os
+import sys
+import threading
+import urllib.request
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'bench'))
+
+import e2e
+import qrserver_mock
+
+
+@pytest.fixture
+def router():
+    events = []
+
+    def echo(event, context):
+        events.append(event)
+        return {'statusCode': 201, 'headers': {'X-Lambda': 'echo'}, 'body': json.dumps({'ok': True})}
+
+    server = e2e.make_router({('GET', '/inventory'): echo, ('POST', '/upload'): echo})
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://localhost:{server.server_address[1]}", events
+    server.shutdown()
+
+
+def test_get_becomes_proxy_event(router):
+    baseurl, events = router
+
+    status, ms = e2e.call(baseurl, 'GET', '/inventory?limit=5', None, 'u1')
+
+    assert status == 201
+    event = events[0]
+    assert event['httpMethod'] == 'GET'
+    assert event['queryStringParameters'] == {'limit': '5'}
+    assert event['requestContext']['authorizer']['claims']['sub'] == 'u1'
+
+
+def test_binary_body_is_base64_encoded(router):
+    baseurl, events = router
+    request = urllib.request.Request(baseurl + '/upload', data=b'\x89PNG', method='POST',
+                                     headers={'Content-Type': 'image/png'})
+
+    with urllib.request.urlopen(request) as response:
+        assert response.headers['X-Lambda'] == 'echo'
+
+    assert events[0]['isBase64Encoded'] is True
+    assert base64.b64decode(events[0]['body']) == b'\x89PNG'
+
+
+def test_unknown_route(router):
+    baseurl, events = router
+
+    assert e2e.call(baseurl, 'GET', '/nowhere', None, 'u1')[0] == 404
+    assert events == []
+
+
+def test_qrserver_mock_reads_fake_images():
+    requests = pytest.importorskip('requests')
+    server = qrserver_mock.make_server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://localhost:{server.server_address[1]}/v1/read-qr-code/"
+
+    image = qrserver_mock.fake_image("Milk-10-03-25-2", salt="x")
+    data = requests.post(url, files={"file": ("upload.jpg", image)}).json()
+    assert data[0]['symbol'][0]['data'] == "Milk-10-03-25-2"
+
+    data = requests.post(url, files={"file": ("upload.jpg", b"not a code")}).json()
+    assert data[0]['symbol'][0]['data'] is None
+    server.shutdown()
@@ -0,0 +1,77 @@
+#
+# Unit tests for shared/instrument.py
+#
+
+import json
+import time
+
+import pytest
+
+import instrument
+
+
+@pytest.fixture
+def records(monkeypatch, capsys):
+    monkeypatch.setattr(instrument, '_cold', True)
+    monkeypatch.setattr(instrument, 'SERVER_TIMING', False)
+
+    def read():
+        lines = capsys.readouterr().out.splitlines()
+        return [json.loads(line) for line in lines if line.startswith('{')]
+
+    return read
+
+
+class Context:
+    aws_request_id = 'req-1'
+
+
+@instrument.handler("test")
+def handler(event, context):
+    with instrument.span("query"):
+        time.sleep(0.01)
+    with instrument.span("query"):
+        pass
+    instrument.count("rows", 3)
+    instrument.count("rows", 2)
+    return {'statusCode': 200, 'body': '{}'}
+
+
+def test_record_per_invocation(records):
+    handler({}, Context())
+    handler({}, None)
+    first, second = records()
+
+    assert first['lambda'] == 'test'
+    assert first['status'] == 200
+    assert first['request_id'] == 'req-1'
+    assert first['counts'] == {'rows': 5}
+    assert first['phases']['query'] >= 10
+    assert first['total_ms'] >= first['phases']['query']
+
+
+def test_cold_only_on_first_invocation(records):
+    handler({}, None)
+    handler({}, None)
+    first, second = records()
+
+    assert first['cold'] is True and 'init' in first['phases'] and 'config' in first['phases']
+    assert second['cold'] is False and set(second['phases']) == {'query'}
+
+
+def test_server_timing_header(records, monkeypatch):
+    monkeypatch.setattr(instrument, 'SERVER_TIMING', True)
+
+    response = handler({}, None)
+
+    metrics = response['headers']['Server-Timing'].split(', ')
+    assert metrics[-3].startswith('config;dur=')
+    assert metrics[-2].startswith('query;dur=')
+    assert metrics[-1].startswith('total;dur=')
+
+
+def test_spans_outside_handler_are_ignored(records):
+    with instrument.span("query"):
+        instrument.count("rows", 1)
+
+    assert records() == []
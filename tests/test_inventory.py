@@ -0,0 +1,92 @@
+#
+# Unit tests for inventory/lambda_function.py
+#
+
+import json
+
+import pytest
+
+from conftest import FakeConn, as_user, load_lambda
+
+
+@pytest.fixture
+def inventory(monkeypatch):
+    module = load_lambda('inventory')
+    monkeypatch.setattr(module.dbpool, 'release', lambda c, discard=False: None)
+
+    def use(conn):
+        monkeypatch.setattr(module.dbpool, 'get_dbConn', lambda: conn)
+        return conn
+
+    module.use = use
+    return module
+
+
+ROWS = [('Apples', 10, 20, 3, 2025), ('Bread', 1, 5, 4, 2025), ('Chicken', 2, 25, 3, 2025)]
+
+
+def test_first_page_has_next_cursor(inventory):
+    conn = inventory.use(FakeConn([{'rows': [(7,)]}, {'rows': ROWS}]))
+
+    response = inventory.lambda_handler(as_user({'queryStringParameters': {'limit': '2'}}), None)
+    body = json.loads(response['body'])
+
+    assert response['statusCode'] == 200
+    assert [row[0] for row in body['items']] == ['Apples', 'Bread']
+    assert inventory.decode_cursor(body['next']) == 'Bread'
+    assert conn.executed[0][1] == ['u1']
+    assert conn.executed[1][1] == ['u1', 3]
+    assert 'FROM lots' in conn.executed[1][0] and 'GROUP BY name' in conn.executed[1][0]
+    assert response['headers']['ETag']
+
+
+def test_page_after_cursor(inventory):
+    conn = inventory.use(FakeConn([{'rows': [(7,)]}, {'rows': ROWS[2:]}]))
+    event = {'queryStringParameters': {'limit': '2', 'after': inventory.encode_cursor('Bread')}}
+
+    body = json.loads(inventory.lambda_handler(as_user(event), None)['body'])
+
+    assert body['next'] is None
+    sql, params = conn.executed[1]
+    assert 'WHERE user_id = %s AND name > %s' in sql
+    assert params == ['u1', 'Bread', 3]
+
+
+def test_bad_cursor(inventory):
+    inventory.use(FakeConn())
+    event = {'queryStringParameters': {'after': '%%%'}}
+
+    assert inventory.lambda_handler(as_user(event), None)['statusCode'] == 400
+
+
+def test_not_modified(inventory):
+    first = inventory.use(FakeConn([{'rows': [(7,)]}, {'rows': ROWS}]))
+    etag = inventory.lambda_handler(as_user({}), None)['headers']['ETag']
+
+    again = inventory.use(FakeConn([{'rows': [(7,)]}]))
+    response = inventory.lambda_handler(as_user({'headers': {'if-none-match': etag}}), None)
+
+    assert response['statusCode'] == 304
+    assert len(again.executed) == 1         # version lookup only
+
+    bumped = inventory.use(FakeConn([{'rows': [(8,)]}, {'rows': ROWS}]))
+    response = inventory.lambda_handler(as_user({'headers': {'If-None-Match': etag}}), None)
+
+    assert response['statusCode'] == 200
+
+
+def test_requires_user(inventory):
+    conn = inventory.use(FakeConn())
+
+    assert inventory.lambda_handler({}, None)['statusCode'] == 401
+    assert conn.executed == []
+
+
+def test_etag_differs_per_user(inventory):
+    inventory.use(FakeConn([{'rows': [(7,)]}, {'rows': ROWS}]))
+    mine = inventory.lambda_handler(as_user({}), None)['headers']['ETag']
+
+    inventory.use(FakeConn([{'rows': [(7,)]}, {'rows': ROWS}]))
+    theirs = inventory.lambda_handler(as_user({}, 'u2'), None)['headers']['ETag']
+
+    assert mine != theirs
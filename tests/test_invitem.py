@@ -0,0 +1,73 @@
+#
+# Unit tests for shared/invitem.py and the columnar GET /inventory
+#
+
+import datetime
+import filecmp
+import json
+import os
+
+import invitem
+
+from conftest import FakeConn, ROOT, as_user, load_lambda
+from invitem import InventoryItem
+
+
+def test_ordinal_normalizes_like_mysql():
+    assert invitem.ordinal(31, 4, 2025) == datetime.date(2025, 5, 1).toordinal()
+    assert invitem.ordinal(1, 13, 2025) == datetime.date(2026, 1, 1).toordinal()
+
+
+def test_item_from_row():
+    item = InventoryItem.from_row(('Milk', 3, 10, 3, 2025, 2))
+
+    assert (item.day, item.month, item.year, item.lots) == (10, 3, 2025, 2)
+    assert item.days_left(datetime.date(2025, 3, 7)) == 3
+    assert item.row() == ['Milk', 3, 10, 3, 2025, 2]
+    assert InventoryItem.from_row(('Milk', 3, 10, 3, 2025)).lots == 1
+    assert not hasattr(item, '__dict__')
+
+
+def test_columns_round_trip():
+    items = [InventoryItem.from_row(('Apples', 10, 20, 3, 2025, 1)),
+             InventoryItem.from_row(('Bread', 1, 5, 4, 2025, 2))]
+
+    columns = json.loads(json.dumps(invitem.encode_columns(items)))
+
+    assert columns['names'] == ['Apples', 'Bread']
+    assert columns['expiry'][0] == (datetime.date(2025, 3, 20) - datetime.date(1970, 1, 1)).days
+    assert invitem.decode_columns(columns) == items
+    del columns['lots']
+    assert [item.lots for item in invitem.decode_columns(columns)] == [1, 1]
+
+
+def test_rows_to_columns_matches_items():
+    rows = [('Apples', 10, 20, 3, 2025, 1), ('Bread', 1, 31, 4, 2025, 2)]
+
+    assert invitem.rows_to_columns(rows) == invitem.encode_columns([InventoryItem.from_row(r) for r in rows])
+    assert invitem.rows_to_columns([]) == {'names': [], 'qty': [], 'expiry': [], 'lots': []}
+
+
+def test_client_copy_is_identical():
+    assert filecmp.cmp(os.path.join(ROOT, 'shared', 'invitem.py'),
+                       os.path.join(ROOT, 'SmartMealPlanner-client', 'invitem.py'), shallow=False)
+
+
+def test_inventory_columns_format(monkeypatch):
+    inventory = load_lambda('inventory')
+    monkeypatch.setattr(inventory.dbpool, 'release', lambda c, discard=False: None)
+    rows = [('Apples', 10, 20, 3, 2025, 1), ('Bread', 1, 5, 4, 2025, 2)]
+    conn = FakeConn([{'rows': [(7,)]}, {'rows': rows}, {'rows': [(7,)]}])
+    monkeypatch.setattr(inventory.dbpool, 'get_dbConn', lambda: conn)
+    event = {'queryStringParameters': {'format': 'columns'}}
+
+    response = inventory.lambda_handler(as_user(event), None)
+    body = json.loads(response['body'])
+
+    assert [item.row() for item in invitem.decode_columns(body['columns'])] == [list(row) for row in rows]
+    assert body['next'] is None
+
+    # the row and column forms of a page have different ETags
+    event = {'queryStringParameters': None, 'headers': {'If-None-Match': response['headers']['ETag']}}
+    conn.results.append({'rows': rows})
+    assert inventory.lambda_handler(as_user(event), None)['statusCode'] == 200
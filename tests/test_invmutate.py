@@ -0,0 +1,55 @@
+#
+# Unit tests for shared/invmutate.py
+#
+
+from conftest import FakeConn
+
+import invmutate
+
+
+def test_upsert_items_one_statement():
+    conn = FakeConn([{'rowcount': 3}])
+    rows = [('Milk', 10, 3, 2025, 2), ('Eggs', 15, 3, 2025, 12)]
+
+    assert invmutate.upsert_items(conn, 'u1', rows) == 3
+    assert len(conn.executed) == 2
+    sql, params = conn.executed[0]
+    assert sql.count('(%s, %s, %s, %s, %s, %s)') == 2
+    assert params == ['u1', 'Milk', 10, 3, 2025, 2, 'u1', 'Eggs', 15, 3, 2025, 12]
+    assert conn.executed[1][1] == ['u1']
+    assert conn.commits == 1
+
+
+def test_upsert_items_empty():
+    conn = FakeConn()
+    assert invmutate.upsert_items(conn, 'u1', []) == 0
+    assert conn.executed == []
+
+
+def test_consume_fifo_one_statement():
+    conn = FakeConn([{'rows': [(12, 2)]}, {'rowcount': 2}, {'rowcount': 1}])
+
+    assert invmutate.consume(conn, 'u1', 'Eggs', 9) == 3
+
+    lock, update, delete, bump = conn.executed
+    assert lock[0].endswith('FOR UPDATE')
+    assert 'SUM(quantity) OVER (ORDER BY expiry' in update[0]
+    assert update[1] == ['u1', 'Eggs', 9, 'u1', 'Eggs', 9]
+    assert delete == (' '.join(invmutate.DELETE_EMPTY_SQL.split()), ['u1', 'Eggs'])
+    assert 'inventory_version' in bump[0]
+    assert conn.commits == 1
+
+
+def test_consume_more_than_stock():
+    conn = FakeConn([{'rows': [(5, 1)]}, {'rowcount': 1}, {'rowcount': 1}])
+
+    assert invmutate.consume(conn, 'u1', 'Milk', 8) == 0
+    assert conn.commits == 1
+
+
+def test_consume_missing_item():
+    conn = FakeConn([{'rows': [(0, 0)]}])
+
+    assert invmutate.consume(conn, 'u1', 'Nope', 1) is None
+    assert len(conn.executed) == 1      # no update, no version bump
+    assert conn.commits == 0
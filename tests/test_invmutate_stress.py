@@ -0,0 +1,119 @@
+#
+# Concurrency stress test for shared/invmutate.py against a real
+# MySQL 8.0+. It drops and recreates the `lots` and
+# `inventory_version` tables, so point it at a scratch database:
+#
+#   MEALAPP_TEST_MYSQL=host:port:user:pwd:dbname python3 -m pytest -q tests
+#
+# Skipped when MEALAPP_TEST_MYSQL is not set.
+#
+
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import invmutate
+
+TEST_DB = os.environ.get('MEALAPP_TEST_MYSQL')
+
+pytestmark = pytest.mark.skipif(not TEST_DB, reason="MEALAPP_TEST_MYSQL not set")
+
+WORKERS = 16
+ROUNDS = 200
+
+
+def connect():
+    import pymysql
+
+    host, port, user, pwd, dbname = TEST_DB.split(':')
+    return pymysql.connect(host=host, port=int(port), user=user,
+                           passwd=pwd, database=dbname)
+
+
+@pytest.fixture
+def table():
+    conn = connect()
+    with conn.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS lots")
+        cursor.execute("""
+            CREATE TABLE lots (
+              user_id VARCHAR(64) NOT NULL,
+              name VARCHAR(64) NOT NULL,
+              quantity INT NOT NULL,
+              day INT NOT NULL,
+              month INT NOT NULL,
+              year INT NOT NULL,
+              expiry DATE GENERATED ALWAYS AS
+                (MAKEDATE(year, 1) + INTERVAL (month - 1) MONTH + INTERVAL (day - 1) DAY) STORED,
+              PRIMARY KEY (user_id, name, year, month, day)
+            )""")
+        cursor.execute("DROP TABLE IF EXISTS inventory_version")
+        cursor.execute("""
+            CREATE TABLE inventory_version (
+              user_id VARCHAR(64) NOT NULL,
+              version BIGINT NOT NULL,
+              PRIMARY KEY (user_id)
+            )""")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def lots_of(conn, name):
+    conn.commit()   # fresh snapshot
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT day, quantity FROM lots
+            WHERE user_id = 'u1' AND name = %s ORDER BY expiry""", (name,))
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+def quantity_of(conn, name):
+    lots = lots_of(conn, name)
+    return sum(quantity for day, quantity in lots) if lots else None
+
+
+def run_parallel(work):
+    def worker(ops):
+        conn = connect()
+        try:
+            for op in ops:
+                op(conn)
+        finally:
+            conn.close()
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        list(pool.map(worker, work))
+
+
+def test_parallel_adds_and_consumes(table):
+    add = lambda conn: invmutate.upsert_items(conn, 'u1', [('Milk', 10, 3, 2025, 3)])
+    use = lambda conn: invmutate.consume(conn, 'u1', 'Milk', 1)
+
+    # every worker adds 3 and consumes 1 per round, so nothing can hit
+    # zero until all adds are in: final = WORKERS * ROUNDS * (3 - 1)
+    run_parallel([[add, use] * ROUNDS for _ in range(WORKERS)])
+
+    assert quantity_of(table, 'Milk') == WORKERS * ROUNDS * 2
+
+
+def test_parallel_consume_deletes_once(table):
+    invmutate.upsert_items(table, 'u1', [('Eggs', 15, 3, 2025, WORKERS * ROUNDS)])
+
+    run_parallel([[lambda conn: invmutate.consume(conn, 'u1', 'Eggs', 1)] * (ROUNDS + 5)
+                  for _ in range(WORKERS)])
+
+    assert quantity_of(table, 'Eggs') is None
+
+
+def test_consume_earliest_lots_first(table):
+    invmutate.upsert_items(table, 'u1', [('Milk', 20, 3, 2025, 5), ('Milk', 10, 3, 2025, 5),
+                                         ('Milk', 30, 3, 2025, 5)])
+
+    assert invmutate.consume(table, 'u1', 'Milk', 7) == 8
+    assert lots_of(table, 'Milk') == [(20, 3), (30, 5)]
+
+    assert invmutate.consume(table, 'u1', 'Milk', 20) == 0
+    assert lots_of(table, 'Milk') == []
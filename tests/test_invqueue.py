@@ -0,0 +1,182 @@
+#
+# Unit tests for shared/invqueue.py and the queued mode of /upload,
+# consume and GET /inventory?op=
+#
+
+import base64
+import json
+
+import pytest
+
+import invqueue
+
+from conftest import FakeConn, as_user, load_lambda
+from invqueue import Op
+
+
+class PoisonConn(FakeConn):
+    """
+    FakeConn whose statements fail when they mention `poison`.
+    """
+
+    def __init__(self, poison):
+        super().__init__()
+        self.poison = poison
+
+    def cursor(self):
+        cursor = super().cursor()
+        execute = cursor.execute
+
+        def failing(sql, params=()):
+            if self.poison in [str(p) for p in params]:
+                raise Exception("Data too long for column 'name'")
+            return execute(sql, params)
+
+        cursor.execute = failing
+        return cursor
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    conn = FakeConn()
+    monkeypatch.setattr(invqueue.dbpool, 'get_dbConn', lambda: queue.conn)
+    monkeypatch.setattr(invqueue.dbpool, 'release', lambda c, discard=False: None)
+    queue = invqueue.SQLiteQueue(str(tmp_path / 'ingest.db'))
+    queue.conn = conn
+    return queue
+
+
+def test_coalesce_merges_same_item():
+    ops = [Op(i, 'u1', 'add', [['Milk', 10, 3, 2025, 1]]) for i in range(1, 6)]
+
+    steps = invqueue.coalesce(ops)
+
+    assert steps == [(0, 'add', 'u1', 'Milk', {(10, 3, 2025): 5}, [1, 2, 3, 4, 5])]
+
+
+def test_coalesce_keeps_order_per_item():
+    ops = [
+        Op(1, 'u1', 'add', [['Milk', 10, 3, 2025, 1], ['Eggs', 15, 3, 2025, 6]]),
+        Op(2, 'u1', 'consume', [['Milk', 1]]),
+        Op(3, 'u1', 'consume', [['Milk', 2]]),
+        Op(4, 'u1', 'add', [['Milk', 12, 3, 2025, 1], ['Eggs', 15, 3, 2025, 6]]),
+    ]
+
+    steps = [step[:5] for step in invqueue.coalesce(ops)]
+
+    assert steps == [
+        (0, 'add', 'u1', 'Eggs', {(15, 3, 2025): 12}),
+        (0, 'add', 'u1', 'Milk', {(10, 3, 2025): 1}),
+        (1, 'consume', 'u1', 'Milk', 3),
+        (2, 'add', 'u1', 'Milk', {(12, 3, 2025): 1}),
+    ]
+
+
+def test_apply_ops_batches_statements():
+    conn = FakeConn([{}, {'rows': [(4, 1)]}, {}, {}, {}])
+    ops = [Op(i, 'u1', 'add', [['Milk', 10, 3, 2025, 1]]) for i in range(1, 6)]
+    ops += [Op(6, 'u1', 'consume', [['Eggs', 1]]), Op(7, 'u1', 'consume', [['Eggs', 2]])]
+
+    outcomes, statements = invqueue.apply_ops(conn.cursor(), ops)
+
+    assert statements == 2
+    sql, params = conn.executed[0]
+    assert 'INSERT INTO lots' in sql
+    assert params == ['u1', 'Milk', 10, 3, 2025, 5]
+    assert conn.executed[1][1] == ['u1', 'Eggs']                   # lock
+    assert conn.executed[2][1] == ['u1', 'Eggs', 3, 'u1', 'Eggs', 3]
+    assert 'inventory_version' in conn.executed[-1][0]
+    assert len(conn.executed) == 5                                 # one version bump
+    assert outcomes[1] == ('done', {})
+    assert outcomes[6] == outcomes[7] == ('done', {'new_quantity': 1})
+
+
+def test_apply_ops_missing_item_fails_only_its_ops():
+    conn = FakeConn([{'rows': [(0, 0)]}])
+    ops = [Op(1, 'u1', 'consume', [['Kale', 1]])]
+
+    outcomes, statements = invqueue.apply_ops(conn.cursor(), ops)
+
+    assert outcomes[1] == ('failed', {'error': 'Item "Kale" not found'})
+    assert not any('inventory_version' in sql for sql, _ in conn.executed)
+
+
+def test_sqlite_queue_enqueue_drain_status(queue):
+    first = queue.enqueue('u1', 'add', [['Milk', 10, 3, 2025, 1]])
+    second = queue.enqueue('u1', 'add', [['Milk', 10, 3, 2025, 1]])
+
+    assert queue.status('u1', first)['status'] == 'queued'
+    assert queue.status('u2', first) is None
+    assert queue.pending() == 2
+
+    summary = queue.drain()
+
+    assert summary == {'ops': 2, 'statements': 1, 'failed': 0}
+    assert queue.conn.commits == 1
+    assert queue.status('u1', second)['status'] == 'done'
+    assert queue.pending() == 0
+    assert queue.drain()['ops'] == 0
+
+
+def test_failed_batch_is_retried_per_operation(queue):
+    queue.conn = PoisonConn('x' * 100)
+    good = queue.enqueue('u1', 'add', [['Milk', 10, 3, 2025, 1]])
+    bad = queue.enqueue('u1', 'add', [['x' * 100, 10, 3, 2025, 1]])
+
+    summary = queue.drain()
+
+    assert summary['ops'] == 2 and summary['failed'] == 1
+    assert queue.status('u1', good)['status'] == 'done'
+    failed = queue.status('u1', bad)
+    assert failed['status'] == 'failed' and 'Data too long' in failed['error']
+
+
+def test_upload_queued(queue, monkeypatch):
+    upload = load_lambda('slashUpload')
+    monkeypatch.setattr(upload, 'queue', queue)
+    monkeypatch.setattr(upload.dbpool, 'get_dbConn', lambda: pytest.fail("connection opened"))
+    event = {'body': json.dumps({'qr_text': 'Milk-10-03-25-2'})}
+
+    response = upload.lambda_handler(as_user(event), None)
+    body = json.loads(response['body'])
+
+    assert response['statusCode'] == 202
+    assert body['status'] == 'queued'
+    assert queue.status('u1', body['op_id'])['kind'] == 'add'
+    assert queue.conn.executed == []
+
+
+def test_batch_upload_queued(queue, monkeypatch):
+    upload = load_lambda('slashUpload')
+    monkeypatch.setattr(upload, 'queue', queue)
+    monkeypatch.setattr(upload, 'scan_QR', lambda data: data.decode('utf-8'))
+    images = [base64.b64encode(text.encode()).decode() for text in ['Milk-10-03-25-2', 'bad']]
+
+    response = upload.lambda_handler(as_user({'body': json.dumps({'images': images})}), None)
+    body = json.loads(response['body'])
+
+    assert response['statusCode'] == 202
+    assert [r['status'] for r in body['results']] == ['ok', 'error']
+    assert queue.drain()['ops'] == 1
+
+
+def test_consume_queued_and_polled(queue, monkeypatch):
+    delete = load_lambda('inventory_delete')
+    inventory = load_lambda('inventory')
+    monkeypatch.setattr(delete, 'queue', queue)
+    monkeypatch.setattr(inventory.invqueue, 'open_queue', lambda: queue)
+    event = {'body': json.dumps({'name': 'Milk', 'quantity': 1})}
+
+    response = delete.lambda_handler(as_user(event), None)
+    op_id = json.loads(response['body'])['op_id']
+    assert response['statusCode'] == 202
+
+    queue.conn.results = [{'rows': [(3, 1)]}, {}, {}, {}]
+    queue.drain()
+
+    status = inventory.lambda_handler(as_user({'queryStringParameters': {'op': str(op_id)}}), None)
+    assert status['statusCode'] == 200
+    assert json.loads(status['body'])['new_quantity'] == 2
+
+    missing = inventory.lambda_handler(as_user({'queryStringParameters': {'op': '999'}}), None)
+    assert missing['statusCode'] == 404
@@ -0,0 +1,25 @@
+#
+# Unit tests for shared/invversion.py
+#
+
+import invversion
+
+
+def test_etag_depends_on_version_and_parts():
+    tag = invversion.make_etag(3, "inventory", 100, None)
+
+    assert tag == invversion.make_etag(3, "inventory", 100, None)
+    assert tag != invversion.make_etag(4, "inventory", 100, None)
+    assert tag != invversion.make_etag(3, "inventory", 50, None)
+    assert tag.startswith('"') and tag.endswith('"')
+
+
+def test_is_not_modified():
+    tag = invversion.make_etag(1)
+
+    assert invversion.is_not_modified({'headers': {'If-None-Match': tag}}, tag)
+    assert invversion.is_not_modified({'headers': {'if-none-match': '"x", ' + tag}}, tag)
+    assert invversion.is_not_modified({'headers': {'If-None-Match': 'W/' + tag}}, tag)
+    assert not invversion.is_not_modified({'headers': {'If-None-Match': '"other"'}}, tag)
+    assert not invversion.is_not_modified({'headers': None}, tag)
+    assert not invversion.is_not_modified({}, tag)
@@ -0,0 +1,67 @@
+#
+# Unit tests for slashMealplan/localplanner.py
+#
+
+import datetime
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'slashMealplan'))
+
+import localplanner
+
+
+TODAY = datetime.date(2025, 3, 1)
+
+BOOK = localplanner.RecipeBook([
+    {"name": "Omelette", "meal": "breakfast", "ingredients": ["Eggs", "Cheese"]},
+    {"name": "French toast", "meal": "breakfast", "ingredients": ["Eggs", "Bread", "Milk"]},
+    {"name": "Salmon salad", "meal": "lunch", "ingredients": ["Salmon", "Lettuce"]},
+    {"name": "Roast chicken", "meal": "dinner", "ingredients": ["Chicken", "Potatoes"]},
+])
+
+
+def lot(name, quantity, days_left):
+    expires = TODAY + datetime.timedelta(days=days_left)
+    return (name, quantity, expires.day, expires.month, expires.year)
+
+
+def test_normalize():
+    assert localplanner.normalize(" Tomatoes ") == localplanner.normalize("tomato")
+    assert localplanner.normalize("EGGS") == "egg"
+    assert localplanner.normalize("Swiss") == "swiss"
+
+
+def test_candidates_need_every_ingredient():
+    keys = {localplanner.normalize(n) for n in ["Eggs", "Cheese", "Bread", "Chicken"]}
+
+    assert BOOK.candidates(keys) == [0]
+
+
+def test_plan_prefers_soonest_expiring():
+    rows = [lot("Eggs", 6, 5), lot("Cheese", 1, 9), lot("Bread", 1, 1), lot("Milk", 1, 1)]
+
+    plan = localplanner.plan(rows, TODAY, days=2, book=BOOK)
+
+    assert plan.text.splitlines()[1] == "  Breakfast: French toast (Bread, Eggs, Milk)"
+    assert "  Breakfast: Omelette (Cheese, Eggs)" in plan.text
+    assert plan.stats['meals'] == 2
+    assert plan.stats['coverage'] == 1.0
+
+
+def test_plan_skips_items_past_their_expiry_day():
+    rows = [lot("Chicken", 2, 0), lot("Potatoes", 4, 30)]
+
+    plan = localplanner.plan(rows, TODAY, days=2, book=BOOK)
+    lines = plan.text.splitlines()
+
+    assert lines[3] == "  Dinner: Roast chicken (Chicken, Potatoes)"
+    assert lines[7] == "  Dinner: nothing left in the inventory for this meal"
+
+
+def test_plan_is_deterministic_with_bundled_recipes():
+    rows = [lot(name, 3, i) for i, name in enumerate(["Eggs", "Milk", "Bread", "Pasta", "Cheese", "Tomatoes"])]
+
+    first = localplanner.plan(rows, TODAY)
+    assert first.text == localplanner.plan(rows, TODAY).text
+    assert first.stats['meals'] > 0
@@ -0,0 +1,124 @@
+#
+# Unit tests for SmartMealPlanner-client/mealclient.py against a
+# local HTTP server.
+#
+
+import json
+import os
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'SmartMealPlanner-client'))
+
+aiohttp = pytest.importorskip('aiohttp')
+
+import mealclient
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    failures = {}       # path -> number of 503s to send first
+    hits = {}
+
+    def do_GET(self):
+        Handler.hits[self.path] = Handler.hits.get(self.path, 0) + 1
+        if self.path == '/slow':
+            time.sleep(0.5)
+        if self.path == '/stream':
+            self.send_response(200)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for word in ['one ', 'two ', 'three']:
+                data = word.encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        status = 200
+        if Handler.failures.get(self.path, 0) > 0:
+            Handler.failures[self.path] -= 1
+            status = 503
+        self.reply(status, {'path': self.path})
+
+    def do_POST(self):
+        Handler.hits[self.path] = Handler.hits.get(self.path, 0) + 1
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.reply(503 if self.path == '/down' else 200, body)
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('localhost', 0), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    Handler.failures = {}
+    Handler.hits = {}
+    yield f"http://localhost:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+@pytest.fixture
+def client():
+    engine = mealclient.MealClient(timeout=0.3, backoff_base=0.01)
+    yield engine
+    engine.close()
+
+
+def test_get_retries_then_succeeds(server, client):
+    Handler.failures['/flaky'] = 2
+
+    res = client.get_sync(server + '/flaky')
+
+    assert res.status_code == 200
+    assert res.json() == {'path': '/flaky'}
+    assert Handler.hits['/flaky'] == 3
+
+
+def test_get_gives_up_after_retries(server, client):
+    Handler.failures['/flaky'] = 10
+
+    assert client.get_sync(server + '/flaky').status_code == 503
+    assert Handler.hits['/flaky'] == 3
+
+
+def test_post_is_not_retried(server, client):
+    res = client.post_sync(server + '/down', {'a': 1})
+
+    assert res.status_code == 503
+    assert Handler.hits['/down'] == 1
+
+
+def test_timeout(server, client):
+    with pytest.raises(Exception):
+        client.get_sync(server + '/slow')
+
+
+def test_concurrent_submit(server, client):
+    futures = [client.submit(client.get(server + f'/item{i}')) for i in range(10)]
+
+    assert [f.result().json()['path'] for f in futures] == [f'/item{i}' for i in range(10)]
+
+
+def test_stream_sync(server, client):
+    assert "".join(client.stream_sync(server + '/stream')) == 'one two three'
+
+
+def test_backoff_is_bounded(client):
+    for attempt in range(10):
+        assert 0 <= client.backoff(attempt) <= client.backoff_max
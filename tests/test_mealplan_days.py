@@ -0,0 +1,101 @@
+#
+# Multi-day meal plans: slashMealplan.lambda_handler with ?days=N, one
+# completion per day against the local mock OpenAI server
+# (mocks/openai_mock.py), run concurrently.
+#
+
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from conftest import FakeConn, as_user, load_lambda
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mocks'))
+
+import openai_mock
+
+
+LATENCY = 0.3
+
+
+def lots(count):
+    today = datetime.date.today()
+    rows = []
+    for i in range(count):
+        expires = today + datetime.timedelta(days=i + 1)
+        rows.append((f"Item {i}", 1, expires.day, expires.month, expires.year))
+    return rows
+
+
+@pytest.fixture
+def mealplan(monkeypatch):
+    pytest.importorskip('requests')
+    module = load_lambda('slashMealplan')
+
+    server = openai_mock.make_server(latency=LATENCY)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    monkeypatch.setattr(module, 'OPENAI_URL', f"http://{host}:{port}/v1/chat/completions")
+    if not module.configur.has_section('openai'):
+        module.configur.read_dict({'openai': {'key': 'test-key'}})
+
+    # version lookup, then the lots
+    monkeypatch.setattr(module.dbpool, 'get_dbConn', lambda: FakeConn([{'rows': [(1,)]}, {'rows': lots(8)}]))
+    monkeypatch.setattr(module.dbpool, 'release', lambda c, discard=False: None)
+    monkeypatch.setattr(module, 'cache', module.plancache.NoCache())
+    yield module
+    server.shutdown()
+
+
+def get_plan(module, days):
+    event = as_user({'queryStringParameters': {'days': str(days)}})
+    start = time.perf_counter()
+    response = module.lambda_handler(event, None)
+    return response, time.perf_counter() - start
+
+
+def test_days_run_concurrently(mealplan, monkeypatch):
+    monkeypatch.setattr(mealplan, 'MAX_CONCURRENCY', 4)
+
+    response, elapsed = get_plan(mealplan, 4)
+    body = json.loads(response['body'])
+
+    assert response['statusCode'] == 200
+    assert body['complete'] is True
+    assert [line for line in body['meal_plan'].splitlines() if line.endswith(":")] == \
+        ["Day 1:", "Day 2:", "Day 3:", "Day 4:"]
+    # about one call's latency, not four
+    assert elapsed < LATENCY * 2.5
+
+
+def test_concurrency_limit(mealplan, monkeypatch):
+    monkeypatch.setattr(mealplan, 'MAX_CONCURRENCY', 1)
+
+    response, elapsed = get_plan(mealplan, 3)
+
+    assert response['statusCode'] == 200
+    assert elapsed >= LATENCY * 3
+
+
+def test_timed_out_day_is_reported_and_not_cached(mealplan, monkeypatch):
+    monkeypatch.setattr(mealplan, 'CALL_TIMEOUT', LATENCY / 3)
+    puts = []
+    monkeypatch.setattr(mealplan.cache, 'put', lambda key, plan: puts.append(key))
+
+    response, elapsed = get_plan(mealplan, 2)
+    body = json.loads(response['body'])
+
+    assert body['complete'] is False
+    assert "Day 1:\nnot generated (ReadTimeout)" in body['meal_plan']
+    assert puts == []
+
+
+def test_bad_days(mealplan):
+    response, _ = get_plan(mealplan, 99)
+
+    assert response['statusCode'] == 400
@@ -0,0 +1,53 @@
+#
+# Streaming meal plan: slashMealplan.stream_handler against the local
+# mock OpenAI server (mocks/openai_mock.py).
+#
+
+import os
+import sys
+import threading
+
+import pytest
+
+from conftest import FakeConn, as_user, load_lambda
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'mocks'))
+
+import openai_mock
+
+
+@pytest.fixture
+def mealplan(monkeypatch):
+    pytest.importorskip('requests')
+    module = load_lambda('slashMealplan')
+
+    server = openai_mock.make_server(latency=0.0, token_delay=0.0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    monkeypatch.setattr(module, 'OPENAI_URL', f"http://{host}:{port}/v1/chat/completions")
+    if not module.configur.has_section('openai'):
+        module.configur.read_dict({'openai': {'key': 'test-key'}})
+
+    rows = [('Milk', 2, 10, 3, 2025)]
+    monkeypatch.setattr(module.dbpool, 'get_dbConn', lambda: FakeConn([{'rows': rows}]))
+    monkeypatch.setattr(module.dbpool, 'release', lambda c, discard=False: None)
+    monkeypatch.setattr(module, 'cache', module.plancache.NoCache())
+    yield module
+    server.shutdown()
+
+
+def test_stream_handler_yields_tokens(mealplan):
+    chunks = list(mealplan.stream_handler(as_user({}), None))
+
+    assert len(chunks) > 1
+    assert "".join(chunks).strip() == openai_mock.PLAN
+
+
+def test_buffered_matches_stream(mealplan):
+    assert mealplan.request_meal_plan("prompt") == openai_mock.PLAN
+
+
+def test_stream_handler_requires_user(mealplan):
+    chunks = list(mealplan.stream_handler({}, None))
+
+    assert chunks == ["\n**ERROR: not authenticated"]
@@ -0,0 +1,119 @@
+#
+# Unit tests for notify/lambda_function.py and notify/digest.py
+#
+
+import datetime
+import json
+
+import pytest
+
+from conftest import FakeConn, as_user, load_lambda
+
+
+class FakeSendGrid:
+
+    def __init__(self):
+        self.messages = []
+
+    def send(self, message):
+        self.messages.append(message)
+        return type('Response', (), {'status_code': 202})()
+
+
+@pytest.fixture
+def notify(monkeypatch):
+    module = load_lambda('notify')
+    monkeypatch.setattr(module.dbpool, 'release', lambda c, discard=False: None)
+    module.sendgrid = FakeSendGrid()
+    monkeypatch.setattr(module.digest, '_client', module.sendgrid)
+
+    def use(conn):
+        monkeypatch.setattr(module.dbpool, 'get_dbConn', lambda: conn)
+        return conn
+
+    module.use = use
+    return module
+
+
+def test_send_all_one_query_per_run(notify):
+    today = datetime.date.today()
+    subscribers = [('u1', 1, 'a@x.com'), ('u1', 1, 'b@x.com'), ('u2', 5, 'c@x.com')]
+    rows = [('u1', 1, 'Milk', 2, today),
+            ('u2', 5, 'Milk', 1, today), ('u2', 5, 'Eggs', 12, today + datetime.timedelta(days=4))]
+    conn = notify.use(FakeConn([{'rows': subscribers}, {'rows': rows}]))
+
+    response = notify.lambda_handler({'source': 'aws.events'}, None)
+
+    assert response['statusCode'] == 200
+    assert json.loads(response['body']) == {'subscribers': 3, 'digests': 2, 'emails': 3, 'api_calls': 1}
+
+    # subscribers + one set-based inventory query, however many users
+    assert len(conn.executed) == 2
+    assert conn.executed[1][1] == [today]
+
+    message, = notify.sendgrid.messages
+    personalizations = message['personalizations']
+    assert [p['to'][0]['email'] for p in personalizations] == ['a@x.com', 'b@x.com', 'c@x.com']
+    digests = [p['substitutions'][notify.digest.DIGEST_TAG] for p in personalizations]
+    assert 'Eggs' not in digests[0] and digests[0] == digests[1]
+    assert 'Eggs' in digests[2]
+
+
+def test_send_all_not_for_callers(notify):
+    conn = notify.use(FakeConn())
+    event = as_user({'body': json.dumps({'action': 'send_all'})})
+
+    assert notify.lambda_handler(event, None)['statusCode'] == 403
+    assert notify.sendgrid.messages == []
+
+
+def test_send_batches_personalizations(notify):
+    recipients = [f'u{i}@x.com' for i in range(2500)]
+
+    calls = notify.digest.send(recipients, 'subject', 'body')
+
+    assert calls == 3
+    sizes = [len(m['personalizations']) for m in notify.sendgrid.messages]
+    assert sizes == [1000, 1000, 500]
+
+
+def test_subscribe(notify):
+    conn = notify.use(FakeConn([{'rowcount': 1}]))
+    event = {'body': json.dumps({'action': 'subscribe', 'email': 'a@x.com', 'days': 2})}
+
+    response = notify.lambda_handler(as_user(event), None)
+
+    assert response['statusCode'] == 200
+    sql, params = conn.executed[0]
+    assert sql.startswith('INSERT INTO subscriptions')
+    assert params == ['u1', 'a@x.com', 2]
+
+
+def test_expiring_window(notify):
+    today = datetime.date.today()
+    rows = [('Milk', 2, today), ('Eggs', 12, today + datetime.timedelta(days=9))]
+    conn = notify.use(FakeConn([{'rows': [(7,)]}, {'rows': rows}]))
+    event = {'httpMethod': 'GET', 'queryStringParameters': {'days': '10'}}
+
+    response = notify.lambda_handler(as_user(event), None)
+    body = json.loads(response['body'])
+
+    assert response['statusCode'] == 200
+    assert body['cutoff'] == (today + datetime.timedelta(days=10)).isoformat()
+    assert body['items'][1] == {'name': 'Eggs', 'quantity': 12, 'expires': rows[1][2].isoformat()}
+    assert conn.executed[1][1] == ['u1', today + datetime.timedelta(days=10)]
+    assert notify.sendgrid.messages == []
+
+    # unchanged inventory: only the version is read
+    conn = notify.use(FakeConn([{'rows': [(7,)]}]))
+    event['headers'] = {'If-None-Match': response['headers']['ETag']}
+    assert notify.lambda_handler(as_user(event), None)['statusCode'] == 304
+    assert len(conn.executed) == 1
+
+
+def test_expiring_bad_days(notify):
+    conn = notify.use(FakeConn())
+    event = {'httpMethod': 'GET', 'queryStringParameters': {'days': '-1'}}
+
+    assert notify.lambda_handler(as_user(event), None)['statusCode'] == 400
+    assert conn.executed == []
@@ -0,0 +1,50 @@
+#
+# Unit tests for slashMealplan/plancache.py (sqlite backend)
+#
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'slashMealplan'))
+
+import plancache
+
+
+ROWS = [('Milk', 2, 10, 3, 2025), ('Eggs', 12, 15, 3, 2025)]
+PARAMS = {'model': 'gpt-4', 'max_tokens': 300}
+
+
+def test_fingerprint_ignores_row_order():
+    assert plancache.fingerprint(ROWS, PARAMS) == plancache.fingerprint(ROWS[::-1], PARAMS)
+    assert plancache.fingerprint(ROWS, PARAMS) != plancache.fingerprint(ROWS[:1], PARAMS)
+    assert plancache.fingerprint(ROWS, PARAMS) != plancache.fingerprint(ROWS, {'model': 'x'})
+
+
+def test_sqlite_get_put(tmp_path):
+    cache = plancache.SQLiteCache(str(tmp_path / 'c.db'), ttl=60, max_entries=10)
+
+    assert cache.get('k') is None
+    cache.put('k', 'plan')
+    assert cache.get('k') == 'plan'
+
+
+def test_sqlite_ttl(tmp_path):
+    cache = plancache.SQLiteCache(str(tmp_path / 'c.db'), ttl=-1, max_entries=10)
+
+    cache.put('k', 'plan')
+    assert cache.get('k') is None
+
+
+def test_sqlite_lru_eviction(tmp_path, monkeypatch):
+    cache = plancache.SQLiteCache(str(tmp_path / 'c.db'), ttl=60, max_entries=2)
+    clock = iter(range(100, 200))
+    monkeypatch.setattr(plancache.time, 'time', lambda: next(clock))
+
+    cache.put('a', '1')
+    cache.put('b', '2')
+    cache.get('a')              # a is now more recently used than b
+    cache.put('c', '3')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == '1'
+    assert cache.get('c') == '3'
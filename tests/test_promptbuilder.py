@@ -0,0 +1,64 @@
+#
+# Unit tests for slashMealplan/promptbuilder.py
+#
+
+import datetime
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'slashMealplan'))
+
+import promptbuilder
+
+
+TODAY = datetime.date(2025, 3, 1)
+
+ROWS = [
+    ('Milk', 2, 10, 3, 2025),
+    ('Milk', 1, 3, 3, 2025),
+    ('Eggs', 12, 20, 3, 2025),
+    ('Bread', 1, 20, 2, 2025),      # expired
+]
+
+
+def test_expiry_date_normalizes_like_mysql():
+    assert promptbuilder.expiry_date(31, 4, 2025) == datetime.date(2025, 5, 1)
+    assert promptbuilder.expiry_date(1, 13, 2025) == datetime.date(2026, 1, 1)
+
+
+def test_groups_lots_soonest_first():
+    items, expired = promptbuilder.group_items(ROWS, TODAY)
+
+    assert items == [['Milk', 3, 2], ['Eggs', 12, 19]]
+    assert expired == 1
+
+
+def test_build_lists_every_item_within_budget():
+    prompt = promptbuilder.build(ROWS, "Plan:", TODAY, budget=1000)
+
+    assert prompt.text == "Plan:\nitem|qty|days left\nMilk|3|2\nEggs|12|19\n"
+    assert prompt.stats['listed'] == 2
+    assert prompt.stats['omitted'] == 0
+    assert prompt.stats['expired'] == 1
+
+
+def test_build_keeps_to_budget_and_drops_latest_expiring():
+    rows = [(f"Item {i:04d}", 1, 1 + i % 28, 3 + i // 28, 2025) for i in range(1000)]
+
+    prompt = promptbuilder.build(rows, "Plan:", TODAY, budget=200)
+
+    assert prompt.stats['tokens'] <= 200
+    assert 0 < prompt.stats['listed'] < 1000
+    assert prompt.stats['listed'] + prompt.stats['omitted'] == 1000
+    assert "Item 0000|1|0\n" in prompt.text
+    assert "Item 0999" not in prompt.text
+    assert prompt.text.endswith(f"(+{prompt.stats['omitted']} more items that keep longer)\n")
+
+
+def test_allocate_days_gives_day_one_the_soonest():
+    days = promptbuilder.allocate_days(ROWS + [('Rice', 1, 1, 6, 2025)], TODAY, 2)
+
+    assert days == [
+        [('Milk', 2, 10, 3, 2025), ('Milk', 1, 3, 3, 2025), ('Eggs', 12, 20, 3, 2025)],
+        [('Rice', 1, 1, 6, 2025)],
+    ]
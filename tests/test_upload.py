@@ -0,0 +1,134 @@
+#
+# Unit tests for slashUpload/lambda_function.py
+#
+
+import base64
+import json
+
+import pytest
+
+from conftest import FakeConn, as_user, load_lambda
+
+
+@pytest.fixture
+def upload(monkeypatch):
+    module = load_lambda('slashUpload')
+    conn = FakeConn()
+    monkeypatch.setattr(module.dbpool, 'get_dbConn', lambda: conn)
+    monkeypatch.setattr(module.dbpool, 'release', lambda c, discard=False: None)
+    # the "image" is the QR text itself, so scan_QR just decodes bytes
+    monkeypatch.setattr(module, 'scan_QR', lambda data: data.decode('utf-8'))
+    module.conn = conn
+    return module
+
+
+def b64(text):
+    return base64.b64encode(text.encode('utf-8')).decode('utf-8')
+
+
+def test_batch_upload_single_upsert(upload):
+    images = [b64('Milk-10-03-25-2'), b64('garbage'), b64('Eggs-15-03-25-12')]
+    event = {'body': json.dumps({'images': images})}
+
+    response = upload.lambda_handler(as_user(event), None)
+    body = json.loads(response['body'])
+
+    assert response['statusCode'] == 200
+    assert [r['status'] for r in body['results']] == ['ok', 'error', 'ok']
+    assert [r['index'] for r in body['results']] == [0, 1, 2]
+
+    assert len(upload.conn.executed) == 2     # upsert + version bump
+    sql, params = upload.conn.executed[0]
+    assert 'ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity)' in sql
+    assert params == ['u1', 'Milk', '10', '03', '2025', 2, 'u1', 'Eggs', '15', '03', '2025', 12]
+    assert upload.conn.commits == 1
+
+
+def test_batch_upload_all_failed(upload):
+    event = {'body': json.dumps({'images': [b64('bad')]})}
+
+    response = upload.lambda_handler(as_user(event), None)
+
+    assert response['statusCode'] == 400
+    assert upload.conn.executed == []
+
+
+def test_qr_text_skips_decode(upload, monkeypatch):
+    def no_scan(data):
+        raise AssertionError("scan_QR called for qr_text")
+    monkeypatch.setattr(upload, 'scan_QR', no_scan)
+
+    event = {'body': json.dumps({'qr_text': 'Milk-10-03-25-2'})}
+    response = upload.lambda_handler(as_user(event), None)
+
+    assert response['statusCode'] == 200
+    assert json.loads(response['body'])['item']['item_name'] == 'Milk'
+    assert upload.conn.executed[0][1] == ['u1', 'Milk', '10', '03', '2025', 2]
+
+
+@pytest.mark.parametrize('event', [
+    {'body': b64('Eggs-15-03-25-12'), 'isBase64Encoded': True,
+     'headers': {'content-type': 'application/octet-stream'}},
+    {'body': 'Eggs-15-03-25-12', 'headers': {'Content-Type': 'image/png'}},
+])
+def test_binary_body(upload, event):
+    response = upload.lambda_handler(as_user(event), None)
+
+    assert response['statusCode'] == 200
+    assert upload.conn.executed[0][1] == ['u1', 'Eggs', '15', '03', '2025', 12]
+
+
+def test_batch_mixes_text_and_images(upload):
+    images = [{'qr_text': 'Milk-10-03-25-2'}, b64('Eggs-15-03-25-12')]
+    event = {'body': json.dumps({'images': images})}
+
+    response = upload.lambda_handler(as_user(event), None)
+    body = json.loads(response['body'])
+
+    assert [r['status'] for r in body['results']] == ['ok', 'ok']
+
+
+def test_qr_cache_skips_duplicate_images(upload, monkeypatch):
+    scanned = []
+    monkeypatch.setattr(upload, 'scan_QR', lambda data: scanned.append(data) or data.decode('utf-8'))
+
+    images = [b64('Milk-10-03-25-2'), b64('Milk-10-03-25-2'), b64('Eggs-15-03-25-12')]
+    body = json.loads(upload.lambda_handler(as_user({'body': json.dumps({'images': images})}), None)['body'])
+    assert len(scanned) == 2
+    assert body['qr_cache']['request'] == {'hits': 0, 'db_hits': 0, 'misses': 3}
+
+    event = {'body': json.dumps({'image': b64('Eggs-15-03-25-12')})}
+    body = json.loads(upload.lambda_handler(as_user(event), None)['body'])
+    assert len(scanned) == 2
+    assert body['qr_cache']['request'] == {'hits': 1, 'db_hits': 0, 'misses': 0}
+    assert body['qr_cache']['container']['hits'] == 1
+    assert body['qr_cache']['container']['entries'] == 2
+
+
+def test_qr_cache_database(upload, monkeypatch):
+    monkeypatch.setattr(upload.cache, 'use_db', True)
+    milk, eggs = 'Milk-10-03-25-2', 'Eggs-15-03-25-12'
+    milk_hash = upload.qrcache.digest(milk.encode('utf-8'))
+    upload.conn.results = [{'rows': [(milk_hash, milk)]}]
+
+    images = [b64(milk), b64(eggs)]
+    body = json.loads(upload.lambda_handler(as_user({'body': json.dumps({'images': images})}), None)['body'])
+
+    assert body['qr_cache']['request'] == {'hits': 0, 'db_hits': 1, 'misses': 1}
+    lookup, store = upload.conn.executed[0], upload.conn.executed[1]
+    assert lookup[0].startswith('SELECT image_hash, qr_text FROM qr_cache WHERE image_hash IN')
+    assert store[0].startswith('INSERT IGNORE INTO qr_cache')
+    assert store[1] == [upload.qrcache.digest(eggs.encode('utf-8')), eggs]
+
+
+def test_qr_cache_lru_eviction():
+    import qrcache
+    cache = qrcache.QRCache(max_entries=2, use_db=False)
+
+    cache.put('a', '1')
+    cache.put('b', '2')
+    cache.get('a')
+    cache.put('c', '3')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == '1' and cache.get('c') == '3'